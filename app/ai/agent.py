@@ -4,18 +4,30 @@ TaskFlow AI Agent
 ReAct = Reason（思考）+ Act（行动）循环。
 """
 
+import asyncio
 import os
+from typing import AsyncIterator, Optional, Tuple
+
 from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, HumanMessage
 from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
 
-from app.ai.prompts import SYSTEM_PROMPT
+from app.ai.checkpointer import checkpointer
+from app.ai.intents import Intent
+from app.ai.memory import ChatState, history_hook
+from app.ai.prompts import WEEKLY_REPORT_PROMPT
+from app.ai.tracing import AgentTracer
 from app.ai.tools import (
     create_task,
+    create_tasks,
     list_tasks,
+    search_tasks,
     update_task,
+    update_tasks,
     get_task_summary,
     get_completed_tasks_this_week,
+    set_current_user_id,
 )
 
 load_dotenv()
@@ -24,52 +36,192 @@ load_dotenv()
 
 from pydantic import SecretStr
 
+# 任意 OpenAI 兼容端点都行；默认通义千问。本地压测 / 回归用 benchmarks.fake_openai 起的假服务
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1")
+LLM_MODEL = os.getenv("LLM_MODEL", "qwen-plus")
+
+
+def llm_api_key() -> str:
+    """LLM_API_KEY 优先；没设时沿用 DASHSCOPE_API_KEY（默认端点是通义千问）"""
+    return os.getenv("LLM_API_KEY") or os.getenv("DASHSCOPE_API_KEY") or ""
+
+
 llm = ChatOpenAI(
-    model="qwen-plus",  # 通义千问模型，兼容模式
-    api_key=SecretStr(os.getenv("DASHSCOPE_API_KEY") or ""),  # API Key
-    base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",  # 通义千问 OpenAI 兼容端点
+    model=LLM_MODEL,  # 默认通义千问，兼容模式
+    api_key=SecretStr(llm_api_key()),  # API Key
+    base_url=LLM_BASE_URL,  # OpenAI 兼容端点
     temperature=0.7,  # 创造性程度 0~2，越高越发散
     request_timeout=90,  # 防止长时间无响应
+    stream_usage=True,  # 流式调用也带回 token 用量（app.ai.tracing 记指标用）
 )
 
 # ── 工具列表 ──
 tools = [
     create_task,
+    create_tasks,
     list_tasks,
+    search_tasks,
     update_task,
+    update_tasks,
     get_task_summary,
     get_completed_tasks_this_week,
 ]
+TOOLS_BY_NAME = {t.name: t for t in tools}
+
 
 # ── 创建 ReAct Agent ──
-agent = create_react_agent(
-    model=llm,
-    tools=tools,
-)
+def build_agent(model, checkpointer=None, token_budget: Optional[int] = None):
+    """
+    系统提示词和对话摘要由 history_hook 在每次调用模型前拼上，并把历史压到 token 预算内。
+    带 checkpointer 时按 thread_id 续接之前的对话。
+    """
+    return create_react_agent(
+        model=model,
+        tools=tools,
+        state_schema=ChatState,
+        pre_model_hook=history_hook(model, token_budget),
+        checkpointer=checkpointer,
+    )
+
+
+agent = build_agent(llm)  # 一次性任务（周报），不留历史
+chat_agent = build_agent(llm, checkpointer)  # 多轮对话，历史存在数据库里
+
+
+TOOL_RESULT_PREVIEW = 200  # 流式事件里工具结果只带个开头，完整结果留给 LLM
+FALLBACK_REPLY = "抱歉，我没有理解你的意思。可以换个说法试试？"
+
+
+def _require_api_key():
+    if not llm_api_key().strip():
+        raise ValueError("未配置 LLM_API_KEY（或 DASHSCOPE_API_KEY），请在 .env 中设置 LLM 端点的 API Key")
+
+
+def _agent_input(user_message: str) -> dict:
+    # 只带本轮的用户消息：之前的历史在检查点里，系统提示词由 history_hook 加
+    return {"messages": [{"role": "user", "content": user_message}]}
+
 
+def _runner(thread_id: Optional[int]):
+    """有会话就用带检查点的 Agent，返回 (agent, config)"""
+    if thread_id is None:
+        return agent, None
+    return chat_agent, {"configurable": {"thread_id": str(thread_id)}}
 
-def chat_with_agent(user_message: str) -> str:
+
+async def chat_with_agent(user_id: int, user_message: str, thread_id: Optional[int] = None) -> str:
     """
-    主入口：传入用户消息，返回 Agent 回复文本。
+    主入口：以 user_id 的身份处理一条消息，返回 Agent 回复文本。
     Agent 会自动决定是否调用工具、调用哪个工具。
+    全程 async：等 LLM 时不占线程，并发的聊天互不影响（当前用户绑定在本请求的 context 上）。
+    传 thread_id 时接着该会话之前的对话继续。
     """
-    api_key = os.getenv("DASHSCOPE_API_KEY") or ""
-    if not api_key.strip():
-        raise ValueError("未配置 DASHSCOPE_API_KEY，请在 .env 中设置通义千问 API Key")
-    result = agent.invoke(
-        {
-            "messages": [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_message},
-            ]
-        }
-    )
+    _require_api_key()
+    set_current_user_id(user_id)
+    runner, config = _runner(thread_id)
+    with AgentTracer("chat", user_id, thread_id) as tracer:
+        result = await runner.ainvoke(_agent_input(user_message), tracer.attach(config))
+    return _final_reply(result["messages"])
+
+
+async def run_intent(user_id: int, intent: Intent, user_message: str, thread_id: Optional[int] = None) -> str:
+    """
+    快速通道（app.ai.intents 已确定意图）：直接调用工具，工具结果就是回复，不经过 LLM。
+    有会话时把这一问一答记进历史，之后的 Agent 轮次能看到。
+    """
+    set_current_user_id(user_id)
+    # 工具是同步的数据库操作，和 ToolNode 一样放进线程池（context 随之复制，当前用户不变）
+    with AgentTracer("intent", user_id, thread_id) as tracer:
+        reply = await asyncio.to_thread(TOOLS_BY_NAME[intent.tool].invoke, intent.args, tracer.attach())
+    if thread_id is not None:
+        await chat_agent.aupdate_state(
+            {"configurable": {"thread_id": str(thread_id)}},
+            {"messages": [HumanMessage(user_message), AIMessage(reply)]},
+            as_node="agent",
+        )
+    return reply
+
+
+async def stream_intent_events(
+    user_id: int, intent: Intent, user_message: str, thread_id: Optional[int] = None
+) -> AsyncIterator[dict]:
+    """快速通道的流式版本，事件格式同 stream_agent_events；回复一次性作为一个 token 发出"""
+    yield {"type": "tool_start", "name": intent.tool, "args": intent.args}
+    reply = await run_intent(user_id, intent, user_message, thread_id)
+    yield {"type": "tool_end", "name": intent.tool, "result": reply[:TOOL_RESULT_PREVIEW]}
+    yield {"type": "token", "text": reply}
+    yield {"type": "done", "reply": reply}
+
+
+def _final_reply(messages: list) -> str:
     # 取最后一条 AI 回复
     ai_messages = [
         m
-        for m in result["messages"]
+        for m in messages
         if hasattr(m, "content") and getattr(m, "type", None) == "ai"
     ]
     if ai_messages:
         return ai_messages[-1].content
-    return "抱歉，我没有理解你的意思。可以换个说法试试？"
+    return FALLBACK_REPLY
+
+
+async def generate_weekly_report(user_id: int) -> Tuple[str, int]:
+    """生成本周周报，返回 (周报, LLM 调用次数)；一次性 Agent，每条 AI 消息对应一次调用"""
+    _require_api_key()
+    set_current_user_id(user_id)
+    with AgentTracer("weekly_report", user_id) as tracer:
+        result = await agent.ainvoke(_agent_input(WEEKLY_REPORT_PROMPT), tracer.attach())
+    llm_calls = sum(getattr(m, "type", None) == "ai" for m in result["messages"])
+    return _final_reply(result["messages"]), llm_calls
+
+
+async def stream_agent_events(
+    user_id: int, user_message: str, thread_id: Optional[int] = None
+) -> AsyncIterator[dict]:
+    """
+    流式版本：边跑 ReAct 循环边产出事件，供 /chat/stream 转成 SSE。
+    - {"type": "token", "text": ...}              LLM 生成的文本增量
+    - {"type": "tool_start", "name": ..., "args": ...}  Agent 决定调用工具
+    - {"type": "tool_end", "name": ..., "result": ...}  工具执行完成（结果截断）
+    - {"type": "done", "reply": ...}              结束，带最终回复全文
+    messages 模式给 token，updates 模式给每个节点完成后的消息（工具调用 / 工具结果）。
+    """
+    _require_api_key()
+    set_current_user_id(user_id)
+    runner, config = _runner(thread_id)
+    reply: list = []
+    with AgentTracer("chat_stream", user_id, thread_id) as tracer:
+        async for mode, payload in runner.astream(
+            _agent_input(user_message), tracer.attach(config), stream_mode=["messages", "updates"]
+        ):
+            if mode == "messages":
+                chunk, metadata = payload
+                # 只转发模型节点的文本；工具节点的 ToolMessage 走下面的 tool_end，摘要调用不转发
+                if metadata.get("langgraph_node") == "agent" and isinstance(chunk.content, str) and chunk.content:
+                    reply.append(chunk.content)
+                    yield {"type": "token", "text": chunk.content}
+                continue
+            for node, update in payload.items():
+                for message in (update or {}).get("messages", []):
+                    if node == "agent" and getattr(message, "tool_calls", None):
+                        # 调用工具之前说的话不算最终回复
+                        reply.clear()
+                        for call in message.tool_calls:
+                            yield {"type": "tool_start", "name": call["name"], "args": call["args"]}
+                    elif node == "tools":
+                        yield {
+                            "type": "tool_end",
+                            "name": message.name,
+                            "result": str(message.content)[:TOOL_RESULT_PREVIEW],
+                        }
+    yield {"type": "done", "reply": "".join(reply) or FALLBACK_REPLY}
+
+
+async def thread_history(thread_id: int) -> dict:
+    """会话当前保存的摘要和消息（只含用户消息和有文本的 AI 回复），给前端恢复对话用"""
+    state = await chat_agent.aget_state({"configurable": {"thread_id": str(thread_id)}})
+    messages = []
+    for m in state.values.get("messages", []):
+        if m.type == "human" or (m.type == "ai" and isinstance(m.content, str) and m.content):
+            messages.append({"role": "user" if m.type == "human" else "ai", "content": m.content})
+    return {"summary": state.values.get("summary", ""), "messages": messages}
@@ -0,0 +1,245 @@
+"""
+LangGraph 检查点存在应用自己的数据库里（ChatCheckpoint / ChatCheckpointWrite 两张表），
+对话历史随数据库一起备份、迁移，多进程部署也共享同一份。
+
+接口照 InMemorySaver 实现；不同的是每个会话只留最新快照和它的父快照——
+聊天只需要"接着上次说"，不做时间回溯，表的大小随会话数而不是消息数增长。
+异步方法把同步实现丢进线程池，等数据库时不占事件循环。
+"""
+
+import asyncio
+import random
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from sqlalchemy import delete
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, col, select
+
+from app.database import engine as default_engine
+from app.models import ChatCheckpoint, ChatCheckpointWrite
+
+
+class SQLCheckpointSaver(BaseCheckpointSaver[str]):
+    def __init__(self, engine: Engine):
+        super().__init__()
+        self.engine = engine
+
+    # ── 读 ──
+
+    def _to_tuple(self, session: Session, row: ChatCheckpoint) -> CheckpointTuple:
+        writes = session.exec(
+            select(ChatCheckpointWrite)
+            .where(
+                ChatCheckpointWrite.thread_id == row.thread_id,
+                ChatCheckpointWrite.checkpoint_ns == row.checkpoint_ns,
+                ChatCheckpointWrite.checkpoint_id == row.checkpoint_id,
+            )
+            .order_by(ChatCheckpointWrite.task_id, ChatCheckpointWrite.idx)
+        ).all()
+
+        def _config(checkpoint_id: str) -> RunnableConfig:
+            return {
+                "configurable": {
+                    "thread_id": row.thread_id,
+                    "checkpoint_ns": row.checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            }
+
+        return CheckpointTuple(
+            config=_config(row.checkpoint_id),
+            checkpoint=self.serde.loads_typed((row.type, row.checkpoint)),
+            metadata=self.serde.loads_typed((row.metadata_type, row.metadata_blob)),
+            parent_config=_config(row.parent_checkpoint_id) if row.parent_checkpoint_id else None,
+            pending_writes=[
+                (w.task_id, w.channel, self.serde.loads_typed((w.type, w.value))) for w in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        configurable = config["configurable"]
+        query = select(ChatCheckpoint).where(
+            ChatCheckpoint.thread_id == configurable["thread_id"],
+            ChatCheckpoint.checkpoint_ns == configurable.get("checkpoint_ns", ""),
+        )
+        if checkpoint_id := get_checkpoint_id(config):
+            query = query.where(ChatCheckpoint.checkpoint_id == checkpoint_id)
+        else:
+            # checkpoint_id 单调递增（uuid6），最大的就是最新的
+            query = query.order_by(col(ChatCheckpoint.checkpoint_id).desc()).limit(1)
+        with Session(self.engine) as session:
+            row = session.exec(query).first()
+            return self._to_tuple(session, row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = select(ChatCheckpoint).order_by(col(ChatCheckpoint.checkpoint_id).desc())
+        if config:
+            configurable = config["configurable"]
+            query = query.where(ChatCheckpoint.thread_id == configurable["thread_id"])
+            if "checkpoint_ns" in configurable:
+                query = query.where(ChatCheckpoint.checkpoint_ns == configurable["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                query = query.where(ChatCheckpoint.checkpoint_id == checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            query = query.where(ChatCheckpoint.checkpoint_id < before_id)
+        with Session(self.engine) as session:
+            results = []
+            for row in session.exec(query):
+                item = self._to_tuple(session, row)
+                if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                results.append(item)
+                if limit is not None and len(results) >= limit:
+                    break
+        yield from results
+
+    # ── 写 ──
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_id = config["configurable"].get("checkpoint_id")
+        # channel_values 直接跟快照存一起：历史有 token 预算兜着，整份状态不大
+        type_, blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        keep = [checkpoint["id"]] + ([parent_id] if parent_id else [])
+        with Session(self.engine) as session:
+            session.merge(
+                ChatCheckpoint(
+                    thread_id=thread_id,
+                    checkpoint_ns=checkpoint_ns,
+                    checkpoint_id=checkpoint["id"],
+                    parent_checkpoint_id=parent_id,
+                    type=type_,
+                    checkpoint=blob,
+                    metadata_type=metadata_type,
+                    metadata_blob=metadata_blob,
+                )
+            )
+            for model in (ChatCheckpoint, ChatCheckpointWrite):
+                session.exec(
+                    delete(model).where(
+                        model.thread_id == thread_id,
+                        model.checkpoint_ns == checkpoint_ns,
+                        col(model.checkpoint_id).not_in(keep),
+                    )
+                )
+            session.commit()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        configurable = config["configurable"]
+        key = dict(
+            thread_id=configurable["thread_id"],
+            checkpoint_ns=configurable.get("checkpoint_ns", ""),
+            checkpoint_id=configurable["checkpoint_id"],
+            task_id=task_id,
+        )
+        with Session(self.engine) as session:
+            for idx, (channel, value) in enumerate(writes):
+                idx = WRITES_IDX_MAP.get(channel, idx)
+                # 特殊写入（错误、中断等，idx < 0）可以覆盖；普通写入重放时保留第一次的
+                if idx >= 0 and session.get(ChatCheckpointWrite, dict(key, idx=idx)):
+                    continue
+                type_, blob = self.serde.dumps_typed(value)
+                session.merge(
+                    ChatCheckpointWrite(
+                        **key, idx=idx, channel=channel, type=type_, value=blob, task_path=task_path
+                    )
+                )
+            session.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with Session(self.engine) as session:
+            for model in (ChatCheckpoint, ChatCheckpointWrite):
+                session.exec(delete(model).where(model.thread_id == thread_id))
+            session.commit()
+
+    # ── 异步版本：同步实现放进线程池 ──
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # 与 InMemorySaver 相同的版本格式：递增序号 + 随机后缀
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+checkpointer = SQLCheckpointSaver(default_engine)
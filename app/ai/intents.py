@@ -0,0 +1,159 @@
+"""
+聊天快速通道：用规则识别简单的指令（查任务、统计、本周完成、按 ID 改状态 / 优先级、加任务），
+直接调用 app.ai.tools 里的工具，不经过 LLM。
+
+只在整句都能被某条规则完整匹配时才走快速通道（先做 NFKC 归一、去掉"请/帮我"之类的客套前缀
+和句末标点）；多意图、带否定、带条件或者规则没见过的说法一律交给 Agent。宁可漏判，不可错判。
+
+标注语料在同目录的 intent_corpus.jsonl（tests 和 benchmarks.bench_intents 共用）。
+"""
+
+import json
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from app.metrics import Counter, register
+
+STATUS_WORDS: Dict[str, str] = {
+    "已完成": "done", "完成": "done", "做完": "done", "搞定": "done", "done": "done",
+    "进行中": "in_progress", "处理中": "in_progress", "在做": "in_progress", "in_progress": "in_progress",
+    "待办": "todo", "未开始": "todo", "todo": "todo",
+    "已取消": "cancelled", "取消": "cancelled", "作废": "cancelled", "cancelled": "cancelled",
+}
+PRIORITY_WORDS: Dict[str, str] = {
+    "紧急": "urgent", "urgent": "urgent",
+    "高": "high", "high": "high",
+    "中": "medium", "普通": "medium", "medium": "medium",
+    "低": "low", "low": "low",
+}
+TITLE_MAX_CHARS = 200
+CORPUS_PATH = Path(__file__).with_name("intent_corpus.jsonl")
+
+CHAT_ROUTED = register(
+    Counter("taskflow_chat_routed_total", "聊天消息的去向（route=fast 快速通道 / agent），tool 为快速通道调用的工具", ("route", "tool"))
+)
+
+
+def _alternatives(words) -> str:
+    # 长的在前，"已完成" 不会被 "完成" 抢先匹配
+    return "|".join(sorted(map(re.escape, words), key=len, reverse=True))
+
+
+STATUS = f"(?P<status>{_alternatives(STATUS_WORDS)})"
+PRIORITY = f"(?P<priority>{_alternatives(PRIORITY_WORDS)})"
+TASK_ID = r"(?:把)?(?:id|任务|编号|#)?:?(?P<id>\d{1,9})(?:号)?(?:任务)?(?:的)?"
+TASK_NOUN = r"(?:任务|待办|事情|事)"
+
+POLITE_PREFIX = re.compile(r"^(?:请|麻烦你?|帮我|帮忙|给我|能不能|可以)+")
+TRAILING_PUNCT = re.compile(r"[。.!！?？~～\s]+$")
+MULTI_STEP = re.compile(r"并且|然后|同时|再把|顺便|如果|要是|不要|别")
+
+
+class Intent(NamedTuple):
+    tool: str  # app.ai.tools 里的工具名
+    args: dict
+
+
+# ── 规则：在去掉空白、转小写的整句上完整匹配 ──
+_SUMMARY = [
+    re.compile(r"(?:总结|统计|汇总)(?:一下)?(?:我的)?(?:任务)?(?:情况|进度|概况)?(?:吧)?"),
+    re.compile(r"(?:我的)?任务(?:统计|概况|情况|进度)(?:怎么样|如何)?"),
+]
+_WEEK_DONE = [
+    re.compile(r"(?:本周|这周|这个星期|这星期)(?:我)?(?:都)?(?:完成|做完|搞定)了(?:哪些|什么|多少)(?:任务|事情|事)?"),
+    re.compile(r"(?:看看|查看|列出)?(?:本周|这周)(?:已)?完成的任务"),
+]
+_LIST = [
+    re.compile(rf"(?:我)?(?:现在|目前)?(?:还)?有(?:哪些|什么)(?:{STATUS}(?:的)?)?{TASK_NOUN}?(?:吗|呢)?"),
+    re.compile(rf"(?:看看|看一下|查看|查一下|列出|显示)(?:我的)?(?:所有|全部)?(?:{STATUS}(?:的)?)?{TASK_NOUN}(?:列表)?"),
+    re.compile(rf"{STATUS}的{TASK_NOUN}(?:有哪些|列表)?"),
+    re.compile(rf"(?:我的)?{TASK_NOUN}列表"),
+]
+_UPDATE_STATUS = [
+    re.compile(rf"{TASK_ID}(?:状态)?(?:标记|标|改|设置|设|置)(?:为|成){STATUS}"),
+    re.compile(rf"{TASK_ID}(?:已经)?{STATUS}了"),
+    re.compile(r"(?P<status>完成|取消)(?:任务)?(?:id)?:?(?P<id>\d{1,9})(?:号)?(?:任务)?"),
+]
+_UPDATE_PRIORITY = [
+    re.compile(rf"{TASK_ID}优先级(?:改|设置|设|调)(?:为|成|到){PRIORITY}"),
+]
+# 加任务在保留空白和大小写的原句上匹配（标题原样保留）
+_CREATE = [
+    re.compile(r"(?:加|添加|新建|创建|新增|记)(?:一)?(?:个|条)?(?:新)?(?:任务|待办)\s*:\s*(?P<title>.+)"),
+    re.compile(r"(?:记一下|记下|提醒我)\s*:\s*(?P<title>.+)"),
+]
+_TITLE_PRIORITY = re.compile(rf"\s*,?\s*优先级\s*(?:为|是|:)?\s*{PRIORITY}\s*$")
+
+
+def normalize(message: str) -> str:
+    text = unicodedata.normalize("NFKC", message).strip()
+    text = TRAILING_PUNCT.sub("", text)
+    return POLITE_PREFIX.sub("", text).strip()
+
+
+def _create_intent(text: str) -> Optional[Intent]:
+    for pattern in _CREATE:
+        m = pattern.fullmatch(text)
+        if not m:
+            continue
+        title = m.group("title").strip()
+        args = {"title": title}
+        pm = _TITLE_PRIORITY.search(title)
+        if pm:
+            args = {"title": title[: pm.start()].strip(), "priority": PRIORITY_WORDS[pm.group("priority")]}
+        if not args["title"] or len(args["title"]) > TITLE_MAX_CHARS or "优先级" in args["title"]:
+            return None
+        return Intent("create_task", args)
+    return None
+
+
+def parse_intent(message: str) -> Optional[Intent]:
+    """能确定意图时返回要直接调用的工具和参数，否则 None（交给 Agent）"""
+    text = normalize(message)
+    if not text or MULTI_STEP.search(text):
+        return None
+    intent = _create_intent(text)
+    if intent:
+        return intent
+
+    compact = re.sub(r"\s+", "", text).lower()
+    if any(p.fullmatch(compact) for p in _SUMMARY):
+        return Intent("get_task_summary", {})
+    if any(p.fullmatch(compact) for p in _WEEK_DONE):
+        return Intent("get_completed_tasks_this_week", {})
+    for pattern in _LIST:
+        m = pattern.fullmatch(compact)
+        if m:
+            status = m.groupdict().get("status")
+            if status is None and "待办" in compact:  # "看看待办" 里的待办是名词，但意思同 "待办的任务"
+                status = "待办"
+            return Intent("list_tasks", {"status_filter": STATUS_WORDS[status]} if status else {})
+    for pattern in _UPDATE_STATUS:
+        m = pattern.fullmatch(compact)
+        if m:
+            return Intent("update_task", {"task_id": int(m.group("id")), "new_status": STATUS_WORDS[m.group("status")]})
+    for pattern in _UPDATE_PRIORITY:
+        m = pattern.fullmatch(compact)
+        if m:
+            return Intent(
+                "update_task", {"task_id": int(m.group("id")), "new_priority": PRIORITY_WORDS[m.group("priority")]}
+            )
+    return None
+
+
+def route_message(message: str) -> Optional[Intent]:
+    """parse_intent + 计数，聊天路由用"""
+    intent = parse_intent(message)
+    if intent is None:
+        CHAT_ROUTED.inc("agent", "")
+    else:
+        CHAT_ROUTED.inc("fast", intent.tool)
+    return intent
+
+
+def load_corpus() -> List[dict]:
+    """标注语料：每行 {"text", "tool", "args"}，tool 为 null 表示应交给 Agent"""
+    with CORPUS_PATH.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
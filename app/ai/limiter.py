@@ -0,0 +1,116 @@
+"""
+AI 聊天准入控制：同时运行的 Agent 数有上限，超出的有界排队，队满或排队超时直接 429。
+
+Agent 全程 async（ainvoke / astream），等 LLM 时不占线程，所以上限保护的是
+上游 LLM 的并发配额和本进程内存，而不是线程池；CRUD 接口不受聊天数量影响。
+"""
+
+import asyncio
+import os
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque
+
+from fastapi import HTTPException, status
+
+from app.metrics import Counter, register, register_collector
+
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "16"))
+CHAT_QUEUE_SIZE = int(os.getenv("CHAT_QUEUE_SIZE", "64"))
+CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT_SECONDS", "30"))
+CHAT_RETRY_AFTER = os.getenv("CHAT_RETRY_AFTER", "5")
+
+CHAT_REJECTED = register(
+    Counter("taskflow_chat_rejected_total", "被准入控制拒绝（429）的聊天请求数", ("reason",))
+)
+
+
+def _too_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="AI 助手繁忙，请稍后重试",
+        headers={"Retry-After": CHAT_RETRY_AFTER},
+    )
+
+
+class ChatLimiter:
+    """
+    先到先得的计数信号量 + 有界等待队列。只在事件循环线程里使用（异步路由），
+    不用 asyncio.Semaphore 是为了不绑定某个事件循环（测试里每个客户端一个循环）。
+    排队数另记一个整数，进出队列时更新：/metrics 的收集器在线程池里读它，不去遍历会被并发修改的队列。
+    """
+
+    def __init__(self, max_concurrency: int, queue_size: int, queue_timeout: float):
+        self.max_concurrency = max(max_concurrency, 1)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self.queued = 0  # == len(self._waiters)
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def check_capacity(self):
+        """不占名额，运行和排队都满时立即 429（流式接口在发出响应头之前调用）"""
+        if self.running >= self.max_concurrency and self.queued >= self.queue_size:
+            CHAT_REJECTED.inc("queue_full")
+            raise _too_busy()
+
+    async def acquire(self):
+        if self.running < self.max_concurrency and not self.queued:
+            self.running += 1
+            return
+        if self.queued >= self.queue_size:
+            CHAT_REJECTED.inc("queue_full")
+            raise _too_busy()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            # release() 直接把名额转交给队头，running 不变
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            # 超时的同时 release() 刚把名额转交过来：同样要还回去，否则 running 永久少一个名额
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            CHAT_REJECTED.inc("queue_timeout")
+            raise _too_busy()
+        except asyncio.CancelledError:
+            # 名额已经转交过来但请求被取消（客户端断开），要还回去
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self.queued -= 1
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            self.queued -= 1
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.running -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+chat_limiter = ChatLimiter(CHAT_MAX_CONCURRENCY, CHAT_QUEUE_SIZE, CHAT_QUEUE_TIMEOUT)
+
+
+@register_collector
+def _chat_metrics():
+    return [
+        "# HELP taskflow_chat_running 正在运行的 Agent 数",
+        "# TYPE taskflow_chat_running gauge",
+        f"taskflow_chat_running {chat_limiter.running}",
+        "# HELP taskflow_chat_queued 排队等待运行的聊天请求数",
+        "# TYPE taskflow_chat_queued gauge",
+        f"taskflow_chat_queued {chat_limiter.queued}",
+    ]
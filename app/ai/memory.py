@@ -0,0 +1,213 @@
+"""
+对话记忆：每次调用模型前（create_react_agent 的 pre_model_hook）把历史控制在 token 预算内。
+
+- 预算内：系统提示词（带上之前的摘要）+ 全部历史原样发给模型
+- 超预算：在某条用户消息处切开，较早的部分让模型压缩进摘要，并从状态里删掉；
+  除去系统提示词和摘要的空间，保留最近约一半预算的轮次，另一半留给后面几轮增长，
+  不必每轮都做摘要
+- 摘要失败（LLM 出错）时退化成只截断发给模型的消息，状态不动，下一轮再试
+
+按用户消息切开，工具调用和它的结果不会被拆散。只有当前这一轮本身就超预算时
+（比如工具返回了很长的结果）才会超出，这时原样发送。
+
+token 用 tiktoken 计数；编码文件加载不了（离线环境）时退化成估算：
+中日韩字符每个算 1 个 token，其余每 4 个字符算 1 个，并打一条警告。
+"""
+
+import json
+import logging
+import os
+from functools import lru_cache
+from typing import Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AnyMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.runnables import RunnableLambda
+from langgraph.prebuilt.chat_agent_executor import AgentState
+from typing_extensions import NotRequired
+
+from app.ai.prompts import SUMMARY_PROMPT, SYSTEM_PROMPT
+
+logger = logging.getLogger("taskflow.ai")
+
+TIKTOKEN_ENCODING = os.getenv("TIKTOKEN_ENCODING", "cl100k_base")
+# 每次发给模型的历史（含系统提示词和摘要）上限，应明显大于提示词 + 摘要上限；工具定义是固定开销，不算在内
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "4000"))
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "400"))
+
+MESSAGE_OVERHEAD_TOKENS = 4  # 每条消息的角色、分隔符（OpenAI 的计数约定）
+TRANSCRIPT_MESSAGE_CHARS = 500  # 交给摘要的对话里，单条消息（主要是工具结果）最多带这么多字
+
+
+class ChatState(AgentState):
+    """Agent 状态多一个 summary：被压缩掉的早期对话，随检查点持久化"""
+
+    summary: NotRequired[str]
+
+
+# ── token 计数 ──
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(TIKTOKEN_ENCODING)
+    except Exception as e:  # 离线环境下载不了编码文件
+        logger.warning("tiktoken 编码 %s 加载失败，改用估算计数：%s", TIKTOKEN_ENCODING, e)
+        return None
+
+
+def _is_cjk(ch: str) -> bool:
+    return "⺀" <= ch <= "鿿" or "가" <= ch <= "힯" or "＀" <= ch <= "￯"
+
+
+def count_text_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    cjk = sum(map(_is_cjk, text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _message_text(message: AnyMessage) -> str:
+    content = message.content
+    if not isinstance(content, str):
+        content = "".join(
+            part if isinstance(part, str) else str(part.get("text", "")) for part in content
+        )
+    if isinstance(message, AIMessage) and message.tool_calls:
+        content += json.dumps(
+            [{"name": c["name"], "args": c["args"]} for c in message.tool_calls], ensure_ascii=False
+        )
+    return content
+
+
+def count_tokens(messages: Sequence[AnyMessage]) -> int:
+    return sum(MESSAGE_OVERHEAD_TOKENS + count_text_tokens(_message_text(m)) for m in messages)
+
+
+def _truncate_tokens(text: str, max_tokens: int) -> str:
+    encoding = _encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    while count_text_tokens(text) > max_tokens:
+        text = text[: len(text) * 9 // 10]
+    return text
+
+
+# ── 切分与摘要 ──
+
+
+def system_message(summary: str = "") -> SystemMessage:
+    if not summary:
+        return SystemMessage(SYSTEM_PROMPT)
+    return SystemMessage(f"{SYSTEM_PROMPT}\n## 之前对话的摘要\n{summary}\n")
+
+
+def split_history(messages: Sequence[AnyMessage], keep_tokens: int) -> int:
+    """
+    返回保留部分的起点：从这里开始的消息原样保留，之前的压缩进摘要。
+    起点总是某条用户消息；取放得进 keep_tokens 的最早一条，一条都放不进就取最后一条。
+    """
+    boundaries = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+    if not boundaries:
+        return 0
+    tail = 0
+    start = len(messages)
+    for i in range(len(messages) - 1, -1, -1):
+        tail += MESSAGE_OVERHEAD_TOKENS + count_text_tokens(_message_text(messages[i]))
+        if tail > keep_tokens:
+            break
+        start = i
+    candidates = [i for i in boundaries if i >= start]
+    return candidates[0] if candidates else boundaries[-1]
+
+
+def _transcript(messages: Sequence[AnyMessage]) -> str:
+    lines = []
+    for m in messages:
+        text = _message_text(m)[:TRANSCRIPT_MESSAGE_CHARS]
+        if isinstance(m, HumanMessage):
+            lines.append(f"用户：{text}")
+        elif isinstance(m, ToolMessage):
+            lines.append(f"工具 {m.name} 返回：{text}")
+        elif isinstance(m, AIMessage) and text:
+            lines.append(f"助手：{text}")
+    return "\n".join(lines)
+
+
+def _summary_request(summary: str, older: Sequence[AnyMessage]) -> list:
+    return [
+        SystemMessage(SUMMARY_PROMPT.format(max_tokens=CHAT_SUMMARY_MAX_TOKENS)),
+        HumanMessage(f"已有摘要：\n{summary or '（无）'}\n\n新增对话：\n{_transcript(older)}"),
+    ]
+
+
+def _finish_summary(result: AIMessage) -> str:
+    return _truncate_tokens(_message_text(result).strip(), CHAT_SUMMARY_MAX_TOKENS)
+
+
+def history_hook(model: BaseChatModel, token_budget: Optional[int] = None) -> RunnableLambda:
+    """
+    生成 pre_model_hook。每次都要返回 llm_input_messages：
+    它是图里的一个状态键，不返回的话模型会用上一次留下的旧值。
+    token_budget 为 0 表示不限（原样发送全部历史）。
+    """
+    budget = CHAT_HISTORY_TOKEN_BUDGET if token_budget is None else token_budget
+
+    def plan(state: dict):
+        messages = state["messages"]
+        summary = state.get("summary", "")
+        prompt = [system_message(summary), *messages]
+        if not budget or count_tokens(prompt) <= budget:
+            return None, {"llm_input_messages": prompt}
+        # 系统提示词和（上限长度的）摘要之外，近期对话只留一半，另一半留给后面几轮增长
+        reserved = count_tokens([system_message()]) + CHAT_SUMMARY_MAX_TOKENS
+        start = split_history(messages, max(budget - reserved, 0) // 2)
+        if start == 0:  # 当前这一轮本身就超预算，没有可压缩的早期对话
+            return None, {"llm_input_messages": prompt}
+        return start, {"llm_input_messages": [system_message(summary), *messages[start:]]}
+
+    def apply(state: dict, start: int, summary: str) -> dict:
+        messages = state["messages"]
+        return {
+            "summary": summary,
+            "messages": [RemoveMessage(id=m.id) for m in messages[:start]],
+            "llm_input_messages": [system_message(summary), *messages[start:]],
+        }
+
+    def hook(state: dict) -> dict:
+        start, trimmed = plan(state)
+        if start is None:
+            return trimmed
+        try:
+            result = model.invoke(_summary_request(state.get("summary", ""), state["messages"][:start]))
+        except Exception as e:
+            logger.warning("对话摘要失败，本次只截断历史：%s", e)
+            return trimmed
+        return apply(state, start, _finish_summary(result))
+
+    async def ahook(state: dict) -> dict:
+        start, trimmed = plan(state)
+        if start is None:
+            return trimmed
+        try:
+            result = await model.ainvoke(
+                _summary_request(state.get("summary", ""), state["messages"][:start])
+            )
+        except Exception as e:
+            logger.warning("对话摘要失败，本次只截断历史：%s", e)
+            return trimmed
+        return apply(state, start, _finish_summary(result))
+
+    return RunnableLambda(hook, afunc=ahook, name="history")
@@ -0,0 +1,142 @@
+"""
+周报缓存：键是 (用户, ISO 周, 用户任务数据版本号)。
+周报工具 get_completed_tasks_this_week 按同一个 ISO 周（周一 0 点起）取完成的任务，
+同一周内键不变、数据窗口也不变，缓存的报告和重新生成的一致。
+
+任务的任何写操作都会让版本号 +1（app.versions），之后的请求自然落到新键上、重新生成，
+所以不需要显式失效；写入新版本时顺手删掉同一用户同一周的旧条目。
+版本号在生成之前读取：生成期间任务有改动时，报告记在旧版本下，不会被当成新数据的结果。
+
+内存里是有界 LRU；WEEKLY_REPORT_CACHE_TABLE=1 时再落到 weeklyreport 表，
+重启和多 worker 之间共享（内存未命中时查表，命中后放回内存）。
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time
+from typing import NamedTuple, Optional, Tuple
+
+from sqlmodel import Session
+
+from app.metrics import Counter, register, register_collector
+from app.models import WeeklyReport
+
+WEEKLY_REPORT_CACHE_SIZE = int(os.getenv("WEEKLY_REPORT_CACHE_SIZE", "1024"))
+WEEKLY_REPORT_CACHE_TABLE = os.getenv("WEEKLY_REPORT_CACHE_TABLE", "0").lower() in ("1", "true", "yes")
+
+REPORT_CACHE_LOOKUPS = register(
+    Counter("taskflow_weekly_report_cache_total", "周报缓存查询次数（result=hit|miss，source=memory|table）", ("result", "source"))
+)
+LLM_CALLS_SAVED = register(
+    Counter("taskflow_weekly_report_llm_calls_saved_total", "周报缓存命中省下的 LLM 调用次数")
+)
+
+
+class CachedReport(NamedTuple):
+    report: str
+    llm_calls: int  # 生成这份周报用了几次 LLM 调用，命中时记为省下的次数
+
+
+def current_week(today: Optional[date] = None) -> str:
+    year, week, _ = (today or date.today()).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def week_start(today: Optional[date] = None) -> datetime:
+    """current_week 那一周的周一 0 点（本地时间，和 Task.updated_at 一致）"""
+    today = today or date.today()
+    return datetime.combine(date.fromordinal(today.toordinal() - today.weekday()), time.min)
+
+
+class ReportCache:
+    """LRU 部分照 TokenCache：OrderedDict + 锁（表查询在线程池里跑）"""
+
+    def __init__(self, maxsize: int, use_table: bool):
+        self.maxsize = maxsize
+        self.use_table = use_table
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[int, str, int], CachedReport]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key: Tuple[int, str, int], entry: CachedReport):
+        with self._lock:
+            user_id, week, _ = key
+            for old in [k for k in self._entries if k[:2] == (user_id, week) and k != key]:
+                del self._entries[old]
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _hit(self, source: str, entry: CachedReport) -> CachedReport:
+        with self._lock:
+            self.hits += 1
+        REPORT_CACHE_LOOKUPS.inc("hit", source)
+        LLM_CALLS_SAVED.inc(amount=entry.llm_calls)
+        return entry
+
+    def get(self, session: Session, user_id: int, week: str, version: int) -> Optional[CachedReport]:
+        if self.maxsize <= 0:
+            return None
+        key = (user_id, week, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None:
+            return self._hit("memory", entry)
+        if self.use_table:
+            row = session.get(WeeklyReport, (user_id, week))
+            if row is not None and row.version == version:
+                entry = CachedReport(row.report, row.llm_calls)
+                self._remember(key, entry)
+                return self._hit("table", entry)
+        with self._lock:
+            self.misses += 1
+        REPORT_CACHE_LOOKUPS.inc("miss", "table" if self.use_table else "memory")
+        return None
+
+    def put(self, session: Session, user_id: int, week: str, version: int, entry: CachedReport):
+        if self.maxsize <= 0:
+            return
+        self._remember((user_id, week, version), entry)
+        if self.use_table:
+            session.merge(
+                WeeklyReport(
+                    user_id=user_id, week=week, version=version, report=entry.report, llm_calls=entry.llm_calls
+                )
+            )
+            session.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+report_cache = ReportCache(WEEKLY_REPORT_CACHE_SIZE, WEEKLY_REPORT_CACHE_TABLE)
+
+
+@register_collector
+def _report_cache_metrics():
+    stats = report_cache.stats()
+    return [
+        "# HELP taskflow_weekly_report_cache_hit_ratio 周报缓存命中率（进程启动以来）",
+        "# TYPE taskflow_weekly_report_cache_hit_ratio gauge",
+        f"taskflow_weekly_report_cache_hit_ratio {stats['hit_rate']:.4f}",
+        "# TYPE taskflow_weekly_report_cache_entries gauge",
+        f"taskflow_weekly_report_cache_entries {stats['size']}",
+    ]
@@ -0,0 +1,72 @@
+"""
+AI 对话会话（ChatThread）的增删查。消息本身在检查点表里，这里只管会话归属和列表。
+会话不属于任务数据，不走 crud / 组提交，函数自己提交（prune_threads 除外，和 prune_tombstones 一样由调用方提交）。
+"""
+
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import delete
+from sqlmodel import Session, col, select
+
+from app.models import ChatCheckpoint, ChatCheckpointWrite, ChatThread
+
+THREAD_TITLE_CHARS = 30
+THREAD_LIST_LIMIT = 50
+PRUNE_BATCH = 500  # 每条 DELETE 的 IN 列表长度，远低于 SQLite 的变量个数上限
+
+
+def get_owned_thread(session: Session, user_id: int, thread_id: int) -> Optional[ChatThread]:
+    thread = session.get(ChatThread, thread_id)
+    if thread is None or thread.user_id != user_id:
+        return None
+    return thread
+
+
+def open_thread(session: Session, user_id: int, thread_id: Optional[int], message: str) -> Optional[int]:
+    """
+    开始一轮对话：没传 thread_id 就新建会话（标题取第一条消息开头），
+    传了就校验归属并刷新 updated_at。会话不存在或不属于该用户时返回 None。
+    """
+    if thread_id is None:
+        thread = ChatThread(user_id=user_id, title=message.strip()[:THREAD_TITLE_CHARS])
+    else:
+        thread = get_owned_thread(session, user_id, thread_id)
+        if thread is None:
+            return None
+        thread.updated_at = datetime.now()
+    session.add(thread)
+    session.commit()
+    return thread.id
+
+
+def list_threads(session: Session, user_id: int) -> List[ChatThread]:
+    return list(
+        session.exec(
+            select(ChatThread)
+            .where(ChatThread.user_id == user_id)
+            .order_by(col(ChatThread.updated_at).desc())
+            .limit(THREAD_LIST_LIMIT)
+        ).all()
+    )
+
+
+def _delete_threads(session: Session, ids: List[int]):
+    keys = [str(i) for i in ids]
+    for model in (ChatCheckpoint, ChatCheckpointWrite):
+        session.exec(delete(model).where(col(model.thread_id).in_(keys)))
+    session.exec(delete(ChatThread).where(col(ChatThread.id).in_(ids)))
+
+
+def delete_thread(session: Session, thread: ChatThread):
+    """会话和它的检查点在同一个事务里删掉"""
+    _delete_threads(session, [thread.id])
+    session.commit()
+
+
+def prune_threads(session: Session, before: datetime) -> int:
+    """删除 before 之后再没活跃过的会话及其检查点；返回删除的会话数（调用方 commit）"""
+    ids = list(session.exec(select(ChatThread.id).where(ChatThread.updated_at < before)).all())
+    for lo in range(0, len(ids), PRUNE_BATCH):
+        _delete_threads(session, ids[lo : lo + PRUNE_BATCH])
+    return len(ids)
@@ -3,13 +3,21 @@ Agent 工具集：每个工具对应一个任务操作。
 LLM 会根据函数名和 docstring 判断何时调用哪个工具。
 """
 
+import os
+from contextvars import ContextVar, Token
 from langchain_core.tools import tool
+from sqlalchemy import case, func
+from pydantic import BaseModel, Field
 from sqlmodel import Session, select
-from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 
+from app import crud, search
+from app.ai.memory import count_text_tokens
+from app.ai.report_cache import week_start
+from app.counters import get_summary
 from app.database import engine
-from app.models import Task
+from app.models import Priority, Task, TaskStatus
+from app.writer import run_write
 
 
 def _get_session():
@@ -17,14 +25,26 @@ def _get_session():
     return Session(engine)
 
 
-# ── 全局变量：记录当前用户 ID（由 chat 路由设置）──
-_current_user_id: int = 0
+# ── 当前用户 ID：按请求绑定在 contextvar 上（由 agent 入口设置）──
+# 并发的聊天各用各的；LangChain 把同步工具放进线程池执行时会复制 context，工具里读得到
+_current_user_id: ContextVar[int] = ContextVar("current_user_id", default=0)
 
 
-def set_current_user_id(user_id: int):
-    """在每次聊天请求时设置当前用户"""
-    global _current_user_id
-    _current_user_id = user_id
+def set_current_user_id(user_id: int) -> Token:
+    """为当前请求（当前 context）设置操作用户，返回的 token 可用于 reset"""
+    return _current_user_id.set(user_id)
+
+
+def current_user_id() -> int:
+    return _current_user_id.get()
+
+
+def _invalid_choice(label: str, value: str, choices) -> Optional[str]:
+    """单个任务的工具参数是普通字符串（模型可能写错），写库前对照枚举校验；合法返回 None"""
+    allowed = [c.value for c in choices]
+    if value in allowed:
+        return None
+    return f"❌ 不支持的{label}：{value}（可选：{' / '.join(allowed)}）"
 
 
 @tool
@@ -40,70 +60,186 @@ def create_task(
         description: 任务描述（可选）
         priority: 优先级，可选值：low / medium / high / urgent
     """
+    error = _invalid_choice("优先级", priority, Priority)
+    if error:
+        return error
     with _get_session() as session:
-        task = Task(
+        task = run_write(
+            session,
+            crud.create_task,
+            current_user_id(),
             title=title,
             description=description or None,
             priority=priority,
-            status="todo",
-            user_id=_current_user_id,
         )
-        session.add(task)
-        session.commit()
-        session.refresh(task)
         return f"✅ 已创建任务 [ID:{task.id}] {task.title}（优先级：{task.priority}）"
 
 
+# ── 列表类工具的输出控制 ──
+# 工具结果会原样进入提示词：默认只给一页，再按 token 预算截断，并告诉模型省略了多少、怎么翻页
+TOOL_LIST_DEFAULT_LIMIT = int(os.getenv("TOOL_LIST_DEFAULT_LIMIT", "20"))
+TOOL_LIST_MAX_LIMIT = int(os.getenv("TOOL_LIST_MAX_LIMIT", "100"))
+TOOL_OUTPUT_TOKEN_BUDGET = int(os.getenv("TOOL_OUTPUT_TOKEN_BUDGET", "1500"))
+TOOL_TITLE_MAX_CHARS = int(os.getenv("TOOL_TITLE_MAX_CHARS", "60"))
+
+_PRIORITY_RANK = case(
+    (Task.priority == "urgent", 0),
+    (Task.priority == "high", 1),
+    (Task.priority == "medium", 2),
+    (Task.priority == "low", 3),
+    else_=4,
+)
+_ORDERINGS = {
+    "updated": (Task.updated_at.desc(), Task.id.desc()),
+    "created": (Task.created_at.desc(), Task.id.desc()),
+    "priority": (_PRIORITY_RANK, Task.updated_at.desc(), Task.id.desc()),
+}
+ROW_HEADER = "id|标题|状态|优先级|更新"
+_ROW_COLUMNS = (Task.id, Task.title, Task.status, Task.priority, Task.updated_at)  # 不取描述
+
+
+def _row(task) -> str:
+    """紧凑行：id|标题|状态|优先级|更新日期，标题过长截断"""
+    title = task.title.replace("|", "/").replace("\n", " ")
+    if len(title) > TOOL_TITLE_MAX_CHARS:
+        title = title[: TOOL_TITLE_MAX_CHARS - 1] + "…"
+    return f"{task.id}|{title}|{task.status}|{task.priority}|{task.updated_at.strftime('%m-%d')}"
+
+
+def _page_args(limit: Optional[int], offset: int) -> tuple:
+    limit = TOOL_LIST_DEFAULT_LIMIT if not limit or limit < 1 else min(limit, TOOL_LIST_MAX_LIMIT)
+    return limit, max(offset or 0, 0)
+
+
+def _render_page(head: str, tasks: list, total: int, offset: int) -> str:
+    """表头 + 行，超出 TOOL_OUTPUT_TOKEN_BUDGET 就停；末尾注明省略了几条、下一页的 offset"""
+    lines = [head, ROW_HEADER]
+    used = count_text_tokens("\n".join(lines))
+    budget = TOOL_OUTPUT_TOKEN_BUDGET - 40  # 给末尾的提示留位置
+    for task in tasks:
+        row = _row(task)
+        cost = count_text_tokens(row) + 1
+        if TOOL_OUTPUT_TOKEN_BUDGET > 0 and used + cost > budget and len(lines) > 2:
+            break
+        lines.append(row)
+        used += cost
+    shown = len(lines) - 2
+    omitted = total - offset - shown
+    if omitted > 0:
+        lines.append(
+            f"（还有 {omitted} 个未显示：用 offset={offset + shown} 翻页，或加状态 / 优先级筛选缩小范围）"
+        )
+    return "\n".join(lines)
+
+
 @tool
 def list_tasks(
     status_filter: Optional[str] = None,
+    priority_filter: Optional[str] = None,
+    order_by: str = "updated",
+    limit: Optional[int] = None,
+    offset: int = 0,
 ) -> str:
-    """查看当前用户的任务列表。
+    """分页查看当前用户的任务列表，每行格式：id|标题|状态|优先级|更新日期。
+
+    只想知道数量时用 get_task_summary，不要翻完整个列表。
 
     Args:
-        status_filter: 可选的状态筛选，可选值：todo / in_progress / done / cancelled。不传则返回全部。
+        status_filter: 可选的状态筛选，可选值：todo / in_progress / done / cancelled。不传则不限。
+        priority_filter: 可选的优先级筛选，可选值：low / medium / high / urgent。不传则不限。
+        order_by: 排序方式：updated（最近更新在前，默认）/ created（最近创建在前）/ priority（紧急在前）
+        limit: 每页条数，默认 20，最多 100
+        offset: 跳过前多少条，用于翻页，默认 0
     """
+    ordering = _ORDERINGS.get(order_by)
+    if ordering is None:
+        return f"❌ 不支持的排序方式：{order_by}（可选：{' / '.join(_ORDERINGS)}）"
+    limit, offset = _page_args(limit, offset)
     with _get_session() as session:
-        query = select(Task).where(Task.user_id == _current_user_id)
+        conditions = [Task.user_id == current_user_id()]
         if status_filter:
-            query = query.where(Task.status == status_filter)
-        tasks = session.exec(query).all()
-
-        if not tasks:
+            conditions.append(Task.status == status_filter)
+        if priority_filter:
+            conditions.append(Task.priority == priority_filter)
+        total = session.exec(select(func.count()).select_from(Task).where(*conditions)).one()
+        if total == 0:
             return "📭 没有找到符合条件的任务。"
-
-        lines = []
-        for t in tasks:
-            icon = {
-                "todo": "⬜",
-                "in_progress": "🔵",
-                "done": "✅",
-                "cancelled": "❌",
-            }.get(t.status, "•")
-            lines.append(
-                f"{icon} [ID:{t.id}] {t.title} | 优先级:{t.priority} | 状态:{t.status}"
-            )
-        return "\n".join(lines)
+        tasks = session.exec(
+            select(*_ROW_COLUMNS).where(*conditions).order_by(*ordering).offset(offset).limit(limit)
+        ).all()
+        if not tasks:
+            return f"📭 共 {total} 个任务，offset={offset} 之后没有更多了。"
+        return _render_page(f"共 {total} 个任务，第 {offset + 1} 个起：", tasks, total, offset)
 
 
 @tool
-def get_completed_tasks_this_week() -> str:
-    """获取本周（最近7天）完成的任务列表，用于生成周报。"""
+def get_completed_tasks_this_week(
+    priority_filter: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> str:
+    """获取本周（周一起）完成的任务，用于生成周报：先给总数和各优先级数量，再分页列出（最近完成在前）。
+
+    Args:
+        priority_filter: 可选的优先级筛选，可选值：low / medium / high / urgent
+        limit: 每页条数，默认 20，最多 100
+        offset: 跳过前多少条，用于翻页，默认 0
+    """
+    limit, offset = _page_args(limit, offset)
     with _get_session() as session:
-        week_ago = datetime.now() - timedelta(days=7)
-        query = select(Task).where(
-            Task.user_id == _current_user_id,
+        # 和周报缓存键同一个 ISO 周：按周缓存的报告在这一周内都对得上
+        conditions = [
+            Task.user_id == current_user_id(),
             Task.status == "done",
-            Task.updated_at >= week_ago,
+            Task.updated_at >= week_start(),
+        ]
+        by_priority = dict(
+            session.exec(
+                select(Task.priority, func.count()).where(*conditions).group_by(Task.priority)
+            ).all()
         )
-        tasks = session.exec(query).all()
-        if not tasks:
+        if not by_priority:
             return "本周没有已完成的任务。"
-        lines = [
-            f"- {t.title} (优先级:{t.priority}, 完成于:{t.updated_at.strftime('%m-%d')})"
-            for t in tasks
-        ]
-        return "本周完成的任务：\n" + "\n".join(lines)
+        if priority_filter:
+            conditions.append(Task.priority == priority_filter)
+        total = by_priority.get(priority_filter, 0) if priority_filter else sum(by_priority.values())
+        counts = " / ".join(f"{p} {by_priority[p]}" for p in ("urgent", "high", "medium", "low") if p in by_priority)
+        head = f"本周完成的任务：共 {sum(by_priority.values())} 个（{counts}）"
+        tasks = session.exec(
+            select(*_ROW_COLUMNS).where(*conditions).order_by(*_ORDERINGS["updated"]).offset(offset).limit(limit)
+        ).all()
+        if not tasks:
+            return f"{head}\n（offset={offset} 之后没有更多了）"
+        return _render_page(head, tasks, total, offset)
+
+
+@tool
+def search_tasks(
+    query: str,
+    status_filter: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> str:
+    """按关键词在标题和描述里搜索当前用户的任务，最相关的在前，每行格式：id|标题|状态|优先级|更新日期。
+
+    用户提到某个具体任务（"周报那个任务"、"登录 bug"）要找它的 ID 时用它，不要翻 list_tasks。
+
+    Args:
+        query: 关键词，多个词用空格分隔，须同时出现；尽量用 3 个字以上的词
+        status_filter: 可选的状态筛选，可选值：todo / in_progress / done / cancelled
+        limit: 每页条数，默认 20，最多 100
+        offset: 跳过前多少条，用于翻页，默认 0
+    """
+    limit, offset = _page_args(limit, offset)
+    with _get_session() as session:
+        tasks, total = search.search_tasks(
+            session, current_user_id(), query, status_filter, limit, offset, columns=_ROW_COLUMNS
+        )
+    if total == 0:
+        return f"📭 没有找到包含「{query}」的任务。"
+    if not tasks:
+        return f"📭 共 {total} 个匹配，offset={offset} 之后没有更多了。"
+    return _render_page(f"搜索「{query}」：共 {total} 个匹配，第 {offset + 1} 个起：", tasks, total, offset)
 
 
 @tool
@@ -121,46 +257,125 @@ def update_task(
         new_priority: 新优先级，可选值：low / medium / high / urgent
         new_title: 新标题
     """
+    error = (new_status and _invalid_choice("状态", new_status, TaskStatus)) or (
+        new_priority and _invalid_choice("优先级", new_priority, Priority)
+    )
+    if error:
+        return error
     with _get_session() as session:
-        task = session.get(Task, task_id)
-        if not task or task.user_id != _current_user_id:
-            return f"❌ 找不到 ID 为 {task_id} 的任务"
-
+        updates = {}
         changes = []
         if new_status:
-            task.status = new_status
+            updates["status"] = new_status
             changes.append(f"状态→{new_status}")
         if new_priority:
-            task.priority = new_priority
+            updates["priority"] = new_priority
             changes.append(f"优先级→{new_priority}")
         if new_title:
-            task.title = new_title
+            updates["title"] = new_title
             changes.append(f"标题→{new_title}")
 
-        task.updated_at = datetime.now()
-        session.add(task)
-        session.commit()
+        task = run_write(session, crud.update_task_by_id, current_user_id(), task_id, updates)
+        if task is None:
+            return f"❌ 找不到 ID 为 {task_id} 的任务"
         return f"✅ 已更新任务 [ID:{task_id}]：{', '.join(changes)}"
 
 
+# ── 批量工具：一次调用、一个事务处理多个任务，省掉逐个调用的 LLM 往返 ──
+TOOL_BATCH_MAX_ITEMS = int(os.getenv("TOOL_BATCH_MAX_ITEMS", "50"))
+
+
+class NewTask(BaseModel):
+    title: str = Field(min_length=1, max_length=200, description="任务标题")
+    description: str = Field(default="", description="任务描述（可选）")
+    priority: Priority = Field(default=Priority.medium, description="优先级")
+
+
+class TaskChange(BaseModel):
+    task_id: int = Field(description="要更新的任务 ID")
+    new_status: Optional[TaskStatus] = Field(default=None, description="新状态")
+    new_priority: Optional[Priority] = Field(default=None, description="新优先级")
+    new_title: Optional[str] = Field(default=None, min_length=1, max_length=200, description="新标题")
+
+
+def _change_text(changes: dict) -> str:
+    labels = {"status": "状态", "priority": "优先级", "title": "标题"}
+    return ", ".join(f"{labels[k]}→{v}" for k, v in changes.items())
+
+
+@tool
+def create_tasks(tasks: List[NewTask]) -> str:
+    """一次创建多个任务（在一个事务里完成）。用户一次要加两个及以上任务时用它，不要逐个调用 create_task。
+
+    Args:
+        tasks: 要创建的任务列表，每项包含 title（必填）、description、priority
+    """
+    if not tasks:
+        return "❌ 没有要创建的任务"
+    if len(tasks) > TOOL_BATCH_MAX_ITEMS:
+        return f"❌ 一次最多创建 {TOOL_BATCH_MAX_ITEMS} 个任务，请分批"
+    rows = [
+        {
+            "title": t.title,
+            "description": t.description or None,
+            "priority": t.priority.value,
+            "status": TaskStatus.todo.value,
+        }
+        for t in tasks
+    ]
+    with _get_session() as session:
+        created = run_write(session, crud.bulk_create_tasks, current_user_id(), rows)
+    items = "；".join(f"[ID:{t['id']}] {t['title']}（{t['priority']}）" for t in created)
+    return f"✅ 已创建 {len(created)} 个任务：{items}"
+
+
+@tool
+def update_tasks(updates: List[TaskChange]) -> str:
+    """一次更新多个任务的状态、优先级或标题（在一个事务里完成）。
+    涉及两个及以上任务时用它（例如"把这几个都标记为完成"），不要逐个调用 update_task。
+
+    Args:
+        updates: 改动列表，每项包含 task_id（必填）和 new_status / new_priority / new_title 中要改的字段
+    """
+    if len(updates) > TOOL_BATCH_MAX_ITEMS:
+        return f"❌ 一次最多更新 {TOOL_BATCH_MAX_ITEMS} 个任务，请分批"
+    items: dict = {}  # 同一任务出现多次时合并改动，后面的覆盖前面的
+    for u in updates:
+        changes = {
+            key: val.value if hasattr(val, "value") else val
+            for key, val in (("status", u.new_status), ("priority", u.new_priority), ("title", u.new_title))
+            if val is not None
+        }
+        if changes:
+            items[u.task_id] = {**items.get(u.task_id, {}), **changes}
+    if not items:
+        return "❌ 没有要更新的内容"
+    with _get_session() as session:
+        updated, missing = run_write(session, crud.bulk_update_tasks, current_user_id(), list(items.items()))
+
+    groups: dict = {}  # 改动相同的任务合成一行
+    for task_id in updated:
+        groups.setdefault(_change_text(items[task_id]), []).append(str(task_id))
+    lines = [f"✅ 已更新 {len(updated)} 个任务："] if updated else []
+    lines += [f"- ID {', '.join(ids)}：{text}" for text, ids in groups.items()]
+    if missing:
+        lines.append(f"❌ 找不到这些 ID 的任务：{', '.join(map(str, missing))}")
+    return "\n".join(lines)
+
+
 @tool
 def get_task_summary() -> str:
     """获取当前用户的任务统计摘要。无需参数。"""
     with _get_session() as session:
-        tasks = session.exec(select(Task).where(Task.user_id == _current_user_id)).all()
-        total = len(tasks)
-        if total == 0:
+        summary = get_summary(session, current_user_id())
+        if summary.total == 0:
             return "📊 你还没有任何任务。"
 
-        status_count = {}
-        priority_count = {}
-        for t in tasks:
-            status_count[t.status] = status_count.get(t.status, 0) + 1
-            priority_count[t.priority] = priority_count.get(t.priority, 0) + 1
-
-        lines = [f"📊 任务总计：{total} 个"]
-        for s, c in status_count.items():
-            lines.append(f"  - {s}: {c} 个")
-        for p, c in priority_count.items():
-            lines.append(f"  - {p}优先级: {c} 个")
+        lines = [f"📊 任务总计：{summary.total} 个"]
+        for s, c in summary.by_status.items():
+            if c:
+                lines.append(f"  - {s}: {c} 个")
+        for p, c in summary.by_priority.items():
+            if c:
+                lines.append(f"  - {p}优先级: {c} 个")
         return "\n".join(lines)
@@ -0,0 +1,313 @@
+"""
+Agent 观测：每次 Agent 调用挂一个 AgentTracer（LangChain 回调），记录每次模型调用和工具调用的 span。
+
+- 模型调用：起止时间、首 token 时间（流式）、提示词 / 生成 token 数（接口没返回 usage 时按 app.ai.memory 估算）
+- 工具调用：起止时间、参数、结果大小、期间的 SQL 耗时和条数（取本请求 RequestStats 的增量；
+  同一步并行的几个工具会互相算进对方的 SQL，只是近似）
+
+span 结束时立刻汇总进 /metrics 的直方图，不留在内存里；设置 AGENT_TRACE_FILE 时，
+每次调用结束再把完整的 span 列表作为一行 JSON 追加到文件（AGENT_TRACE_SAMPLE 按比例抽样）：
+事件循环只把记录放进有界队列，编码和写盘由 TraceWriter 的线程做，磁盘再慢也不会卡住别的协程，
+队列满时丢掉这条轨迹并计数。
+本请求的模型 / 工具总耗时也记进 RequestStats，随 Server-Timing 响应头返回。
+
+回调以 run_inline 方式在事件循环里同步执行，每个 span 只有几次 perf_counter 和一次直方图写入，可以常开。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.ai.memory import count_text_tokens, count_tokens
+from app.metrics import Counter, Histogram, current_request_stats, register
+
+AGENT_TRACE_FILE = os.getenv("AGENT_TRACE_FILE", "")
+AGENT_TRACE_SAMPLE = float(os.getenv("AGENT_TRACE_SAMPLE", "1"))
+TRACE_ARGS_CHARS = 500  # 轨迹里工具参数最多保留这么长
+TRACE_QUEUE_SIZE = 1000  # 等待写盘的轨迹条数上限
+
+logger = logging.getLogger("taskflow.ai")
+
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+SIZE_BUCKETS = (100, 300, 1000, 3000, 10000, 30000, 100000)
+STEP_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15, 20)
+
+AGENT_RUN_SECONDS = register(
+    Histogram("taskflow_agent_run_duration_seconds", "一次 Agent 调用（一条聊天消息 / 一份周报）的总耗时", ("entry", "status"))
+)
+AGENT_STEPS = register(
+    Histogram("taskflow_agent_steps", "每次 Agent 调用的对话模型调用次数（ReAct 步数）", ("entry",), buckets=STEP_BUCKETS)
+)
+LLM_CALL_SECONDS = register(
+    Histogram("taskflow_llm_call_duration_seconds", "单次模型调用耗时（node=agent 对话 / pre_model_hook 摘要）", ("model", "node", "status"))
+)
+LLM_FIRST_TOKEN_SECONDS = register(
+    Histogram("taskflow_llm_first_token_seconds", "流式模型调用的首 token 延迟", ("model",))
+)
+LLM_PROMPT_TOKENS = register(
+    Histogram("taskflow_llm_prompt_tokens", "单次模型调用的提示词 token 数", ("model",), buckets=TOKEN_BUCKETS)
+)
+LLM_TOKENS = register(
+    Counter("taskflow_llm_tokens_total", "模型 token 用量（kind=prompt|completion）", ("model", "kind"))
+)
+TOOL_CALL_SECONDS = register(
+    Histogram("taskflow_tool_call_duration_seconds", "单次工具调用耗时", ("tool", "status"))
+)
+TOOL_DB_SECONDS = register(
+    Histogram("taskflow_tool_db_duration_seconds", "单次工具调用期间的 SQL 耗时", ("tool",))
+)
+TOOL_RESULT_CHARS = register(
+    Histogram("taskflow_tool_result_chars", "工具结果的字符数（会原样进入提示词）", ("tool",), buckets=SIZE_BUCKETS)
+)
+
+TRACES_DROPPED = register(
+    Counter("taskflow_agent_traces_dropped_total", "写盘跟不上、队列满时丢掉的 Agent 轨迹条数")
+)
+
+
+class TraceWriter:
+    """轨迹文件的写线程（照 app.writer 的组提交线程）：按需启动，队列空时才 flush，一批只落盘一次"""
+
+    def __init__(self, maxsize: int = TRACE_QUEUE_SIZE):
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def write(self, record: dict):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            TRACES_DROPPED.inc()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="taskflow-agent-trace", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """写完已排队的轨迹、关闭文件（关闭应用时调用）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._queue.put(None)
+                self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        file = None
+        try:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    return
+                try:
+                    if file is None:
+                        file = open(AGENT_TRACE_FILE, "a", encoding="utf-8")
+                    file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                    if self._queue.empty():
+                        file.flush()
+                except OSError as e:  # 轨迹写不进去不影响聊天
+                    logger.warning("写 Agent 轨迹失败：%s", e)
+        finally:
+            if file is not None:
+                file.close()
+
+
+trace_writer = TraceWriter()
+
+
+def _usage(response) -> Optional[tuple]:
+    """(prompt, completion) token 数；接口没给 usage（或给的全是 0）时返回 None"""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage and usage.get("input_tokens"):
+                return usage["input_tokens"], usage.get("output_tokens", 0)
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    if token_usage.get("prompt_tokens"):
+        return token_usage["prompt_tokens"], token_usage.get("completion_tokens", 0)
+    return None
+
+
+def _generated_text(response) -> str:
+    return "".join(g.text for generations in response.generations for g in generations)
+
+
+class AgentTracer(BaseCallbackHandler):
+    """
+    一次 Agent 调用一个实例：
+        with AgentTracer("chat", user_id, thread_id) as tracer:
+            await agent.ainvoke(input, tracer.attach(config))
+    """
+
+    run_inline = True  # 异步运行时也直接在事件循环里调用，不丢进线程池
+    # 只关心模型和工具；图里每个节点、每个 Runnable 的 chain 事件都跳过，省掉绝大部分回调分发
+    # （ignore_agent 不能开：LangChain 的工具事件也按它过滤）
+    ignore_chain = True
+    ignore_retriever = True
+    ignore_retry = True
+    ignore_custom_event = True
+
+    def __init__(self, entry: str, user_id: int, thread_id: Optional[int] = None):
+        self.entry = entry
+        self.user_id = user_id
+        self.thread_id = thread_id
+        self.steps = 0
+        self.status = "ok"
+        self._open: Dict[UUID, dict] = {}
+        self._keep = bool(AGENT_TRACE_FILE) and random.random() < AGENT_TRACE_SAMPLE
+        self.spans: List[dict] = []  # 只在要写轨迹时保留
+        self._stats = current_request_stats()
+
+    def attach(self, config: Optional[dict] = None) -> dict:
+        config = dict(config or {})
+        config["callbacks"] = [*(config.get("callbacks") or []), self]
+        return config
+
+    def __enter__(self) -> "AgentTracer":
+        self._started_at = datetime.now()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish(self.status)
+        elif issubclass(exc_type, (GeneratorExit, asyncio.CancelledError)):
+            self.finish("cancelled")  # 流式连接中途断开
+        else:
+            self.finish("error")
+
+    # ── 模型调用 ──
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, invocation_params=None, **kwargs):
+        metadata = metadata or {}
+        params = invocation_params or {}
+        self._open[run_id] = {
+            "kind": "llm",
+            "name": metadata.get("ls_model_name") or params.get("model") or params.get("model_name") or "unknown",
+            "node": metadata.get("langgraph_node", ""),
+            "start": time.perf_counter(),
+            "messages": messages[0] if messages else [],
+        }
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        span = self._open.get(run_id)
+        if span is not None and "first_token" not in span:
+            span["first_token"] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        span = self._open.pop(run_id, None)
+        if span is None:
+            return
+        usage = _usage(response)
+        if usage is None:
+            usage = (count_tokens(span["messages"]), count_text_tokens(_generated_text(response)))
+            span["estimated"] = True
+        span["prompt_tokens"], span["completion_tokens"] = usage
+        self._end_llm(span, "ok")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        span = self._open.pop(run_id, None)
+        if span is not None:
+            span["error"] = type(error).__name__
+            self._end_llm(span, "error")
+
+    def _end_llm(self, span: dict, status: str):
+        end = time.perf_counter()
+        duration = end - span["start"]
+        model, node = span["name"], span["node"]
+        LLM_CALL_SECONDS.observe(duration, model, node, status)
+        if "first_token" in span:
+            LLM_FIRST_TOKEN_SECONDS.observe(span["first_token"] - span["start"], model)
+        if "prompt_tokens" in span:
+            LLM_PROMPT_TOKENS.observe(span["prompt_tokens"], model)
+            LLM_TOKENS.inc(model, "prompt", amount=span["prompt_tokens"])
+            LLM_TOKENS.inc(model, "completion", amount=span["completion_tokens"])
+        if node == "agent":
+            self.steps += 1
+        if self._stats is not None:
+            self._stats.llm_time += duration
+            self._stats.llm_calls += 1
+        if self._keep:
+            record = {k: v for k, v in span.items() if k not in ("messages", "start", "first_token")}
+            if "first_token" in span:
+                record["first_token_ms"] = round((span["first_token"] - span["start"]) * 1000, 2)
+            self._keep_span(record, span["start"], end, status)
+
+    # ── 工具调用 ──
+    def on_tool_start(self, serialized, input_str, *, run_id, inputs=None, **kwargs):
+        span = {"kind": "tool", "name": (serialized or {}).get("name") or kwargs.get("name") or "unknown"}
+        if self._keep:
+            args = inputs if inputs is not None else input_str
+            text = args if isinstance(args, str) else json.dumps(args, ensure_ascii=False, default=str)
+            span["args_chars"] = len(text)
+            span["args"] = args if len(text) <= TRACE_ARGS_CHARS else text[:TRACE_ARGS_CHARS] + "…"
+        if self._stats is not None:
+            span["db_start"] = (self._stats.db_time, self._stats.query_count)
+        span["start"] = time.perf_counter()
+        self._open[run_id] = span
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        span = self._open.pop(run_id, None)
+        if span is not None:
+            span["result_chars"] = len(str(getattr(output, "content", output)))
+            self._end_tool(span, "ok")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        span = self._open.pop(run_id, None)
+        if span is not None:
+            span["error"] = type(error).__name__
+            self._end_tool(span, "error")
+
+    def _end_tool(self, span: dict, status: str):
+        end = time.perf_counter()
+        duration = end - span["start"]
+        name = span["name"]
+        TOOL_CALL_SECONDS.observe(duration, name, status)
+        if "result_chars" in span:
+            TOOL_RESULT_CHARS.observe(span["result_chars"], name)
+        if "db_start" in span:
+            db_time, queries = span.pop("db_start")
+            span["db_ms"] = round((self._stats.db_time - db_time) * 1000, 2)
+            span["db_queries"] = self._stats.query_count - queries
+            TOOL_DB_SECONDS.observe(span["db_ms"] / 1000, name)
+        if self._stats is not None:
+            self._stats.tool_time += duration
+            self._stats.tool_calls += 1
+        if self._keep:
+            self._keep_span({k: v for k, v in span.items() if k != "start"}, span["start"], end, status)
+
+    def _keep_span(self, record: dict, start: float, end: float, status: str):
+        record["start_ms"] = round((start - self._start) * 1000, 2)
+        record["duration_ms"] = round((end - start) * 1000, 2)
+        record["status"] = status
+        self.spans.append(record)
+
+    # ── 收尾 ──
+    def finish(self, status: str = "ok"):
+        duration = time.perf_counter() - self._start
+        AGENT_RUN_SECONDS.observe(duration, self.entry, status)
+        AGENT_STEPS.observe(self.steps, self.entry)
+        if self._keep:
+            trace_writer.write(
+                {
+                    "ts": self._started_at.isoformat(timespec="milliseconds"),
+                    "entry": self.entry,
+                    "user_id": self.user_id,
+                    "thread_id": self.thread_id,
+                    "status": status,
+                    "duration_ms": round(duration * 1000, 2),
+                    "steps": self.steps,
+                    "spans": self.spans,
+                }
+            )
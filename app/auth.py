@@ -1,17 +1,27 @@
 """认证模块：密码加密 + JWT Token"""
 
+import asyncio
+import multiprocessing
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from dotenv import load_dotenv
 
-from app.database import get_session
+from app.database import get_async_session, get_session
+from app.metrics import register_collector
 from app.models import User
 
 load_dotenv()
@@ -19,6 +29,11 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "change-me")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "4096"))  # 0 表示关闭
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))  # 0 表示在线程池里算
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+PASSWORD_HASH_RETRY_AFTER = os.getenv("PASSWORD_HASH_RETRY_AFTER", "1")
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login")
@@ -32,6 +47,81 @@ def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
 
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="服务繁忙，请稍后重试",
+        headers={"Retry-After": PASSWORD_HASH_RETRY_AFTER},
+    )
+
+
+class PasswordHasher:
+    """
+    把 bcrypt 放到独立进程池里算，异步路由 await 结果，不占 Starlette 的线程池。
+    正在算 + 排队的总数有上限，满了直接 503 + Retry-After，避免登录风暴拖垮其他接口。
+    有 worker 意外退出（OOM、被 kill）时整个进程池不可再用，换一个新池重试一次。
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + queue_size)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn：子进程不继承父进程里的线程和锁，Windows / macOS 行为一致
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        """丢掉坏掉的池；并发请求可能已经换过新池，只在还是同一个池时才清掉"""
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _in_pool(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        for _ in range(2):  # 坏池换新池后重试一次
+            pool = self._get_pool()
+            try:
+                return await loop.run_in_executor(pool, fn, *args)
+            except BrokenProcessPool:
+                self._discard_pool(pool)
+        raise _busy()
+
+    async def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise _busy()
+        try:
+            if self.workers <= 0:
+                return await run_in_threadpool(fn, *args)
+            return await self._in_pool(fn, *args)
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain: str, hashed: str) -> bool:
+        return await self._run(verify_password, plain, hashed)
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=EXPIRE_MINUTES))
@@ -39,29 +129,135 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    session: Session = Depends(get_session),
-) -> User:
-    """从 Token 中解析出当前用户"""
-    credentials_exception = HTTPException(
+class TokenCache:
+    """
+    已验证 token → 用户快照 的 LRU + TTL 缓存。
+    条目最晚在 token 的 exp 失效；同步路由跑在线程池里，所有操作持锁。
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, token: str, snapshot: dict, exp: float):
+        if self.maxsize <= 0:
+            return
+        deadline = min(time.time() + self.ttl, exp)
+        with self._lock:
+            self._entries[token] = (deadline, snapshot)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        """用户信息变化（如重置密码）时清掉该用户的所有 token"""
+        with self._lock:
+            for token in [t for t, (_, u) in self._entries.items() if u["id"] == user_id]:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+token_cache = TokenCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+
+@register_collector
+def _token_cache_metrics():
+    stats = token_cache.stats()
+    return [
+        "# TYPE taskflow_auth_cache_hits_total counter",
+        f"taskflow_auth_cache_hits_total {stats['hits']}",
+        "# TYPE taskflow_auth_cache_misses_total counter",
+        f"taskflow_auth_cache_misses_total {stats['misses']}",
+        "# TYPE taskflow_auth_cache_entries gauge",
+        f"taskflow_auth_cache_entries {stats['size']}",
+    ]
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Token 无效或已过期",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def decode_token(token: str) -> Tuple[int, float]:
+    """校验 JWT，返回 (user_id, exp 时间戳)"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         sub = payload.get("sub")
         if sub is None:
-            raise credentials_exception
+            raise _credentials_exception()
         try:
             user_id = int(sub)
         except (TypeError, ValueError):
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    return user_id, float(payload.get("exp", 0))
+
 
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    session: Session = Depends(get_session),
+) -> User:
+    """从 Token 中解析出当前用户；命中缓存时不解码、不查库"""
+    snapshot = token_cache.get(token)
+    if snapshot is not None:
+        return User(**snapshot)
+
+    user_id, exp = decode_token(token)
     user = session.get(User, user_id)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    token_cache.put(token, user.model_dump(), exp)
+    return user
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_async_session),
+) -> User:
+    """get_current_user 的 AsyncSession 版本，共用同一个 token 缓存"""
+    snapshot = token_cache.get(token)
+    if snapshot is not None:
+        return User(**snapshot)
+
+    user_id, exp = decode_token(token)
+    user = await session.get(User, user_id)
+    if user is None:
+        raise _credentials_exception()
+    token_cache.put(token, user.model_dump(), exp)
     return user
@@ -0,0 +1,97 @@
+"""
+运维命令行：python -m app.cli <命令>
+
+  reconcile-counters [--dry-run]   从任务表重建计数表并报告漂移
+  prune-tombstones [--days N]      清理 N 天前的删除墓碑（默认 30）
+  rebuild-search [--check]         从任务表重建全文搜索索引（--check 只检查是否一致）
+  prune-threads [--days N]         清理 N 天没有活跃的 AI 对话会话及其历史（默认 90）
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+from app.ai.threads import prune_threads
+from app.counters import reconcile_counters
+from app.database import create_db, engine
+from app.search import check_search_index, rebuild_search_index
+from app.versions import prune_tombstones
+
+
+def cmd_reconcile_counters(args) -> int:
+    with Session(engine) as session:
+        drift = reconcile_counters(session, fix=not args.dry_run)
+        if not args.dry_run:
+            session.commit()
+    for d in drift:
+        print(
+            f"user={d['user_id']} status={d['status']} priority={d['priority']} "
+            f"stored={d['stored']} actual={d['actual']}"
+        )
+    action = "检查" if args.dry_run else "已修复"
+    print(f"{action} {len(drift)} 项计数漂移")
+    return 1 if drift and args.dry_run else 0
+
+
+def cmd_prune_tombstones(args) -> int:
+    # 游标早于被清理墓碑的客户端下次同步会收到 reset，全量重新加载
+    with Session(engine) as session:
+        count = prune_tombstones(session, datetime.now() - timedelta(days=args.days))
+        session.commit()
+    print(f"已清理 {count} 条删除墓碑")
+    return 0
+
+
+def cmd_rebuild_search(args) -> int:
+    if engine.dialect.name != "sqlite":
+        print("全文搜索索引只用于 SQLite，其他数据库直接走 LIKE")
+        return 0
+    if args.check:
+        ok = check_search_index(engine)
+        print("搜索索引和任务表一致" if ok else "搜索索引和任务表不一致，需要 rebuild-search")
+        return 0 if ok else 1
+    start = time.perf_counter()
+    count = rebuild_search_index(engine)
+    print(f"已重建搜索索引：{count} 个任务，耗时 {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+def cmd_prune_threads(args) -> int:
+    with Session(engine) as session:
+        count = prune_threads(session, datetime.now() - timedelta(days=args.days))
+        session.commit()
+    print(f"已清理 {count} 个对话会话")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("reconcile-counters", help="从任务表重建计数表并报告漂移")
+    p.add_argument("--dry-run", action="store_true", help="只报告，不修改")
+    p.set_defaults(func=cmd_reconcile_counters)
+
+    p = sub.add_parser("prune-tombstones", help="清理旧的删除墓碑")
+    p.add_argument("--days", type=int, default=30, help="保留最近 N 天的墓碑")
+    p.set_defaults(func=cmd_prune_tombstones)
+
+    p = sub.add_parser("rebuild-search", help="重建全文搜索索引")
+    p.add_argument("--check", action="store_true", help="只检查索引和任务表是否一致")
+    p.set_defaults(func=cmd_rebuild_search)
+
+    p = sub.add_parser("prune-threads", help="清理长期不活跃的 AI 对话会话")
+    p.add_argument("--days", type=int, default=90, help="保留最近 N 天活跃过的会话")
+    p.set_defaults(func=cmd_prune_threads)
+
+    args = parser.parse_args(argv)
+    engine.echo = False
+    create_db()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""任务计数：增量维护 TaskCounter，摘要 O(1) 读取，以及全量对账"""
+
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, func, insert, update
+from sqlmodel import Session, select
+
+from app.models import Priority, Task, TaskCounter, TaskStatus, TaskSummary
+
+CounterKey = Tuple[str, str]  # (status, priority)
+
+
+def adjust_counters(session: Session, user_id: int, deltas: Dict[CounterKey, int]):
+    """把计数变化写进当前事务（不提交），调用方 commit 时和任务改动一起生效"""
+    for (status, priority), delta in deltas.items():
+        if not delta:
+            continue
+        result = session.execute(
+            update(TaskCounter)
+            .where(
+                TaskCounter.user_id == user_id,
+                TaskCounter.status == status,
+                TaskCounter.priority == priority,
+            )
+            .values(count=TaskCounter.count + delta)
+        )
+        if result.rowcount == 0:
+            session.execute(
+                insert(TaskCounter).values(
+                    user_id=user_id, status=status, priority=priority, count=delta
+                )
+            )
+
+
+def get_summary(session: Session, user_id: int) -> TaskSummary:
+    """读计数表汇总，行数最多 状态数×优先级数，和任务总量无关"""
+    rows = session.exec(
+        select(TaskCounter.status, TaskCounter.priority, TaskCounter.count).where(
+            TaskCounter.user_id == user_id
+        )
+    ).all()
+    by_status = {s.value: 0 for s in TaskStatus}
+    by_priority = {p.value: 0 for p in Priority}
+    for status, priority, count in rows:
+        by_status[status] = by_status.get(status, 0) + count
+        by_priority[priority] = by_priority.get(priority, 0) + count
+    return TaskSummary(
+        total=sum(by_status.values()), by_status=by_status, by_priority=by_priority
+    )
+
+
+def reconcile_counters(session: Session, fix: bool = True) -> List[dict]:
+    """
+    从 Task 表重新聚合，和计数表逐项比对，返回漂移项；
+    fix=True 时用聚合结果整体重建计数表（调用方负责 commit）。
+    """
+    actual = Counter(
+        {
+            (user_id, status, priority): count
+            for user_id, status, priority, count in session.exec(
+                select(Task.user_id, Task.status, Task.priority, func.count()).group_by(
+                    Task.user_id, Task.status, Task.priority
+                )
+            ).all()
+        }
+    )
+    stored = Counter(
+        {
+            (c.user_id, c.status, c.priority): c.count
+            for c in session.exec(select(TaskCounter)).all()
+        }
+    )
+    drift = [
+        {
+            "user_id": key[0],
+            "status": key[1],
+            "priority": key[2],
+            "stored": stored.get(key, 0),
+            "actual": actual.get(key, 0),
+        }
+        for key in sorted(set(actual) | set(stored))
+        if stored.get(key, 0) != actual.get(key, 0)
+    ]
+    if fix and drift:
+        session.execute(delete(TaskCounter))
+        session.execute(
+            insert(TaskCounter),
+            [
+                {"user_id": u, "status": s, "priority": p, "count": c}
+                for (u, s, p), c in actual.items()
+            ],
+        )
+    return drift
+
+
+def backfill_if_empty(session: Session):
+    """老库升级：计数表刚建出来是空的而任务表有数据时，先全量建一次"""
+    if session.exec(select(TaskCounter).limit(1)).first() is not None:
+        return
+    if session.exec(select(Task.id).limit(1)).first() is None:
+        return
+    reconcile_counters(session, fix=True)
+    session.commit()
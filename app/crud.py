@@ -0,0 +1,166 @@
+"""
+任务写操作的公共实现：路由和 AI 工具都走这里，
+保证任务改动和计数、数据版本等派生数据在同一个事务里。函数本身不 commit。
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, update
+from sqlmodel import Session, select
+
+from app.counters import adjust_counters
+from app.models import Task
+from app.versions import add_tombstones, bump_version
+
+
+def create_task(
+    session: Session,
+    user_id: int,
+    title: str,
+    description: Optional[str] = None,
+    priority: str = "medium",
+    status: str = "todo",
+) -> Task:
+    task = Task(
+        title=title,
+        description=description,
+        priority=priority,
+        status=status,
+        user_id=user_id,
+        change_version=bump_version(session, user_id),
+    )
+    session.add(task)
+    adjust_counters(session, user_id, {(status, priority): 1})
+    return task
+
+
+def update_task(session: Session, task: Task, changes: dict) -> Task:
+    """changes 为 字段名 → 新值（已是普通字符串，不是枚举）"""
+    old_key = (task.status, task.priority)
+    for key, val in changes.items():
+        setattr(task, key, val)
+    task.updated_at = datetime.now()
+    task.change_version = bump_version(session, task.user_id)
+    session.add(task)
+    new_key = (task.status, task.priority)
+    if new_key != old_key:
+        adjust_counters(session, task.user_id, {old_key: -1, new_key: 1})
+    return task
+
+
+def delete_task(session: Session, task: Task):
+    adjust_counters(session, task.user_id, {(task.status, task.priority): -1})
+    add_tombstones(session, task.user_id, [task.id], bump_version(session, task.user_id))
+    session.delete(task)
+
+
+# ── 按 ID 操作：查归属 + 修改放在同一个函数里，可以整体交给组提交写线程执行 ──
+def get_owned_task(session: Session, user_id: int, task_id: int) -> Optional[Task]:
+    task = session.get(Task, task_id)
+    if not task or task.user_id != user_id:
+        return None
+    return task
+
+
+def update_task_by_id(
+    session: Session, user_id: int, task_id: int, changes: dict
+) -> Optional[Task]:
+    """任务不存在或不属于该用户时返回 None"""
+    task = get_owned_task(session, user_id, task_id)
+    if task is None:
+        return None
+    return update_task(session, task, changes)
+
+
+def delete_task_by_id(session: Session, user_id: int, task_id: int) -> bool:
+    task = get_owned_task(session, user_id, task_id)
+    if task is None:
+        return False
+    delete_task(session, task)
+    return True
+
+
+# ── 批量操作：一条 executemany 插入 / 按相同改动分组的集合 UPDATE / 一条 DELETE ──
+def _stamp(session: Session, user_id: int) -> dict:
+    """批量插入时每行共用的字段"""
+    now = datetime.now()
+    return {
+        "user_id": user_id,
+        "created_at": now,
+        "updated_at": now,
+        "change_version": bump_version(session, user_id),
+    }
+
+
+def bulk_create_tasks(session: Session, user_id: int, rows: List[dict]) -> List[dict]:
+    """rows 为已校验的字段字典；返回新建任务（普通 dict，提交后仍可用）"""
+    stamp = _stamp(session, user_id)
+    tasks = session.scalars(insert(Task).returning(Task), [{**row, **stamp} for row in rows]).all()
+    adjust_counters(session, user_id, Counter((t.status, t.priority) for t in tasks))
+    return [t.model_dump() for t in tasks]
+
+
+def import_tasks(session: Session, user_id: int, rows: List[dict]) -> int:
+    """大批量导入：不取回新行，走 executemany；返回插入条数"""
+    stamp = _stamp(session, user_id)
+    session.execute(insert(Task), [{**row, **stamp} for row in rows])
+    adjust_counters(session, user_id, Counter((r["status"], r["priority"]) for r in rows))
+    return len(rows)
+
+
+def _owned_keys(session: Session, user_id: int, ids: List[int]) -> Dict[int, Tuple[str, str]]:
+    """id → (status, priority)，只包含属于该用户的任务"""
+    rows = session.exec(
+        select(Task.id, Task.status, Task.priority).where(
+            Task.id.in_(ids), Task.user_id == user_id
+        )
+    ).all()
+    return {task_id: (status, priority) for task_id, status, priority in rows}
+
+
+def bulk_update_tasks(
+    session: Session, user_id: int, items: List[Tuple[int, dict]]
+) -> Tuple[List[int], List[int]]:
+    """items 为 (id, 改动)；返回 (已更新 ID, 不存在的 ID)"""
+    owned = _owned_keys(session, user_id, [task_id for task_id, _ in items])
+    groups: Dict[tuple, List[int]] = {}
+    deltas: Counter = Counter()
+    for task_id, changes in items:
+        if task_id not in owned:
+            continue
+        groups.setdefault(tuple(sorted(changes.items())), []).append(task_id)
+        old_status, old_priority = owned[task_id]
+        deltas[(old_status, old_priority)] -= 1
+        deltas[(changes.get("status", old_status), changes.get("priority", old_priority))] += 1
+
+    now = datetime.now()
+    version = bump_version(session, user_id) if groups else 0
+    for changes, ids in groups.items():
+        session.execute(
+            update(Task)
+            .where(Task.id.in_(ids), Task.user_id == user_id)
+            .values(**dict(changes), updated_at=now, change_version=version)
+            .execution_options(synchronize_session=False)
+        )
+    adjust_counters(session, user_id, deltas)
+    updated = [task_id for task_id, _ in items if task_id in owned]
+    missing = [task_id for task_id, _ in items if task_id not in owned]
+    return updated, missing
+
+
+def bulk_delete_tasks(
+    session: Session, user_id: int, ids: List[int]
+) -> Tuple[List[int], List[int]]:
+    """返回 (已删除 ID, 不存在的 ID)"""
+    owned = _owned_keys(session, user_id, ids)
+    if owned:
+        session.execute(
+            delete(Task)
+            .where(Task.id.in_(list(owned)), Task.user_id == user_id)
+            .execution_options(synchronize_session=False)
+        )
+        adjust_counters(session, user_id, {key: -n for key, n in Counter(owned.values()).items()})
+        add_tombstones(session, user_id, list(owned), bump_version(session, user_id))
+    return [i for i in ids if i in owned], [i for i in ids if i not in owned]
@@ -1,21 +1,131 @@
 """数据库连接和会话管理"""
 
 from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Optional
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./taskflow.db")
-engine = create_engine(DATABASE_URL, echo=True)
+# 打开后任务 / 用户的 CRUD 路由改用 AsyncSession，不再经过线程池
+DB_ASYNC = os.getenv("DB_ASYNC", "0").lower() in ("1", "true", "yes")
+# 逐条打印 SQL 只用于本地调试；线上看 Server-Timing 和 /metrics（app.metrics）
+SQL_ECHO = os.getenv("SQL_ECHO", "0").lower() in ("1", "true", "yes")
+
+# ── SQLite 生产配置：SQLITE_PROFILE=production ──
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "default")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+# 组提交：所有任务写操作交给单个写线程，并发请求的写合并成一个事务提交（app.writer）
+SQLITE_GROUP_COMMIT = os.getenv(
+    "SQLITE_GROUP_COMMIT", "1" if SQLITE_PROFILE == "production" else "0"
+).lower() in ("1", "true", "yes")
+
+
+
+def _pool_options() -> dict:
+    """
+    连接池大小。同步模式下请求在多次线程池调度之间一直持有连接，
+    高并发时 pool_size + max_overflow 需要接近在途请求数，否则会等连接超时。
+    """
+    options = {}
+    if os.getenv("DB_POOL_SIZE"):
+        options["pool_size"] = int(os.environ["DB_POOL_SIZE"])
+    if os.getenv("DB_MAX_OVERFLOW"):
+        options["max_overflow"] = int(os.environ["DB_MAX_OVERFLOW"])
+    return options
+
+
+def _production_pragmas() -> list:
+    return [
+        "PRAGMA journal_mode=WAL",  # 读写互不阻塞
+        "PRAGMA synchronous=NORMAL",  # WAL 下只在 checkpoint 时 fsync
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",  # 负数单位是 KiB
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def apply_sqlite_profile(target: Engine):
+    """每个新连接上执行生产 PRAGMA（PRAGMA 是连接级的，不能只执行一次）"""
+    if target.dialect.name != "sqlite" or SQLITE_PROFILE != "production":
+        return
+
+    @event.listens_for(target, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in _production_pragmas():
+            cursor.execute(pragma)
+        cursor.close()
+
+
+engine = create_engine(DATABASE_URL, echo=SQL_ECHO, **_pool_options())
+apply_sqlite_profile(engine)
+_async_engine: Optional[AsyncEngine] = None
+
+
+def to_async_url(url: str) -> str:
+    """把同步驱动的 URL 换成对应的异步驱动：SQLite → aiosqlite，PostgreSQL → asyncpg"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if backend in ("postgresql", "postgres"):
+        query = dict(parsed.query)
+        # asyncpg 不认 libpq 的 sslmode，对应参数叫 ssl
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        parsed = parsed.set(drivername="postgresql+asyncpg", query=query)
+        return parsed.render_as_string(hide_password=False)
+    return url
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            to_async_url(DATABASE_URL), echo=engine.echo, **_pool_options()
+        )
+        apply_sqlite_profile(_async_engine.sync_engine)
+    return _async_engine
 
 
 def create_db():
     """创建所有表"""
     SQLModel.metadata.create_all(engine)
+    # 表已存在时 create_all 不会补加新列和新索引，老库在这里补上
+    # （新列必须可为空或带 server_default）
+    inspector = inspect(engine)
+    for table in SQLModel.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                with engine.begin() as conn:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    # 全文搜索的虚拟表和触发器不在 metadata 里，老库单独补建（app.search）
+    from app.search import ensure_search_index
+
+    ensure_search_index(engine)
 
 
 def get_session():
     """获取数据库会话（每个请求一个）"""
     with Session(engine) as session:
         yield session
+
+
+async def get_async_session():
+    """异步会话；提交后不过期对象，返回 ORM 对象时不用再查一次"""
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,133 @@
+"""
+进程内任务变更推送：任务写事务提交后按用户发布事件，WebSocket / SSE 连接订阅。
+
+- 发布点：versions.bump_version 把 (用户, 新版本号) 记在会话上，提交后由这里的
+  after_commit 钩子发布；回滚则丢弃。路由、批量、导入、AI 工具、组提交写线程都覆盖到。
+- 事件只带版本号，客户端收到后走 /tasks/changes 拉增量，所以可以放心丢：
+  慢消费者积压超过 EVENTS_QUEUE_SIZE 时清空积压，换成一条 resync。
+- 空闲连接只占一个 Subscription（一个 deque，等待时一个 Future），不占线程和数据库连接。
+- 只在单个 worker 进程内有效；多 worker 部署需换成外部消息总线（接口不变），
+  在此之前其他 worker 的改动由客户端切回页面时的增量同步补上。
+"""
+
+import asyncio
+import os
+from collections import deque
+from typing import Deque, Dict, Optional, Set
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.metrics import Counter, register, register_collector
+
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "32"))
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "25"))
+
+EVENTS_PUBLISHED = register(
+    Counter("taskflow_events_published_total", "发布的任务变更事件数")
+)
+EVENTS_RESYNCS = register(
+    Counter("taskflow_events_resyncs_total", "因消费过慢丢弃积压、改发 resync 的次数")
+)
+
+
+class Subscription:
+    """一个连接的待发事件；只在事件循环线程里读写"""
+
+    __slots__ = ("user_id", "pending", "waiter")
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.pending: Deque[dict] = deque()
+        self.waiter: Optional[asyncio.Future] = None
+
+    def push(self, event: dict):
+        if len(self.pending) >= EVENTS_QUEUE_SIZE:
+            # 积压的事件已经没有意义，客户端按 resync 走一次增量同步就能补齐
+            self.pending.clear()
+            event = {"type": "resync", "version": event["version"]}
+            EVENTS_RESYNCS.inc()
+        self.pending.append(event)
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """取下一条事件；timeout 秒内没有事件返回 None（调用方发心跳）"""
+        if not self.pending:
+            self.waiter = asyncio.get_running_loop().create_future()
+            try:
+                await asyncio.wait_for(self.waiter, timeout)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                self.waiter = None
+        return self.pending.popleft()
+
+
+class EventHub:
+    def __init__(self):
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def connections(self) -> int:
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """在事件循环里调用"""
+        self._loop = asyncio.get_running_loop()
+        sub = Subscription(user_id)
+        self._subscribers.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        subs = self._subscribers.get(sub.user_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._subscribers[sub.user_id]
+
+    def publish(self, user_id: int, event: dict):
+        """任意线程可调用（线程池、组提交写线程、事件循环本身）"""
+        EVENTS_PUBLISHED.inc()
+        loop = self._loop
+        if user_id not in self._subscribers or loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._deliver, user_id, event)
+
+    def _deliver(self, user_id: int, event: dict):
+        for sub in self._subscribers.get(user_id, ()):
+            sub.push(event)
+
+
+hub = EventHub()
+
+
+def encode_sse(event: dict) -> bytes:
+    """一条 SSE 消息：event 名取 type，带版本号的事件同时作为 id（断线重连时可用）"""
+    lines = f"event: {event['type']}\n"
+    if "version" in event:
+        lines += f"id: {event['version']}\n"
+    return lines.encode() + b"data: " + orjson.dumps(event) + b"\n\n"
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session: Session):
+    versions = session.info.pop("task_versions", None)
+    for user_id, version in (versions or {}).items():
+        hub.publish(user_id, {"type": "tasks_changed", "version": version})
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session):
+    session.info.pop("task_versions", None)
+
+
+@register_collector
+def _event_metrics():
+    return [
+        "# HELP taskflow_event_connections 当前推送连接数（WebSocket + SSE）",
+        "# TYPE taskflow_event_connections gauge",
+        f"taskflow_event_connections {hub.connections}",
+    ]
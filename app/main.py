@@ -3,15 +3,26 @@ TaskFlow — 任务管理 API
 V4: 数据库存储、用户认证、ai 聊天功能、前端页面。
 """
 
-from fastapi import FastAPI
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles  # 新增
-from app.database import create_db
+from sqlmodel import Session
+from app.auth import password_hasher, token_cache
+from app.ai.tracing import trace_writer
+from app.counters import backfill_if_empty
+from app.database import DB_ASYNC, create_db, engine
+from app.metrics import MetricsMiddleware, render_metrics
+from app.writer import writer
 from app.routes import tasks, users, chat, pages  # 加了 pages
+from app.routes import events, tasks_async, users_async
 
 
 # ── 创建 FastAPI 应用实例 ──
 app = FastAPI(title="TaskFlow", version="4.0.0")
 
+# 每个请求统计 SQL 次数 / 耗时，写进 Server-Timing 并汇总到 /metrics
+app.add_middleware(MetricsMiddleware)
+
 # 挂载静态文件目录
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
@@ -20,17 +31,60 @@ app.mount("/static", StaticFiles(directory="app/static"), name="static")
 @app.on_event("startup")
 def on_startup():
     create_db()
+    with Session(engine) as session:
+        backfill_if_empty(session)
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    password_hasher.shutdown()
+    trace_writer.stop()
+    if writer is not None:
+        writer.stop()
+
+
+def _without_replaced(router: APIRouter, replacements) -> APIRouter:
+    """去掉已有异步版本的同步路由，其余接口原样保留"""
+    replaced = {
+        (route.path, method)
+        for r in replacements
+        for route in r.routes
+        for method in route.methods
+    }
+    return APIRouter(
+        routes=[
+            route
+            for route in router.routes
+            if not any((route.path, m) in replaced for m in route.methods)
+        ]
+    )
 
 
 # ── 注册路由 ──
-app.include_router(users.router)
-app.include_router(tasks.router)
+if DB_ASYNC:
+    # 异步模式：核心 CRUD 换成 AsyncSession 版本。同步独有的接口先注册，
+    # 免得 /tasks/xxx 这类固定路径被异步版的 /tasks/{task_id} 抢先匹配
+    async_routers = [users_async.router, tasks_async.router]
+    app.include_router(_without_replaced(users.router, async_routers))
+    app.include_router(_without_replaced(tasks.router, async_routers))
+    for router in async_routers:
+        app.include_router(router)
+else:
+    app.include_router(users.router)
+    app.include_router(tasks.router)
 app.include_router(chat.router)
+app.include_router(events.router)
 
 # 页面路由
 app.include_router(pages.router)
 
 
+# ── Prometheus 指标 ──
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 # ── 根路径 —— 健康检查 ──
 @app.get("/")
 def root():
@@ -39,4 +93,5 @@ def root():
         "version": "4.0.0",
         "features": ["CRUD", "Auth", "AI Chat", "Pages"],
         "static": "/static/",
+        "auth_cache": token_cache.stats(),
     }
@@ -0,0 +1,257 @@
+"""
+请求级观测：SQL 计数与耗时、Server-Timing 响应头、慢查询日志、Prometheus 指标。
+
+每个请求一个 RequestStats 放在 contextvar 里，SQLAlchemy 事件往里累加；
+线程池和 run_sync 都会带上 context，所以同步 / 异步路由都能统计到。
+热路径上只有两次 perf_counter 和一次 contextvar 读取，可以在生产常开。
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+METRICS_ENABLED = os.getenv("REQUEST_METRICS", "1").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+slow_query_logger = logging.getLogger("taskflow.slow_query")
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+# ── 指标类型（够用的最小 Prometheus 实现）──
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels → [每个桶的计数..., 总和, 总数]；累积计数在输出时再算
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            inf = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {series[-1]}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {series[-2]}")
+            lines.append(f"{self.name}_count{label_str} {series[-1]}")
+        return lines
+
+
+# 其他模块往这里登记自己的指标或采集函数（返回若干行 Prometheus 文本）
+_registry: List[object] = []
+_collectors: List[Callable[[], List[str]]] = []
+
+
+def register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def register_collector(fn: Callable[[], List[str]]):
+    _collectors.append(fn)
+    return fn
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in _registry:
+        lines += metric.render()
+    for collect in _collectors:
+        lines += collect()
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_DURATION = register(
+    Histogram(
+        "taskflow_http_request_duration_seconds",
+        "HTTP 请求耗时",
+        ("method", "route"),
+    )
+)
+REQUEST_DB_DURATION = register(
+    Histogram(
+        "taskflow_http_request_db_seconds",
+        "单个 HTTP 请求内的 SQL 总耗时",
+        ("method", "route"),
+    )
+)
+REQUESTS_TOTAL = register(
+    Counter("taskflow_http_requests_total", "HTTP 请求数", ("method", "route", "status"))
+)
+DB_QUERIES_TOTAL = register(
+    Counter("taskflow_db_queries_total", "SQL 语句数", ("method", "route"))
+)
+SLOW_QUERIES_TOTAL = register(
+    Counter("taskflow_db_slow_queries_total", "超过 SLOW_QUERY_MS 的 SQL 语句数")
+)
+
+
+# ── 请求内的 SQL 统计 ──
+class RequestStats:
+    __slots__ = (
+        "query_count", "db_time", "slowest_time", "slowest_statement",
+        "llm_calls", "llm_time", "tool_calls", "tool_time",
+    )
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: Optional[str] = None
+        # 聊天请求里模型 / 工具调用的次数和总耗时（app.ai.tracing 累加）
+        self.llm_calls = 0
+        self.llm_time = 0.0
+        self.tool_calls = 0
+        self.tool_time = 0.0
+
+    def server_timing(self, total: float) -> str:
+        parts = [
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.query_count} queries"',
+            f"app;dur={total * 1000:.2f}",
+        ]
+        if self.query_count:
+            parts.insert(1, f"db-slowest;dur={self.slowest_time * 1000:.2f}")
+        if self.llm_calls:
+            parts.append(f'llm;dur={self.llm_time * 1000:.2f};desc="{self.llm_calls} calls"')
+        if self.tool_calls:
+            parts.append(f'tools;dur={self.tool_time * 1000:.2f};desc="{self.tool_calls} calls"')
+        return ", ".join(parts)
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.query_count += 1
+        stats.db_time += elapsed
+        if elapsed > stats.slowest_time:
+            stats.slowest_time = elapsed
+            stats.slowest_statement = statement
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        SLOW_QUERIES_TOTAL.inc()
+        slow_query_logger.warning("慢查询 %.1fms: %s", elapsed * 1000, " ".join(statement.split())[:500])
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # 出错的语句不会触发 after_cursor_execute，把起始时间弹掉免得错位
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+# ── ASGI 中间件：纯 ASGI 实现，不缓冲响应体，流式响应也能用 ──
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            route = scope.get("route")
+            # 只用路由模板做标签（/tasks/{task_id}），避免具体路径把指标撑爆
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            REQUEST_DURATION.observe(time.perf_counter() - start, method, path)
+            REQUEST_DB_DURATION.observe(stats.db_time, method, path)
+            REQUESTS_TOTAL.inc(method, path, str(status_code))
+            if stats.query_count:
+                DB_QUERIES_TOTAL.inc(method, path, amount=stats.query_count)
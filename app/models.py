@@ -1,7 +1,8 @@
 """TaskFlow 数据模型 V2 — 数据库版"""
 
 from sqlmodel import SQLModel, Field
-from typing import Optional
+from sqlalchemy import Index
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 from enum import Enum
 from pydantic import BaseModel
@@ -55,6 +56,21 @@ class ResetPasswordRequest(BaseModel):
 
 # ── 任务表（加了 user_id 外键）──
 class Task(SQLModel, table=True):
+    # 列表按 (updated_at, id) 倒序做游标分页；SQLite 二级索引隐含 rowid(id)，
+    # 所以这几个复合索引能直接按序吐出一页，不用扫全表再排序
+    __table_args__ = (
+        Index("ix_task_user_updated", "user_id", "updated_at"),
+        Index("ix_task_user_status_updated", "user_id", "status", "updated_at"),
+        Index(
+            "ix_task_user_status_priority_updated",
+            "user_id",
+            "status",
+            "priority",
+            "updated_at",
+        ),
+        Index("ix_task_user_change_version", "user_id", "change_version"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str = Field(min_length=1, max_length=200)
     description: Optional[str] = None
@@ -63,6 +79,115 @@ class Task(SQLModel, table=True):
     user_id: int = Field(foreign_key="user.id")
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
+    # 最后一次改动时用户的数据版本号（见 TaskVersion），/tasks/changes 按它取增量
+    change_version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+
+
+# ── 任务计数表：用户 × 状态 × 优先级，随任务增删改在同一事务里增量维护 ──
+class TaskCounter(SQLModel, table=True):
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    status: str = Field(primary_key=True)
+    priority: str = Field(primary_key=True)
+    count: int = 0
+
+
+class TaskVersion(SQLModel, table=True):
+    """用户任务数据的版本号，任何任务改动都在同一事务里 +1，用作 ETag 和增量同步游标"""
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    version: int = 0
+    # 版本号不超过它的墓碑已被清理，更早的同步游标只能全量重来
+    pruned_version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+
+
+class TaskTombstone(SQLModel, table=True):
+    """已删除任务的墓碑，让增量同步能看到删除；python -m app.cli prune-tombstones 定期清理"""
+
+    __table_args__ = (Index("ix_tombstone_user_version", "user_id", "version"),)
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    task_id: int = Field(primary_key=True)
+    version: int
+    deleted_at: datetime = Field(default_factory=datetime.now)
+
+
+# ── AI 对话：会话 + LangGraph 检查点（app.ai.checkpointer 读写）──
+class ChatThread(SQLModel, table=True):
+    """一段 AI 对话；消息历史和摘要存在检查点里，thread_id = str(id)"""
+
+    __table_args__ = (Index("ix_chatthread_user_updated", "user_id", "updated_at"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id")
+    title: str = Field(default="", max_length=100)
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+
+class ChatCheckpoint(SQLModel, table=True):
+    """图状态快照（含 channel_values），每个会话只保留最新一个和它的父快照"""
+
+    thread_id: str = Field(primary_key=True)
+    checkpoint_ns: str = Field(default="", primary_key=True)
+    checkpoint_id: str = Field(primary_key=True)
+    parent_checkpoint_id: Optional[str] = None
+    type: str
+    checkpoint: bytes
+    metadata_type: str
+    metadata_blob: bytes
+
+
+class ChatCheckpointWrite(SQLModel, table=True):
+    """某个快照之后、下一个快照之前各节点的待定写入（中断恢复用）"""
+
+    thread_id: str = Field(primary_key=True)
+    checkpoint_ns: str = Field(default="", primary_key=True)
+    checkpoint_id: str = Field(primary_key=True)
+    task_id: str = Field(primary_key=True)
+    idx: int = Field(primary_key=True)
+    channel: str
+    type: str
+    value: bytes
+    task_path: str = ""
+
+
+class WeeklyReport(SQLModel, table=True):
+    """周报缓存的持久层（WEEKLY_REPORT_CACHE_TABLE=1 时启用），每个用户每周一行，新版本覆盖旧的"""
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    week: str = Field(primary_key=True)  # ISO 周，如 2026-W42
+    version: int  # 生成时用户任务数据的版本号
+    report: str
+    llm_calls: int = 0
+    created_at: datetime = Field(default_factory=datetime.now)
+
+
+# ── 任务响应：路由按列取行、用 orjson 直接编码（不经过 jsonable_encoder），下面的模型只用来描述响应结构 ──
+TASK_FIELDS = (
+    "id",
+    "title",
+    "description",
+    "priority",
+    "status",
+    "user_id",
+    "created_at",
+    "updated_at",
+    "change_version",
+)
+
+
+class TaskRead(BaseModel):
+    """单个任务；请求带 ?fields= 时只有列出的字段，所以全部标为可选"""
+
+    id: Optional[int] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    priority: Optional[str] = None
+    status: Optional[str] = None
+    user_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    change_version: Optional[int] = None
 
 
 class TaskCreate(BaseModel):
@@ -77,3 +202,84 @@ class TaskUpdate(BaseModel):
     description: Optional[str] = None
     priority: Optional[Priority] = None
     status: Optional[TaskStatus] = None
+
+
+# ── 批量接口 ──
+BULK_MAX_ITEMS = 500  # 单次批量请求的条数上限
+
+
+class TaskBulkUpdateItem(BaseModel):
+    """
+    批量更新的一条。和 TaskUpdate 不同，标题 / 优先级 / 状态可以不传但不能传 null，标题不能为空：
+    批量更新按相同改动合成一条 UPDATE，非法值要在这里逐条报错，不能让整批在数据库约束上失败
+    """
+
+    id: int
+    title: str = Field(default=None, min_length=1, max_length=200)
+    description: Optional[str] = None
+    priority: Priority = Field(default=None)
+    status: TaskStatus = Field(default=None)
+
+
+class TaskBulkCreateRequest(BaseModel):
+    # 逐条用 TaskCreate 校验，单条不合法只记错误，不影响其他条目
+    items: List[Dict[str, Any]] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class TaskBulkUpdateRequest(BaseModel):
+    items: List[Dict[str, Any]] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class TaskBulkDeleteRequest(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class BulkItemError(BaseModel):
+    index: int
+    id: Optional[int] = None
+    detail: str
+
+
+# ── 导入 ──
+class ImportRowError(BaseModel):
+    line: int  # 记录在上传内容中的起始行号（从 1 开始，CSV 含表头行）
+    detail: str
+
+
+class TaskImportResult(BaseModel):
+    created: int
+    rejected: int
+    errors: List[ImportRowError]  # 只列出前若干条，总数见 rejected
+
+
+class TaskSummary(BaseModel):
+    total: int
+    by_status: Dict[str, int]
+    by_priority: Dict[str, int]
+
+
+class TaskChanges(BaseModel):
+    """
+    自 since 以来的变化。reset=True 表示游标太旧或变化太多，
+    客户端应全量重新加载，然后从 cursor 继续增量同步。
+    """
+
+    cursor: str
+    reset: bool = False
+    changes: List[Task] = []
+    deleted: List[int] = []
+
+
+class TaskPage(BaseModel):
+    """任务列表的一页；next_cursor 为空表示没有下一页"""
+
+    items: List[TaskRead]
+    next_cursor: Optional[str] = None
+
+
+class TaskSearchPage(BaseModel):
+    """搜索结果的一页，按相关度排序；next_offset 为空表示没有下一页"""
+
+    items: List[TaskRead]
+    total: int
+    next_offset: Optional[int] = None
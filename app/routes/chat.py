@@ -1,28 +1,66 @@
-"""聊天端点：接收用户消息，返回 AI 回复"""
+"""
+聊天端点：接收用户消息，返回 AI 回复。
+全部是异步路由，经 chat_limiter 准入：运行 + 排队满了返回 429。
+消息带 thread_id 时接着该会话继续，不带就新开一个会话，响应里返回 thread_id。
+简单指令（app.ai.intents 能确定意图的）走快速通道直接调工具，不调 LLM，也不占聊天名额。
+"""
 
-from fastapi import APIRouter, Depends
+from contextlib import nullcontext
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlmodel import Session
 
 from app.auth import get_current_user
-from app.models import User
-from app.ai.agent import chat_with_agent
-from app.ai.tools import set_current_user_id
+from app.database import get_session
+from app.events import encode_sse
+from app.models import ChatThread, User
+from app.ai import threads
+from app.ai.agent import (
+    chat_with_agent,
+    generate_weekly_report,
+    run_intent,
+    stream_agent_events,
+    stream_intent_events,
+    thread_history,
+)
+from app.ai.intents import route_message
+from app.ai.limiter import chat_limiter
+from app.ai.report_cache import CachedReport, current_week, report_cache
+from app.versions import get_version
 
 router = APIRouter(prefix="/chat", tags=["AI 聊天"])
 
 
 class ChatRequest(BaseModel):
     message: str
+    thread_id: Optional[int] = None
 
 
 class ChatResponse(BaseModel):
     reply: str
+    thread_id: Optional[int] = None
+
+
+def _thread_not_found() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="对话不存在")
+
+
+async def _open_thread(session: Session, user_id: int, req: ChatRequest) -> int:
+    thread_id = await run_in_threadpool(threads.open_thread, session, user_id, req.thread_id, req.message)
+    if thread_id is None:
+        raise _thread_not_found()
+    return thread_id
 
 
 @router.post("/", response_model=ChatResponse)
-def chat(
+async def chat(
     req: ChatRequest,
     user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
 ):
     """
     发送消息给 AI 助手。
@@ -33,27 +71,129 @@ def chat(
     - "把XX标记为完成" → 更新任务
     - "总结一下" → 任务统计
     """
-    # 告诉工具函数"当前是谁在操作"
-    set_current_user_id(user.id)
+    user_id = user.id  # 提交会话后 user 会过期
+    intent = route_message(req.message)
+    async with nullcontext() if intent else chat_limiter.slot():
+        thread_id = await _open_thread(session, user_id, req)
+        try:
+            if intent:
+                reply = await run_intent(user_id, intent, req.message, thread_id)
+            else:
+                reply = await chat_with_agent(user_id, req.message, thread_id)
+            return ChatResponse(reply=reply, thread_id=thread_id)
+        except Exception as e:
+            err_msg = str(e) if str(e) else repr(e)
+            return ChatResponse(reply="AI 服务暂时不可用，请稍后重试。错误：" + err_msg, thread_id=thread_id)
+
+
+@router.post("/stream")
+async def chat_stream(
+    req: ChatRequest,
+    user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """
+    流式版本（SSE）：先立即发 start（带 thread_id），随后边生成边推送
+    token（文本增量）/ tool_start / tool_end（工具调用进度），最后 done 或 error。
+    客户端断开时生成器被取消，后续的 LLM 调用也随之停止。
+    队满时直接 429；排队发生在流开始之后（响应头已发出），拿到名额才建会话、发 start，
+    排队超时只有一条 error 事件，不留下空会话。
+    """
+    intent = route_message(req.message)
+    if intent is None:
+        chat_limiter.check_capacity()
+    user_id = user.id  # 提交会话后 user 会过期
+    if req.thread_id is not None and await run_in_threadpool(
+        threads.get_owned_thread, session, user_id, req.thread_id
+    ) is None:
+        raise _thread_not_found()  # 别人的 / 不存在的会话在响应开始前就 404
 
-    try:
-        reply = chat_with_agent(req.message)
-        return ChatResponse(reply=reply)
-    except Exception as e:
-        err_msg = str(e) if str(e) else repr(e)
-        return ChatResponse(reply="AI 服务暂时不可用，请稍后重试。错误：" + err_msg)
+    async def stream():
+        try:
+            # 名额在生成器里拿和还：响应没开始就断开时不会漏还
+            async with nullcontext() if intent else chat_limiter.slot():
+                # 请求的会话此时可能已被依赖关闭；关闭后的 Session 可以继续用，会重新取连接
+                thread_id = await _open_thread(session, user_id, req)
+                # 第一条事件不等 LLM，前端马上能显示"思考中"
+                yield encode_sse({"type": "start", "thread_id": thread_id})
+                if intent:
+                    events = stream_intent_events(user_id, intent, req.message, thread_id)
+                else:
+                    events = stream_agent_events(user_id, req.message, thread_id)
+                async for event in events:
+                    yield encode_sse(event)
+        except HTTPException as e:
+            yield encode_sse({"type": "error", "detail": e.detail})
+        except Exception as e:
+            err_msg = str(e) if str(e) else repr(e)
+            yield encode_sse({"type": "error", "detail": "AI 服务暂时不可用，请稍后重试。错误：" + err_msg})
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/weekly-report")
-def weekly_report(user: User = Depends(get_current_user)):
-    """让 AI 生成本周工作周报"""
-    set_current_user_id(user.id)
-    try:
-        reply = chat_with_agent(
-            "请帮我生成本周工作周报。先查看本周完成的任务，然后按以下格式总结："
-            "1. 本周完成概览（总数）2. 按优先级分类 3. 下周建议。语气专业简洁。"
-        )
-        return {"report": reply}
-    except Exception as e:
-        err_msg = str(e) if str(e) else repr(e)
-        return {"report": "周报生成失败：" + err_msg}
+async def weekly_report(
+    user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """
+    让 AI 生成本周工作周报。
+    同一周内任务数据没变（版本号相同）时直接返回缓存，不占聊天名额也不调 LLM；cached 标明是否来自缓存。
+    """
+    user_id = user.id
+    week = current_week()
+    # 版本号要在生成之前读：生成期间任务有改动时，报告记在旧版本下
+    version = await run_in_threadpool(get_version, session, user_id)
+    cached = await run_in_threadpool(report_cache.get, session, user_id, week, version)
+    if cached is not None:
+        return {"report": cached.report, "cached": True}
+
+    async with chat_limiter.slot():
+        try:
+            report, llm_calls = await generate_weekly_report(user_id)
+        except Exception as e:
+            err_msg = str(e) if str(e) else repr(e)
+            return {"report": "周报生成失败：" + err_msg, "cached": False}
+    await run_in_threadpool(report_cache.put, session, user_id, week, version, CachedReport(report, llm_calls))
+    return {"report": report, "cached": False}
+
+
+# ── 会话 ──
+
+
+@router.get("/threads", response_model=List[ChatThread])
+async def list_chat_threads(
+    user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """最近的对话会话，按最后活跃时间倒序"""
+    return await run_in_threadpool(threads.list_threads, session, user.id)
+
+
+@router.get("/threads/{thread_id}")
+async def get_chat_thread(
+    thread_id: int,
+    user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """会话详情：早期对话的摘要 + 保留下来的近期消息"""
+    thread = await run_in_threadpool(threads.get_owned_thread, session, user.id, thread_id)
+    if thread is None:
+        raise _thread_not_found()
+    return {"id": thread.id, "title": thread.title, **await thread_history(thread.id)}
+
+
+@router.delete("/threads/{thread_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_chat_thread(
+    thread_id: int,
+    user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    thread = await run_in_threadpool(threads.get_owned_thread, session, user.id, thread_id)
+    if thread is None:
+        raise _thread_not_found()
+    await run_in_threadpool(threads.delete_thread, session, thread)
@@ -0,0 +1,70 @@
+"""任务变更推送：WebSocket 为主，SSE 兜底（代理不支持 WebSocket 时）"""
+
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+
+from app.auth import get_current_user
+from app.database import get_session
+from app.events import EVENTS_HEARTBEAT_SECONDS, encode_sse, hub
+from app.models import User
+
+router = APIRouter(prefix="/events", tags=["实时推送"])
+
+WS_AUTH_TIMEOUT = 10  # 连接后必须在这段时间内发来 token
+WS_POLICY_VIOLATION = 1008
+
+
+@router.websocket("/ws")
+async def task_events_ws(websocket: WebSocket, session: Session = Depends(get_session)):
+    """
+    连接后先发一条 {"token": "..."} 认证（浏览器 WebSocket 不能带 Authorization 头，
+    也不把 token 放进 URL 免得进访问日志），之后服务端推送 tasks_changed / resync / ping。
+    """
+    await websocket.accept()
+    try:
+        message = await asyncio.wait_for(websocket.receive_json(), WS_AUTH_TIMEOUT)
+        user = await run_in_threadpool(get_current_user, str(message.get("token", "")), session)
+    except (asyncio.TimeoutError, HTTPException, ValueError, AttributeError):
+        await websocket.close(WS_POLICY_VIOLATION)
+        return
+    except WebSocketDisconnect:
+        return
+    finally:
+        session.close()  # 长连接期间不占数据库连接
+
+    sub = hub.subscribe(user.id)
+    try:
+        await websocket.send_json({"type": "ready"})
+        while True:
+            event = await sub.get(EVENTS_HEARTBEAT_SECONDS)
+            # 心跳顺便发现已经断开的空闲连接
+            await websocket.send_json(event or {"type": "ping"})
+    except (WebSocketDisconnect, OSError, RuntimeError):
+        pass
+    finally:
+        hub.unsubscribe(sub)
+
+
+@router.get("")
+async def task_events_sse(user: User = Depends(get_current_user)):
+    """SSE 版本，事件同 WebSocket；需 Authorization 头（前端用 fetch 读流）"""
+
+    async def stream():
+        sub = hub.subscribe(user.id)
+        try:
+            yield b"retry: 3000\n" + encode_sse({"type": "ready"})
+            while True:
+                event = await sub.get(EVENTS_HEARTBEAT_SECONDS)
+                yield encode_sse(event) if event else b": ping\n\n"
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
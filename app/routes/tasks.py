@@ -1,81 +1,416 @@
 """任务 CRUD — V2 数据库版"""
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from typing import List, Optional
+import base64
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import and_, or_
+from sqlalchemy import select as select_rows  # 按列查询：sqlmodel 的 select 遇到单列时 exec 返回标量而不是 Row
+from sqlmodel import Session
+from typing import List, Literal, Optional, Tuple
 from datetime import datetime
 
+from app import crud
+from app.counters import get_summary
 from app.database import get_session
-from app.models import Task, TaskCreate, TaskUpdate, User
+from app.models import (
+    TASK_FIELDS,
+    Task,
+    TaskChanges,
+    TaskCreate,
+    TaskImportResult,
+    TaskPage,
+    TaskRead,
+    TaskSearchPage,
+    TaskSummary,
+    TaskUpdate,
+    User,
+)
+from app.models import (
+    BulkItemError,
+    TaskBulkCreateRequest,
+    TaskBulkDeleteRequest,
+    TaskBulkUpdateItem,
+    TaskBulkUpdateRequest,
+)
 from app.auth import get_current_user
+from app.search import search_tasks
+from app.task_io import (
+    EXPORT_MEDIA_TYPES,
+    ImportAborted,
+    export_stream,
+    import_stream,
+    validation_detail,
+)
+from app.versions import etag_matches, get_changes, get_version, make_etag
+from app.writer import run_write
 
 router = APIRouter(prefix="/tasks", tags=["任务管理"])
 
+# ── 分页参数 ──
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200  # 服务端上限，客户端传更大的 limit 也只返回这么多
 
-@router.post("/", status_code=201)
+
+def encode_cursor(task: Task) -> str:
+    """游标 = 本页最后一条的 (updated_at, id)，base64 后对客户端不透明"""
+    raw = f"{task.updated_at.isoformat()}|{task.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        updated_at, task_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(updated_at), int(task_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(400, "无效的分页游标")
+
+
+# ── 响应：按列取行，orjson 直接编码 ──
+# 直接返回 ORM 对象时 FastAPI 要逐个字段走 jsonable_encoder（1 万个任务约占序列化耗时的九成）；
+# 这里查询只取需要的列，拼成普通 dict 交给 ORJSONResponse。response_model 只用来生成文档
+FIELDS_QUERY = Query(
+    None,
+    description=f"只返回这些字段，逗号分隔（如 id,title,status）；可选：{','.join(TASK_FIELDS)}",
+)
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """?fields= → 要返回的字段（保持请求里的顺序、去重）；不传返回全部"""
+    if not fields:
+        return TASK_FIELDS
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in TASK_FIELDS]
+    if unknown or not names:
+        raise HTTPException(400, f"未知字段：{', '.join(unknown)}（可选：{','.join(TASK_FIELDS)}）")
+    return names
+
+
+def task_columns(fields: Tuple[str, ...], *extra: str) -> list:
+    """要查的列：请求的字段在前，再补上分页等内部要用的列（不输出）"""
+    return [getattr(Task, name) for name in (*fields, *(n for n in extra if n not in fields))]
+
+
+def row_dicts(rows, fields: Tuple[str, ...]) -> List[dict]:
+    return [dict(zip(fields, row)) for row in rows]  # zip 到 fields 为止，补查的列不输出
+
+
+def task_dict(task: Task) -> dict:
+    return {name: getattr(task, name) for name in TASK_FIELDS}
+
+
+def json_response(content, response: Optional[Response] = None, status_code: int = 200) -> ORJSONResponse:
+    """直接返回 Response 时 FastAPI 不会合并注入的 response 上的头（ETag 等），这里带上"""
+    headers = dict(response.headers) if response is not None else None
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
+
+
+@router.post("/", status_code=201, response_model=TaskRead)
 def create_task(
     data: TaskCreate,
     session: Session = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    task = Task(
+    task = run_write(
+        session,
+        crud.create_task,
+        user.id,
         title=data.title,
         description=data.description,
         priority=data.priority.value,
         status=data.status.value,
-        user_id=user.id,
     )
-    session.add(task)
-    session.commit()
-    session.refresh(task)
-    return task
+    return json_response(task_dict(task), status_code=201)
+
+
+def build_list_query(
+    user_id: int,
+    status: Optional[str],
+    priority: Optional[str],
+    cursor: Optional[str],
+    limit: int,
+    fields: Tuple[str, ...] = TASK_FIELDS,
+):
+    """列表查询（同步 / 异步路由共用）；多取一条用来判断是否还有下一页，游标要用的列总是查出来"""
+    query = select_rows(*task_columns(fields, "updated_at", "id")).where(Task.user_id == user_id)
+    if status:
+        query = query.where(Task.status == status)
+    if priority:
+        query = query.where(Task.priority == priority)
+    if cursor:
+        after_updated, after_id = decode_cursor(cursor)
+        query = query.where(
+            or_(
+                Task.updated_at < after_updated,
+                and_(Task.updated_at == after_updated, Task.id < after_id),
+            )
+        )
+    return query.order_by(Task.updated_at.desc(), Task.id.desc()).limit(limit + 1)
+
+
+def to_page(rows: list, limit: int, fields: Tuple[str, ...] = TASK_FIELDS) -> dict:
+    """build_list_query 的结果 → TaskPage 结构的 dict"""
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return {"items": row_dicts(rows[:limit], fields), "next_cursor": next_cursor}
+
 
+def task_changes(data: TaskUpdate) -> dict:
+    """TaskUpdate → crud.update_task 需要的 字段名 → 普通值"""
+    return {
+        key: val.value if hasattr(val, "value") else val
+        for key, val in data.model_dump(exclude_unset=True).items()
+    }
 
-@router.get("/")
+
+def check_not_modified(
+    request: Request, response: Response, user_id: int, version: int
+) -> Optional[Response]:
+    """
+    条件请求（同步 / 异步路由共用）：If-None-Match 命中时返回 304，否则把 ETag 写进 response。
+    版本号必须在读数据之前取：中间有写入时内容比 ETag 新，下次请求自然拿到新版本。
+    """
+    etag = make_etag(user_id, version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+@router.get("/", response_model=TaskPage)
 def list_tasks(
+    request: Request,
+    response: Response,
     status: Optional[str] = None,
     priority: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1),
+    fields: Optional[str] = FIELDS_QUERY,
     session: Session = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    query = select(Task).where(Task.user_id == user.id)
-    if status:
-        query = query.where(Task.status == status)
-    if priority:
-        query = query.where(Task.priority == priority)
-    return session.exec(query).all()
+    """按最近更新倒序分页；把返回的 next_cursor 原样带回即可取下一页"""
+    names = parse_fields(fields)
+    version = get_version(session, user.id)
+    not_modified = check_not_modified(request, response, user.id, version)
+    if not_modified:
+        return not_modified
+    limit = min(limit, MAX_PAGE_SIZE)
+    query = build_list_query(user.id, status, priority, cursor, limit, names)
+    return json_response(to_page(session.exec(query).all(), limit, names), response)
+
+
+@router.get("/summary", response_model=TaskSummary)
+def task_summary(
+    session: Session = Depends(get_session),
+    user: User = Depends(get_current_user),
+):
+    """按状态 / 优先级统计，直接读计数表"""
+    return get_summary(session, user.id)
+
+
+@router.get("/search", response_model=TaskSearchPage)
+def search(
+    request: Request,
+    response: Response,
+    q: str = Query(min_length=1, max_length=200),
+    status: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1),
+    offset: int = Query(0, ge=0),
+    fields: Optional[str] = FIELDS_QUERY,
+    session: Session = Depends(get_session),
+    user: User = Depends(get_current_user),
+):
+    """
+    在标题和描述里全文搜索（app.search）：空格分隔的多个词须同时出现，按相关度排序；
+    按 offset 翻页，把返回的 next_offset 原样带回即可
+    """
+    names = parse_fields(fields)
+    version = get_version(session, user.id)
+    not_modified = check_not_modified(request, response, user.id, version)
+    if not_modified:
+        return not_modified
+    limit = min(limit, MAX_PAGE_SIZE)
+    rows, total = search_tasks(session, user.id, q, status, limit, offset, columns=task_columns(names))
+    next_offset = offset + limit if offset + limit < total else None
+    return json_response({"items": row_dicts(rows, names), "total": total, "next_offset": next_offset}, response)
+
+
+@router.get("/changes", response_model=TaskChanges)
+def task_changes_since(
+    since: Optional[str] = None,
+    session: Session = Depends(get_session),
+    user: User = Depends(get_current_user),
+):
+    """
+    增量同步：返回 since 之后新建 / 修改的任务和已删除的任务 ID，以及新的 cursor。
+    不带 since（或 reset=true）时只给出当前 cursor，客户端全量加载后再从它开始轮询。
+    """
+    try:
+        version = int(since) if since is not None else None
+    except ValueError:
+        raise HTTPException(400, "无效的同步游标")
+    return get_changes(session, user.id, version)
+
+
+@router.get("/export")
+def export_tasks(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    compression: Optional[Literal["zstd"]] = None,
+    session: Session = Depends(get_session),
+    user: User = Depends(get_current_user),
+):
+    """流式导出全部任务，服务端内存占用与任务数量无关；compression=zstd 时压缩传输"""
+    filename = f"tasks.{format}" + (".zst" if compression else "")
+    return StreamingResponse(
+        export_stream(session.get_bind(), user.id, format, compression),
+        media_type="application/zstd" if compression else EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/import", response_model=TaskImportResult)
+async def import_tasks(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    session: Session = Depends(get_session),
+    user: User = Depends(get_current_user),
+):
+    """
+    流式导入：请求体为 NDJSON 或带表头的 CSV（字段同 TaskCreate，多余的列忽略，
+    可直接导入 /tasks/export 的结果）。按批提交，不合法的行跳过并在结果里报告。
+    """
+
+    async def write_rows(rows):
+        return await run_in_threadpool(run_write, session, crud.import_tasks, user.id, rows)
+
+    try:
+        return await import_stream(request.stream(), format, write_rows)
+    except ImportAborted as e:
+        raise HTTPException(400, {"message": str(e), "created": e.created})
+
+
+# ── 批量接口：整批一个事务，逐条报告错误 ──
+def _validation_error(index: int, exc: ValidationError, task_id: Optional[int] = None):
+    return BulkItemError(index=index, id=task_id, detail=validation_detail(exc))
+
+
+@router.post("/bulk")
+def bulk_create_tasks(
+    req: TaskBulkCreateRequest,
+    session: Session = Depends(get_session),
+    user: User = Depends(get_current_user),
+):
+    rows, errors = [], []
+    for index, raw in enumerate(req.items):
+        try:
+            data = TaskCreate.model_validate(raw)
+        except ValidationError as e:
+            errors.append(_validation_error(index, e))
+            continue
+        rows.append(
+            {
+                "title": data.title,
+                "description": data.description,
+                "priority": data.priority.value,
+                "status": data.status.value,
+            }
+        )
+    created = run_write(session, crud.bulk_create_tasks, user.id, rows) if rows else []
+    return {"created": created, "errors": errors}
+
+
+@router.patch("/bulk")
+def bulk_update_tasks(
+    req: TaskBulkUpdateRequest,
+    session: Session = Depends(get_session),
+    user: User = Depends(get_current_user),
+):
+    items, errors, seen = [], [], set()
+    for index, raw in enumerate(req.items):
+        try:
+            data = TaskBulkUpdateItem.model_validate(raw)
+        except ValidationError as e:
+            task_id = raw.get("id")
+            errors.append(_validation_error(index, e, task_id if isinstance(task_id, int) else None))
+            continue
+        if data.id in seen:
+            errors.append(BulkItemError(index=index, id=data.id, detail="同一任务在请求中重复出现"))
+            continue
+        seen.add(data.id)
+        changes = task_changes(data)
+        changes.pop("id")
+        items.append((index, data.id, changes))
+
+    updated, missing = [], []
+    if items:
+        updated, missing = run_write(
+            session, crud.bulk_update_tasks, user.id, [(i, c) for _, i, c in items]
+        )
+    missing = set(missing)
+    errors += [
+        BulkItemError(index=index, id=task_id, detail="任务不存在")
+        for index, task_id, _ in items
+        if task_id in missing
+    ]
+    return {"updated": updated, "errors": sorted(errors, key=lambda e: e.index)}
+
+
+@router.delete("/bulk")
+def bulk_delete_tasks(
+    req: TaskBulkDeleteRequest,
+    session: Session = Depends(get_session),
+    user: User = Depends(get_current_user),
+):
+    ids = list(dict.fromkeys(req.ids))  # 去重，保持顺序
+    deleted, missing = run_write(session, crud.bulk_delete_tasks, user.id, ids)
+    missing = set(missing)
+    errors = [
+        BulkItemError(index=index, id=task_id, detail="任务不存在")
+        for index, task_id in enumerate(req.ids)
+        if task_id in missing
+    ]
+    return {"deleted": deleted, "errors": errors}
+
+
+def build_get_query(user_id: int, task_id: int, fields: Tuple[str, ...] = TASK_FIELDS):
+    """单个任务（同步 / 异步路由共用）；不属于该用户时查不到"""
+    return select_rows(*task_columns(fields)).where(Task.id == task_id, Task.user_id == user_id)
 
 
-@router.get("/{task_id}")
+@router.get("/{task_id}", response_model=TaskRead)
 def get_task(
     task_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = FIELDS_QUERY,
     session: Session = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    task = session.get(Task, task_id)
-    if not task or task.user_id != user.id:
+    names = parse_fields(fields)
+    version = get_version(session, user.id)
+    not_modified = check_not_modified(request, response, user.id, version)
+    if not_modified:
+        return not_modified
+    row = session.exec(build_get_query(user.id, task_id, names)).first()
+    if row is None:
         raise HTTPException(404, "任务不存在")
-    return task
+    return json_response(dict(zip(names, row)), response)
 
 
-@router.put("/{task_id}")
+@router.put("/{task_id}", response_model=TaskRead)
 def update_task(
     task_id: int,
     data: TaskUpdate,
     session: Session = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    task = session.get(Task, task_id)
-    if not task or task.user_id != user.id:
+    task = run_write(session, crud.update_task_by_id, user.id, task_id, task_changes(data))
+    if task is None:
         raise HTTPException(404, "任务不存在")
-    update_data = data.model_dump(exclude_unset=True)
-    for key, val in update_data.items():
-        setattr(task, key, val.value if hasattr(val, "value") else val)
-    task.updated_at = datetime.now()
-    session.add(task)
-    session.commit()
-    session.refresh(task)
-    return task
+    return json_response(task_dict(task))
 
 
 @router.delete("/{task_id}", status_code=204)
@@ -84,8 +419,5 @@ def delete_task(
     session: Session = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    task = session.get(Task, task_id)
-    if not task or task.user_id != user.id:
+    if not run_write(session, crud.delete_task_by_id, user.id, task_id):
         raise HTTPException(404, "任务不存在")
-    session.delete(task)
-    session.commit()
@@ -0,0 +1,124 @@
+"""任务 CRUD — AsyncSession 版（DB_ASYNC=1 时由 main 挂载，接管同名接口）"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Optional
+
+from app import crud
+from app.auth import get_current_user_async
+from app.counters import get_summary
+from app.database import get_async_session
+from app.models import TaskCreate, TaskPage, TaskRead, TaskSummary, TaskUpdate, User
+from app.versions import get_version
+from app.writer import run_write_async
+from app.routes.tasks import (
+    DEFAULT_PAGE_SIZE,
+    FIELDS_QUERY,
+    MAX_PAGE_SIZE,
+    build_get_query,
+    build_list_query,
+    check_not_modified,
+    json_response,
+    parse_fields,
+    task_changes,
+    task_dict,
+    to_page,
+)
+
+router = APIRouter(prefix="/tasks", tags=["任务管理"])
+
+# 写操作复用 app.crud 的同步实现：run_sync 在 greenlet 里执行，
+# 底层 IO 仍走异步驱动，不占线程池；开启组提交时交给写线程
+
+
+@router.post("/", status_code=201, response_model=TaskRead)
+async def create_task_async(
+    data: TaskCreate,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(get_current_user_async),
+):
+    task = await run_write_async(
+        session,
+        crud.create_task,
+        user.id,
+        title=data.title,
+        description=data.description,
+        priority=data.priority.value,
+        status=data.status.value,
+    )
+    return json_response(task_dict(task), status_code=201)
+
+
+@router.get("/", response_model=TaskPage)
+async def list_tasks_async(
+    request: Request,
+    response: Response,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1),
+    fields: Optional[str] = FIELDS_QUERY,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(get_current_user_async),
+):
+    names = parse_fields(fields)
+    version = await session.run_sync(get_version, user.id)
+    not_modified = check_not_modified(request, response, user.id, version)
+    if not_modified:
+        return not_modified
+    limit = min(limit, MAX_PAGE_SIZE)
+    query = build_list_query(user.id, status, priority, cursor, limit, names)
+    return json_response(to_page((await session.exec(query)).all(), limit, names), response)
+
+
+@router.get("/summary", response_model=TaskSummary)
+async def task_summary_async(
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(get_current_user_async),
+):
+    return await session.run_sync(get_summary, user.id)
+
+
+@router.get("/{task_id}", response_model=TaskRead)
+async def get_task_async(
+    task_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = FIELDS_QUERY,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(get_current_user_async),
+):
+    names = parse_fields(fields)
+    version = await session.run_sync(get_version, user.id)
+    not_modified = check_not_modified(request, response, user.id, version)
+    if not_modified:
+        return not_modified
+    row = (await session.exec(build_get_query(user.id, task_id, names))).first()
+    if row is None:
+        raise HTTPException(404, "任务不存在")
+    return json_response(dict(zip(names, row)), response)
+
+
+@router.put("/{task_id}", response_model=TaskRead)
+async def update_task_async(
+    task_id: int,
+    data: TaskUpdate,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(get_current_user_async),
+):
+    task = await run_write_async(
+        session, crud.update_task_by_id, user.id, task_id, task_changes(data)
+    )
+    if task is None:
+        raise HTTPException(404, "任务不存在")
+    return json_response(task_dict(task))
+
+
+@router.delete("/{task_id}", status_code=204)
+async def delete_task_async(
+    task_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(get_current_user_async),
+):
+    if not await run_write_async(session, crud.delete_task_by_id, user.id, task_id):
+        raise HTTPException(404, "任务不存在")
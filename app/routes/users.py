@@ -1,56 +1,73 @@
 """用户注册、登录、个人信息"""
 
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
 
 from app.database import get_session
 from app.models import User, UserCreate, UserResponse
 from app.models import LoginRequest, ResetPasswordRequest
 from app.auth import (
-    hash_password,
-    verify_password,
     create_access_token,
     get_current_user,
+    password_hasher,
+    token_cache,
 )
 
 router = APIRouter(prefix="/users", tags=["用户"])
 
+# 注册 / 登录 / 重置密码是 async 路由：bcrypt 在进程池里 await，
+# 只有短暂的查库、写库才借用线程池
+
+
+def _find_user(session: Session, username: str) -> Optional[User]:
+    user = session.exec(select(User).where(User.username == username)).first()
+    # 结束读事务、归还连接：接下来要等几百毫秒的 bcrypt，不能一直占着连接池
+    session.close()
+    return user
+
+
+def _save_user(session: Session, user: User) -> User:
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
 
 @router.post("/register", response_model=UserResponse, status_code=201)
-def register(data: UserCreate, session: Session = Depends(get_session)):
+async def register(data: UserCreate, session: Session = Depends(get_session)):
     # 检查用户名是否已存在
-    existing = session.exec(select(User).where(User.username == data.username)).first()
+    existing = await run_in_threadpool(_find_user, session, data.username)
     if existing:
         raise HTTPException(400, "用户名已存在")
     user = User(
         username=data.username,
         email=data.email,
-        hashed_password=hash_password(data.password),
+        hashed_password=await password_hasher.hash(data.password),
     )
-    session.add(user)
-    session.commit()
-    session.refresh(user)
-    return user
+    return await run_in_threadpool(_save_user, session, user)
 
 
 @router.post("/login")
-def login(data: LoginRequest, session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.username == data.username)).first()
-    if not user or not verify_password(data.password, user.hashed_password):
+async def login(data: LoginRequest, session: Session = Depends(get_session)):
+    user = await run_in_threadpool(_find_user, session, data.username)
+    if not user or not await password_hasher.verify(data.password, user.hashed_password):
         raise HTTPException(401, "用户名或密码错误")
     token = create_access_token({"sub": str(user.id)})
     return {"access_token": token, "token_type": "bearer"}
 
 
 @router.post("/reset-password")
-def reset_password(data: ResetPasswordRequest, session: Session = Depends(get_session)):
+async def reset_password(data: ResetPasswordRequest, session: Session = Depends(get_session)):
     """重置密码（用于 hash 异常或忘记密码时恢复登录）"""
-    user = session.exec(select(User).where(User.username == data.username)).first()
+    user = await run_in_threadpool(_find_user, session, data.username)
     if not user:
         raise HTTPException(404, "用户不存在")
-    user.hashed_password = hash_password(data.new_password)
-    session.add(user)
-    session.commit()
+    user.hashed_password = await password_hasher.hash(data.new_password)
+    await run_in_threadpool(_save_user, session, user)
+    token_cache.invalidate_user(user.id)
     return {"message": "密码已更新，请使用新密码登录"}
 
 
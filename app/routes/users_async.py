@@ -0,0 +1,68 @@
+"""用户注册、登录、个人信息 — AsyncSession 版（DB_ASYNC=1 时由 main 挂载）"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.auth import (
+    create_access_token,
+    get_current_user_async,
+    password_hasher,
+    token_cache,
+)
+from app.database import get_async_session
+from app.models import LoginRequest, ResetPasswordRequest, User, UserCreate, UserResponse
+
+router = APIRouter(prefix="/users", tags=["用户"])
+
+
+async def _find_user(session: AsyncSession, username: str) -> Optional[User]:
+    user = (await session.exec(select(User).where(User.username == username))).first()
+    # 和同步版一样：等 bcrypt 之前先归还连接
+    await session.close()
+    return user
+
+
+@router.post("/register", response_model=UserResponse, status_code=201)
+async def register_async(data: UserCreate, session: AsyncSession = Depends(get_async_session)):
+    if await _find_user(session, data.username):
+        raise HTTPException(400, "用户名已存在")
+    user = User(
+        username=data.username,
+        email=data.email,
+        hashed_password=await password_hasher.hash(data.password),
+    )
+    session.add(user)
+    await session.commit()
+    return user
+
+
+@router.post("/login")
+async def login_async(data: LoginRequest, session: AsyncSession = Depends(get_async_session)):
+    user = await _find_user(session, data.username)
+    if not user or not await password_hasher.verify(data.password, user.hashed_password):
+        raise HTTPException(401, "用户名或密码错误")
+    token = create_access_token({"sub": str(user.id)})
+    return {"access_token": token, "token_type": "bearer"}
+
+
+@router.post("/reset-password")
+async def reset_password_async(
+    data: ResetPasswordRequest, session: AsyncSession = Depends(get_async_session)
+):
+    """重置密码（用于 hash 异常或忘记密码时恢复登录）"""
+    user = await _find_user(session, data.username)
+    if not user:
+        raise HTTPException(404, "用户不存在")
+    user.hashed_password = await password_hasher.hash(data.new_password)
+    session.add(user)
+    await session.commit()
+    token_cache.invalidate_user(user.id)
+    return {"message": "密码已更新，请使用新密码登录"}
+
+
+@router.get("/me", response_model=UserResponse)
+async def me_async(current_user: User = Depends(get_current_user_async)):
+    return current_user
@@ -0,0 +1,183 @@
+"""
+任务全文搜索：SQLite FTS5 外部内容表 task_fts 索引任务的标题和描述，由触发器随任务增删改同步。
+
+- trigram 分词：中文词之间没有空格，按词切不开；trigram 给任意连续三个字符建索引，
+  标题 / 描述里任意位置的子串都能命中（不区分大小写）
+- 少于 3 个字的词用不上 trigram 索引：和长词一起出现时只在 FTS 命中的行上用 LIKE 再过滤，
+  整个查询都是短词时退回按用户扫描的 LIKE
+- 按 bm25 相关度排序，标题命中的权重高于描述
+- user_id 是 UNINDEXED 列：排序的 CTE 在 FTS 查询里就按用户过滤，bm25 只给本用户的命中算。
+  MATCH 本身仍会扫到所有用户的命中（UNINDEXED 列不能进 MATCH），外部内容表读 user_id 要回 task 表取
+- 非 SQLite 数据库没有 task_fts，一律走 LIKE
+
+虚拟表和触发器挂在 task 表的 after_create 上，和 create_all 一起建；老库由 create_db
+调 ensure_search_index 补建并回填（没有 user_id 列的旧索引整个重建）。索引和任务表不一致时用 python -m app.cli rebuild-search 重建。
+"""
+
+import unicodedata
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import column, event, func, literal_column, or_, table
+from sqlalchemy import select as select_rows
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DatabaseError
+from sqlmodel import Session, select
+
+from app.models import Task
+
+SEARCH_MAX_TERMS = 8  # 查询里最多取这么多个词，多余的忽略
+TRIGRAM = 3
+TITLE_WEIGHT = 10.0  # bm25 列权重（描述为 1）
+
+_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS task_fts USING fts5("
+    "title, description, user_id UNINDEXED, content='task', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_ai AFTER INSERT ON task BEGIN "
+    "INSERT INTO task_fts(rowid, title, description, user_id) "
+    "VALUES (new.id, new.title, new.description, new.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_ad AFTER DELETE ON task BEGIN "
+    "INSERT INTO task_fts(task_fts, rowid, title, description, user_id) "
+    "VALUES ('delete', old.id, old.title, old.description, old.user_id); END",
+    # 只改状态 / 优先级时不碰索引
+    "CREATE TRIGGER IF NOT EXISTS task_fts_au AFTER UPDATE OF title, description, user_id ON task BEGIN "
+    "INSERT INTO task_fts(task_fts, rowid, title, description, user_id) "
+    "VALUES ('delete', old.id, old.title, old.description, old.user_id); "
+    "INSERT INTO task_fts(rowid, title, description, user_id) "
+    "VALUES (new.id, new.title, new.description, new.user_id); END",
+]
+_TRIGGERS = ("task_fts_ai", "task_fts_ad", "task_fts_au")
+
+_task_fts = table("task_fts", column("rowid"), column("user_id"))
+_fts = literal_column("task_fts")
+
+
+def _create_fts(connection: Connection):
+    for ddl in _DDL:
+        connection.exec_driver_sql(ddl)
+
+
+@event.listens_for(Task.__table__, "after_create")
+def _after_task_create(target, connection: Connection, **kw):
+    if connection.dialect.name == "sqlite":
+        _create_fts(connection)
+
+
+@event.listens_for(Task.__table__, "before_drop")
+def _before_task_drop(target, connection: Connection, **kw):
+    # 触发器随 task 表一起删；虚拟表要单独删
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("DROP TABLE IF EXISTS task_fts")
+
+
+def ensure_search_index(bind: Engine) -> bool:
+    """老库补建 task_fts 和触发器并从任务表回填；返回这次是否新建了索引"""
+    if bind.dialect.name != "sqlite":
+        return False
+    with bind.begin() as conn:
+        sql = conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'task_fts'"
+        ).scalar()
+        if sql is not None and "user_id" not in sql:
+            # 旧索引没有 user_id 列：连同触发器删掉重建
+            for trigger in _TRIGGERS:
+                conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+            conn.exec_driver_sql("DROP TABLE task_fts")
+            sql = None
+        _create_fts(conn)
+        if sql is None:
+            conn.exec_driver_sql("INSERT INTO task_fts(task_fts) VALUES ('rebuild')")
+    return sql is None
+
+
+def rebuild_search_index(bind: Engine) -> int:
+    """从任务表整体重建索引并合并段，返回索引的任务数"""
+    with bind.begin() as conn:
+        _create_fts(conn)
+        conn.exec_driver_sql("INSERT INTO task_fts(task_fts) VALUES ('rebuild')")
+        conn.exec_driver_sql("INSERT INTO task_fts(task_fts) VALUES ('optimize')")
+        return conn.exec_driver_sql("SELECT count(*) FROM task").scalar_one()
+
+
+def check_search_index(bind: Engine) -> bool:
+    """FTS5 integrity-check（rank=1 时和任务表逐行比对），不一致返回 False"""
+    with bind.connect() as conn:
+        try:
+            conn.exec_driver_sql("INSERT INTO task_fts(task_fts, rank) VALUES ('integrity-check', 1)")
+        except DatabaseError as e:  # 不一致时报 SQLITE_CORRUPT_VTAB："database disk image is malformed"
+            if "malformed" in str(e):
+                return False
+            raise
+        finally:
+            conn.rollback()
+    return True
+
+
+def parse_query(q: str) -> List[str]:
+    """按空白切词（先做 NFKC 归一），去重，最多 SEARCH_MAX_TERMS 个；词之间是"且"的关系"""
+    terms = unicodedata.normalize("NFKC", q).split()
+    return list(dict.fromkeys(terms))[:SEARCH_MAX_TERMS]
+
+
+def _phrase(term: str) -> str:
+    """FTS5 查询语法里的短语：用户输入的 AND / * / 引号等一律当普通字符"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _contains(term: str):
+    pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    return or_(Task.title.ilike(pattern, escape="\\"), Task.description.ilike(pattern, escape="\\"))
+
+
+def search_tasks(
+    session: Session,
+    user_id: int,
+    q: str,
+    status: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+    use_fts: bool = True,
+    columns: Optional[Sequence] = None,
+) -> Tuple[list, int]:
+    """
+    在当前用户的任务标题和描述里搜索，返回 (本页任务, 匹配总数)。
+    走 FTS 时按相关度排序，否则按最近更新排序；use_fts=False 强制用 LIKE（基准对照用）。
+    columns 为 Task 的列时只查这些列，返回 Row 而不是 Task 对象。
+    """
+    # 按列查询用 SQLAlchemy 的 select：sqlmodel 的 select 遇到单列时 exec 返回标量而不是 Row
+    select_page = select if columns is None else select_rows
+    entities = columns or (Task,)
+    terms = parse_query(q)
+    if not terms:
+        return [], 0
+    conditions = [Task.user_id == user_id]
+    if status:
+        conditions.append(Task.status == status)
+    indexed = [t for t in terms if len(t) >= TRIGRAM]
+    use_fts = use_fts and bool(indexed) and session.get_bind().dialect.name == "sqlite"
+
+    if use_fts:
+        # 先在 task_fts 里取出全部命中再按主键回表。直接 JOIN 时规划器会从 user_id 索引出发，
+        # 对该用户的每一行都跑一次 MATCH（10 万行要秒级）；MATERIALIZED 强制 FTS 在外层。
+        # bm25 每个命中约 2 µs，ranked 里先按 user_id 过滤，只算本用户的；计数不需要 rank，
+        # 单独用不带过滤的 hits，回表 JOIN 时才筛用户（CTE 里再读 user_id 等于多回一次表，反而慢）
+        match = _fts.match(" ".join(map(_phrase, indexed)))
+        conditions += [_contains(t) for t in terms if len(t) < TRIGRAM]
+        hits = select(_task_fts.c.rowid.label("id")).where(match).cte("hits").prefix_with("MATERIALIZED")
+        ranked = (
+            select(_task_fts.c.rowid.label("id"), func.bm25(_fts, TITLE_WEIGHT, 1.0).label("rank"))
+            .where(match, _task_fts.c.user_id == user_id)
+            .cte("ranked")
+            .prefix_with("MATERIALIZED")
+        )
+        count = select(func.count()).select_from(Task).join(hits, hits.c.id == Task.id)
+        page = select_page(*entities).join(ranked, ranked.c.id == Task.id).order_by(ranked.c.rank, Task.id.desc())
+    else:
+        conditions += [_contains(t) for t in terms]
+        count = select(func.count()).select_from(Task)
+        page = select_page(*entities).order_by(Task.updated_at.desc(), Task.id.desc())
+
+    total = session.exec(count.where(*conditions)).one()
+    if total == 0 or offset >= total:
+        return [], total
+    tasks = session.exec(page.where(*conditions).offset(offset).limit(limit)).all()
+    return list(tasks), total
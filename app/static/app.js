@@ -74,19 +74,11 @@ async function doRegister() {
   }
 }
 
-// ── 加载任务列表 ──
-async function loadTasks() {
-  const res = await fetch(API + '/tasks/', { headers: headers() });
-  if (!res.ok) { window.location.href = '/login'; return; }
-  const tasks = await res.json();
-  const container = document.getElementById('task-list');
-
-  if (tasks.length === 0) {
-    container.innerHTML = '<p class="empty">还没有任务，点击"添加"或让 AI 帮你创建！</p>';
-    return;
-  }
+// ── 加载任务列表（游标分页，首屏只取一页）──
+let nextCursor = null;
 
-  container.innerHTML = tasks.map(t => `
+function renderTask(t) {
+  return `
     <div class="task-item ${t.status === 'done' ? 'done' : ''}">
       <div class="task-main">
         <span class="task-priority priority-${t.priority}">${t.priority}</span>
@@ -98,7 +90,166 @@ async function loadTasks() {
         <button onclick="deleteTask(${t.id})">✕</button>
       </div>
     </div>
-  `).join('');
+  `;
+}
+
+// 每页按 URL 缓存 {etag, page}；带 If-None-Match 请求，304 时直接用缓存，
+// 服务端只查一次版本号，不读任务也不序列化。放 sessionStorage，刷新页面也能命中
+function cachedPage(url) {
+  try { return JSON.parse(sessionStorage.getItem('tasks:' + url)); } catch (e) { return null; }
+}
+
+async function fetchTaskPage(cursor) {
+  const url = API + '/tasks/' + (cursor ? '?cursor=' + encodeURIComponent(cursor) : '');
+  const cached = cachedPage(url);
+  const h = headers();
+  if (cached) h['If-None-Match'] = cached.etag;
+  const res = await fetch(url, { headers: h });
+  if (res.status === 304 && cached) return { ...cached.page, etag: cached.etag };
+  if (!res.ok) { window.location.href = '/login'; return null; }
+  const page = await res.json();
+  const etag = res.headers.get('ETag');
+  if (etag) {
+    try {
+      sessionStorage.setItem('tasks:' + url, JSON.stringify({ etag, page }));
+    } catch (e) { /* 存储满了就不缓存 */ }
+  }
+  return { ...page, etag };
+}
+
+function renderMoreButton(container) {
+  const old = document.getElementById('load-more');
+  if (old) old.remove();
+  if (nextCursor) {
+    container.insertAdjacentHTML('beforeend',
+      '<button id="load-more" class="load-more" onclick="loadMoreTasks()">加载更多</button>');
+  }
+}
+
+let renderedEtag = null;  // 当前列表对应的版本；没变就不重绘，保留已加载的更多页
+let loadedTasks = new Map();  // id → 任务，当前列表里的全部任务
+let syncCursor = null;  // /tasks/changes 的游标
+
+function renderLoaded() {
+  const container = document.getElementById('task-list');
+  const tasks = [...loadedTasks.values()].sort((a, b) =>
+    a.updated_at === b.updated_at ? b.id - a.id : (a.updated_at < b.updated_at ? 1 : -1));
+  if (tasks.length === 0 && !nextCursor) {
+    container.innerHTML = '<p class="empty">还没有任务，点击"添加"或让 AI 帮你创建！</p>';
+    return;
+  }
+  container.innerHTML = tasks.map(renderTask).join('');
+  renderMoreButton(container);
+}
+
+async function fetchChanges(since) {
+  const url = API + '/tasks/changes' + (since !== null ? '?since=' + encodeURIComponent(since) : '');
+  const res = await fetch(url, { headers: headers() });
+  return res.ok ? res.json() : null;
+}
+
+// 全量加载第一页；先取同步游标，加载期间的改动会在下一次增量里再收到
+async function loadTasks() {
+  const sync = await fetchChanges(null);
+  const page = await fetchTaskPage(null);
+  if (!page) return;
+  if (sync) syncCursor = sync.cursor;
+  if (page.etag && page.etag === renderedEtag) return;
+  renderedEtag = page.etag;
+  nextCursor = page.next_cursor;
+  loadedTasks = new Map(page.items.map(t => [t.id, t]));
+  renderLoaded();
+}
+
+// 增量同步：只拉 syncCursor 之后的变化，先删后改，就地更新列表
+async function applyChanges() {
+  if (syncCursor === null) return loadTasks();
+  const delta = await fetchChanges(syncCursor);
+  if (!delta || delta.reset) return loadTasks();
+  syncCursor = delta.cursor;
+  if (delta.changes.length === 0 && delta.deleted.length === 0) return;
+  delta.deleted.forEach(id => loadedTasks.delete(id));
+  delta.changes.forEach(t => loadedTasks.set(t.id, t));
+  renderedEtag = null;
+  renderLoaded();
+}
+
+// 同一时间只跑一次同步；期间又有触发就在结束后再跑一次
+let syncInFlight = null;
+let syncAgain = false;
+
+function syncTasks() {
+  if (syncInFlight) { syncAgain = true; return syncInFlight; }
+  syncInFlight = applyChanges().finally(() => {
+    syncInFlight = null;
+    if (syncAgain) { syncAgain = false; syncTasks(); }
+  });
+  return syncInFlight;
+}
+
+async function loadMoreTasks() {
+  if (!nextCursor) return;
+  const page = await fetchTaskPage(nextCursor);
+  if (!page) return;
+  nextCursor = page.next_cursor;
+  page.items.forEach(t => loadedTasks.set(t.id, t));
+  renderLoaded();
+}
+
+// ── 实时推送：WebSocket 优先，连不上改用 SSE（fetch 读流，可以带 Authorization 头）──
+// 事件只带版本号，收到后走增量同步；断线按指数退避重连
+let eventRetry = 1000;
+
+function onTaskEvent(ev) {
+  if (ev.type === 'resync' || (ev.type === 'ready' && syncCursor !== null)) {
+    syncTasks();
+  } else if (ev.type === 'tasks_changed' && (syncCursor === null || ev.version > Number(syncCursor))) {
+    syncTasks();
+  }
+}
+
+function reconnectEvents(useSse) {
+  setTimeout(() => connectEvents(useSse), eventRetry);
+  eventRetry = Math.min(eventRetry * 2, 30000);
+}
+
+function connectEvents(useSse) {
+  if (useSse || !('WebSocket' in window)) return connectSse();
+  const ws = new WebSocket((location.protocol === 'https:' ? 'wss://' : 'ws://') + location.host + '/events/ws');
+  let opened = false;
+  ws.onopen = () => {
+    opened = true;
+    eventRetry = 1000;
+    ws.send(JSON.stringify({ token }));
+  };
+  ws.onmessage = (m) => onTaskEvent(JSON.parse(m.data));
+  ws.onclose = (e) => {
+    if (e.code === 1008) return;  // token 无效，不再重连
+    reconnectEvents(!opened);  // 从没连上过（代理不支持 WebSocket 等）就改用 SSE
+  };
+}
+
+async function connectSse() {
+  try {
+    const res = await fetch(API + '/events', { headers: headers() });
+    if (res.status === 401) return;
+    if (!res.ok) throw new Error(res.status);
+    eventRetry = 1000;
+    const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += value;
+      let end;
+      while ((end = buffer.indexOf('\n\n')) >= 0) {
+        const data = buffer.slice(0, end).split('\n').find(l => l.startsWith('data: '));
+        buffer = buffer.slice(end + 2);
+        if (data) onTaskEvent(JSON.parse(data.slice(6)));
+      }
+    }
+  } catch (e) { /* 断线，稍后重连 */ }
+  reconnectEvents(true);
 }
 
 // ── 添加任务 ──
@@ -116,7 +267,7 @@ async function addTask() {
   });
   document.getElementById('new-task-title').value = '';
   document.getElementById('add-task-form').style.display = 'none';
-  loadTasks();
+  syncTasks();
 }
 
 // ── 完成/删除任务 ──
@@ -125,15 +276,43 @@ async function completeTask(id) {
     method: 'PUT', headers: headers(),
     body: JSON.stringify({status: 'done'}),
   });
-  loadTasks();
+  syncTasks();
 }
 
 async function deleteTask(id) {
   await fetch(API + `/tasks/${id}`, { method: 'DELETE', headers: headers() });
-  loadTasks();
+  syncTasks();
 }
 
 // ── AI 聊天 ──
+const TOOL_LABELS = {
+  create_task: '创建任务', list_tasks: '查询任务', update_task: '更新任务',
+  get_task_summary: '统计任务', get_completed_tasks_this_week: '查询本周完成',
+};
+
+// 当前会话：服务端保存历史，刷新页面后接着聊
+let chatThreadId = localStorage.getItem('chatThreadId');
+const CHAT_GREETING = '你好！我是 TaskFlow AI 助手。';
+
+function newChat() {
+  chatThreadId = null;
+  localStorage.removeItem('chatThreadId');
+  document.getElementById('chat-messages').innerHTML = '';
+  appendMessage('ai', CHAT_GREETING);
+}
+
+async function restoreChat() {
+  if (!chatThreadId) return;
+  const res = await fetch(API + '/chat/threads/' + chatThreadId, { headers: headers() });
+  if (!res.ok) {
+    if (res.status === 404) newChat();
+    return;
+  }
+  const thread = await res.json();
+  if (thread.summary) appendMessage('tool', '（更早的对话已整理成摘要）');
+  thread.messages.forEach(m => appendMessage(m.role, m.content));
+}
+
 async function sendChat() {
   const input = document.getElementById('chat-input');
   const msg = input.value.trim();
@@ -142,31 +321,73 @@ async function sendChat() {
 
   // 显示用户消息
   appendMessage('user', msg);
+  // AI 回复先占位，token 到了逐段追加
+  const replyDiv = appendMessage('ai', '思考中…');
+  let replyText = '';
+  const toolDivs = {};
+
+  function onChatEvent(event) {
+    if (event.type === 'start') {
+      chatThreadId = String(event.thread_id);
+      localStorage.setItem('chatThreadId', chatThreadId);
+    } else if (event.type === 'token') {
+      replyText += event.text;
+      replyDiv.textContent = replyText;
+    } else if (event.type === 'tool_start') {
+      const label = TOOL_LABELS[event.name] || event.name;
+      toolDivs[event.name] = insertBefore(replyDiv, 'tool', '⏳ 正在' + label + '…');
+      replyText = '';  // 调用工具前的文字不算最终回复
+      replyDiv.textContent = '思考中…';
+    } else if (event.type === 'tool_end') {
+      const div = toolDivs[event.name];
+      if (div) div.textContent = '✓ ' + (TOOL_LABELS[event.name] || event.name);
+    } else if (event.type === 'done') {
+      replyDiv.textContent = event.reply || replyText || 'AI 未返回有效回复';
+    } else if (event.type === 'error') {
+      replyDiv.textContent = event.detail;
+    }
+    scrollChat();
+  }
 
   try {
-    const res = await fetch(API + '/chat/', {
+    const res = await fetch(API + '/chat/stream', {
       method: 'POST', headers: headers(),
-      body: JSON.stringify({message: msg}),
+      body: JSON.stringify({message: msg, thread_id: chatThreadId ? Number(chatThreadId) : null}),
     });
     if (!res.ok) {
       if (res.status === 401) {
         window.location.href = '/login';
         return;
       }
+      if (res.status === 404) {
+        // 会话已被删除：下一条消息开新会话
+        chatThreadId = null;
+        localStorage.removeItem('chatThreadId');
+      }
       const errData = await res.json().catch(() => ({}));
       const detail = (typeof errData.detail === 'string' ? errData.detail : errData.detail ? String(errData.detail) : null) || ('HTTP ' + res.status);
-      appendMessage('ai', 'AI 请求失败：' + detail);
+      replyDiv.textContent = 'AI 请求失败：' + detail;
       return;
     }
-    const data = await res.json();
-    const reply = data && data.reply;
-    appendMessage('ai', reply != null ? reply : 'AI 未返回有效回复');
+    const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += value;
+      let end;
+      while ((end = buffer.indexOf('\n\n')) >= 0) {
+        const data = buffer.slice(0, end).split('\n').find(l => l.startsWith('data: '));
+        buffer = buffer.slice(end + 2);
+        if (data) onChatEvent(JSON.parse(data.slice(6)));
+      }
+    }
   } catch (e) {
-    appendMessage('ai', 'AI 请求失败：' + (e.message || '网络错误'));
+    replyDiv.textContent = 'AI 请求失败：' + (e.message || '网络错误');
   }
 
-  // AI 可能操作了任务，刷新列表
-  loadTasks();
+  // AI 可能操作了任务，同步变化
+  syncTasks();
 }
 
 function appendMessage(role, text) {
@@ -175,10 +396,28 @@ function appendMessage(role, text) {
   div.className = 'msg ' + role;
   div.textContent = text;
   container.appendChild(div);
+  scrollChat();
+  return div;
+}
+
+function insertBefore(anchor, role, text) {
+  const div = document.createElement('div');
+  div.className = 'msg ' + role;
+  div.textContent = text;
+  anchor.parentNode.insertBefore(div, anchor);
+  return div;
+}
+
+function scrollChat() {
+  const container = document.getElementById('chat-messages');
   container.scrollTop = container.scrollHeight;
 }
 
 // ── 页面加载时 ──
 if (document.getElementById('task-list')) {
   loadTasks();
+  restoreChat();
+  connectEvents(false);
+  // 切回页面时也拉一次增量（兜底：推送断开期间或其他 worker 上的改动）
+  window.addEventListener('focus', syncTasks);
 }
\ No newline at end of file
@@ -0,0 +1,269 @@
+"""任务导入导出：流式编解码，内存占用与任务总数无关"""
+
+import codecs
+import csv
+import io
+import os
+from typing import AsyncIterable, Awaitable, Callable, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+import zstandard
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from pydantic import ValidationError
+
+from app.models import ImportRowError, Task, TaskCreate, TaskImportResult
+
+EXPORT_FIELDS = ["id", "title", "description", "priority", "status", "created_at", "updated_at"]
+EXPORT_BATCH = 1000  # 每批从游标取的行数，也是每次写出的块大小
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def iter_task_rows(bind: Engine, user_id: int, batch: int = EXPORT_BATCH) -> Iterator[list]:
+    """
+    按 id 顺序分批读出该用户的任务（只取需要的列，不建 ORM 对象）。
+    yield_per 让驱动边读边给，SQLite 游标本身就是流式的，PostgreSQL 会用服务端游标。
+    用独立会话：StreamingResponse 发送时请求依赖里的会话已经关闭。
+    """
+    columns = [getattr(Task, name) for name in EXPORT_FIELDS]
+    query = (
+        select(*columns)
+        .where(Task.user_id == user_id)
+        .order_by(Task.id)
+        .execution_options(yield_per=batch)
+    )
+    with Session(bind) as session:
+        for rows in session.execute(query).partitions():
+            yield rows
+
+
+def encode_ndjson(batches: Iterable[list]) -> Iterator[bytes]:
+    for rows in batches:
+        yield b"".join(
+            orjson.dumps(dict(zip(EXPORT_FIELDS, row)), option=orjson.OPT_APPEND_NEWLINE)
+            for row in rows
+        )
+
+
+def encode_csv(batches: Iterable[list]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for rows in batches:
+        writer.writerows(
+            [v.isoformat() if hasattr(v, "isoformat") else v for v in row] for row in rows
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def zstd_stream(chunks: Iterable[bytes], level: int = 3) -> Iterator[bytes]:
+    """逐块压缩；每块都 flush 出一个 zstd block，客户端可以边收边解"""
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        if data:
+            yield data
+    yield compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def export_stream(
+    bind: Engine, user_id: int, fmt: str, compression: Optional[str] = None
+) -> Iterator[bytes]:
+    encode = encode_ndjson if fmt == "ndjson" else encode_csv
+    chunks = encode(iter_task_rows(bind, user_id))
+    return zstd_stream(chunks) if compression == "zstd" else chunks
+
+
+# ── 导入 ──
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "1000"))  # 每个写事务的行数
+IMPORT_MAX_RECORD_CHARS = 64 * 1024  # 单条记录上限，超出的记录跳过并报错
+IMPORT_MAX_ERRORS = 100  # 结果里最多列出的错误条数
+
+
+class ImportAborted(Exception):
+    """上传内容无法继续解析（如编码错误）；created 为此前已提交的条数"""
+
+    def __init__(self, message: str, created: int = 0):
+        super().__init__(message)
+        self.created = created
+
+
+def validation_detail(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in exc.errors()
+    )
+
+
+class RecordSplitter:
+    """
+    把上传的字节块切成完整记录 (起始行号, 文本)，缓冲区只保留最后一条不完整的记录。
+    quoted=True 时按 CSV 规则处理：引号内的换行不结束记录（"" 转义不影响引号奇偶）。
+    超过 max_chars 的记录整条丢弃，记入 errors，缓冲区不会因此无限增长。
+    """
+
+    def __init__(self, quoted: bool = False, max_chars: Optional[int] = None):
+        self.quoted = quoted
+        self.max_chars = max_chars or IMPORT_MAX_RECORD_CHARS
+        self.errors: List[Tuple[int, str]] = []
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._tail = ""  # 尚未遇到换行的部分
+        self._record: List[str] = []  # 当前记录已收下的行
+        self._record_size = 0
+        self._record_line = 1
+        self._line = 1  # 下一行的行号
+        self._in_quotes = False
+        self._skipping = False
+
+    def feed(self, data: bytes) -> List[Tuple[int, str]]:
+        try:
+            text = self._decoder.decode(data)
+        except UnicodeDecodeError as e:
+            raise ImportAborted(f"第 {self._line} 行附近不是合法的 UTF-8：{e.reason}")
+        lines = (self._tail + text).split("\n")
+        self._tail = lines.pop()
+        records = []
+        for line in lines:
+            record = self._push_line(line)
+            if record is not None:
+                records.append(record)
+        if not self._skipping and self._record_size + len(self._tail) > self.max_chars:
+            self._skip()
+        if self._skipping:
+            # 丢掉的半行也要计入引号奇偶，才能找到这条记录真正的结尾
+            self._toggle_quotes(self._tail)
+            self._tail = ""
+        return records
+
+    def finish(self) -> List[Tuple[int, str]]:
+        tail = self._tail + self._decoder.decode(b"", final=True)
+        if self._skipping or not (tail or self._record):
+            return []
+        # 末行没有换行；引号仍未闭合时原样交给 CSV 解析器报错
+        return [(self._record_line, "\n".join(self._record + [tail]))]
+
+    def _push_line(self, line: str) -> Optional[Tuple[int, str]]:
+        self._line += 1
+        self._toggle_quotes(line)
+        if not self._skipping:
+            self._record.append(line)
+            self._record_size += len(line) + 1
+            if self._record_size > self.max_chars:
+                self._skip()
+        if self._in_quotes:
+            return None
+        record = None if self._skipping else (self._record_line, "\n".join(self._record))
+        self._skipping = False
+        self._record = []
+        self._record_size = 0
+        self._record_line = self._line
+        return record
+
+    def _toggle_quotes(self, text: str):
+        if self.quoted and text.count('"') % 2:
+            self._in_quotes = not self._in_quotes
+
+    def _skip(self):
+        self.errors.append((self._record_line, f"记录超过 {self.max_chars} 个字符，已跳过"))
+        self._skipping = True
+        self._record = []
+        self._record_size = 0
+
+
+def _parse_ndjson(text: str) -> dict:
+    try:
+        data = orjson.loads(text)
+    except orjson.JSONDecodeError:
+        raise ValueError("不是合法的 JSON")
+    if not isinstance(data, dict):
+        raise ValueError("每行应为一个 JSON 对象")
+    return data
+
+
+class _CsvRows:
+    """第一条记录是表头；空单元格视为未填写，走 TaskCreate 的默认值"""
+
+    def __init__(self):
+        self.header: Optional[List[str]] = None
+
+    def __call__(self, text: str) -> Optional[dict]:
+        try:
+            values = next(csv.reader([text], strict=True), [])
+        except csv.Error as e:
+            raise ValueError(f"CSV 格式错误：{e}")
+        if self.header is None:
+            self.header = [name.strip() for name in values]
+            return None
+        if len(values) > len(self.header):
+            raise ValueError("列数多于表头")
+        return {k: v for k, v in zip(self.header, values) if v != ""}
+
+
+async def import_stream(
+    chunks: AsyncIterable[bytes],
+    fmt: str,
+    write_rows: Callable[[List[dict]], Awaitable[int]],
+) -> TaskImportResult:
+    """
+    边收边解析上传内容，逐条用 TaskCreate 校验，每 IMPORT_CHUNK_ROWS 条交给 write_rows
+    写一个事务。写入期间不读下一块，客户端自然被 TCP 背压限速，内存只有一个批次。
+    中途失败时已提交的批次保留（ImportAborted.created 报告条数）。
+    """
+    splitter = RecordSplitter(quoted=fmt == "csv")
+    parse = _parse_ndjson if fmt == "ndjson" else _CsvRows()
+    result = TaskImportResult(created=0, rejected=0, errors=[])
+    pending: List[dict] = []
+
+    def reject(line: int, detail: str):
+        result.rejected += 1
+        if len(result.errors) < IMPORT_MAX_ERRORS:
+            result.errors.append(ImportRowError(line=line, detail=detail))
+
+    def consume(records: List[Tuple[int, str]]):
+        for line, detail in splitter.errors:
+            reject(line, detail)
+        splitter.errors.clear()
+        for line, text in records:
+            if not text.strip():
+                continue
+            try:
+                data = parse(text)
+                if data is None:
+                    continue
+                task = TaskCreate.model_validate(data)
+            except ValidationError as e:
+                reject(line, validation_detail(e))
+                continue
+            except ValueError as e:
+                reject(line, str(e))
+                continue
+            pending.append(
+                {
+                    "title": task.title,
+                    "description": task.description,
+                    "priority": task.priority.value,
+                    "status": task.status.value,
+                }
+            )
+
+    async def flush():
+        result.created += await write_rows(pending[:])
+        pending.clear()
+
+    try:
+        async for data in chunks:
+            consume(splitter.feed(data))
+            if len(pending) >= IMPORT_CHUNK_ROWS:
+                await flush()
+        consume(splitter.finish())
+    except ImportAborted as e:
+        e.created = result.created
+        raise
+    if pending:
+        await flush()
+    return result
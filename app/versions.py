@@ -0,0 +1,127 @@
+"""
+每个用户一个任务数据版本号：app.crud 的每个写操作都在同一事务里 +1，
+并把新版本号记到改动的任务行（change_version）或删除墓碑上。
+
+- 读接口据此生成弱 ETag，If-None-Match 命中时只查一行版本号就返回 304；
+- /tasks/changes 以版本号为游标返回增量。同一用户的写事务都要更新版本行，
+  在这一行上串行，所以版本号的提交顺序和大小顺序一致，游标单调且不会漏掉并发写入。
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, insert, update
+from sqlmodel import Session, select
+
+from app.models import Task, TaskChanges, TaskTombstone, TaskVersion
+
+CHANGES_MAX = 1000  # 单次增量的上限，超出时让客户端全量重来
+
+
+def bump_version(session: Session, user_id: int) -> int:
+    """+1 并返回新版本号；写进当前事务（不提交），和任务改动一起生效"""
+    version = session.execute(
+        update(TaskVersion)
+        .where(TaskVersion.user_id == user_id)
+        .values(version=TaskVersion.version + 1)
+        .returning(TaskVersion.version)
+    ).scalar()
+    if version is None:
+        session.execute(insert(TaskVersion).values(user_id=user_id, version=1))
+        version = 1
+    # 提交后由 app.events 按用户推送（只保留本事务里的最新版本）
+    session.info.setdefault("task_versions", {})[user_id] = version
+    return version
+
+
+def get_version(session: Session, user_id: int) -> int:
+    version = session.exec(
+        select(TaskVersion.version).where(TaskVersion.user_id == user_id)
+    ).first()
+    return version or 0
+
+
+def add_tombstones(session: Session, user_id: int, task_ids: List[int], version: int):
+    # SQLite 可能复用被删的最大 id，同一 id 再次删除时覆盖旧墓碑
+    session.execute(
+        delete(TaskTombstone).where(
+            TaskTombstone.user_id == user_id, TaskTombstone.task_id.in_(task_ids)
+        )
+    )
+    now = datetime.now()
+    session.execute(
+        insert(TaskTombstone),
+        [
+            {"user_id": user_id, "task_id": task_id, "version": version, "deleted_at": now}
+            for task_id in task_ids
+        ],
+    )
+
+
+def get_changes(
+    session: Session, user_id: int, since: Optional[int], limit: int = CHANGES_MAX
+) -> TaskChanges:
+    """
+    since 之后改动过的任务和删除的任务 ID；客户端先应用 deleted 再应用 changes。
+    先读版本号再读改动：两次读之间有新写入时，下一轮会再收到一次（按 id 覆盖即可），不会漏。
+    """
+    row = session.exec(
+        select(TaskVersion.version, TaskVersion.pruned_version).where(
+            TaskVersion.user_id == user_id
+        )
+    ).first()
+    current, pruned = row or (0, 0)
+    cursor = str(current)
+    if since is None or since > current or since < pruned:
+        return TaskChanges(cursor=cursor, reset=True)
+    if since == current:
+        return TaskChanges(cursor=cursor)
+
+    tasks = session.exec(
+        select(Task)
+        .where(Task.user_id == user_id, Task.change_version > since)
+        .order_by(Task.change_version, Task.id)
+        .limit(limit + 1)
+    ).all()
+    deleted = session.exec(
+        select(TaskTombstone.task_id)
+        .where(TaskTombstone.user_id == user_id, TaskTombstone.version > since)
+        .limit(limit + 1)
+    ).all()
+    if len(tasks) > limit or len(deleted) > limit:
+        return TaskChanges(cursor=cursor, reset=True)
+    return TaskChanges(cursor=cursor, changes=tasks, deleted=deleted)
+
+
+def prune_tombstones(session: Session, before: datetime) -> int:
+    """删除 before 之前的墓碑，记下每个用户被清理到的版本号；返回删除条数（调用方 commit）"""
+    pruned: Dict[int, int] = dict(
+        session.exec(
+            select(TaskTombstone.user_id, func.max(TaskTombstone.version))
+            .where(TaskTombstone.deleted_at < before)
+            .group_by(TaskTombstone.user_id)
+        ).all()
+    )
+    for user_id, version in pruned.items():
+        session.execute(
+            update(TaskVersion)
+            .where(TaskVersion.user_id == user_id, TaskVersion.pruned_version < version)
+            .values(pruned_version=version)
+        )
+    result = session.execute(delete(TaskTombstone).where(TaskTombstone.deleted_at < before))
+    return result.rowcount
+
+
+def make_etag(user_id: int, version: int) -> str:
+    # 同一 URL 不同用户的内容不同，ETag 里带上用户 ID
+    return f'W/"{user_id}-{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 按弱比较：忽略 W/ 前缀，支持逗号分隔的多个值和 *"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == target for tag in if_none_match.split(","))
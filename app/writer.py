@@ -0,0 +1,132 @@
+"""
+组提交写线程（SQLITE_GROUP_COMMIT=1 时启用）。
+
+SQLite 同一时刻只有一个写者，并发请求各自提交时会抢锁（database is locked）
+并且每次提交都要落盘一次。这里把任务写操作排进一个队列，由单个线程取出一批，
+在同一个事务里依次执行、一次提交；批内某个操作出错时整批回滚，再逐个单独重试，
+保证错误只影响出错的那个请求。
+"""
+
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel
+
+from app.database import SQLITE_GROUP_COMMIT, engine
+
+GROUP_COMMIT_MAX_BATCH = 128
+
+_Item = Tuple[Callable, tuple, dict, Future]
+
+
+class GroupCommitWriter:
+    def __init__(self, bind: Engine, max_batch: int = GROUP_COMMIT_MAX_BATCH):
+        self.bind = bind
+        self.max_batch = max_batch
+        self.batches = 0
+        self.writes = 0
+        self._queue: "queue.Queue[Optional[_Item]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """排队一个写操作 fn(session, *args, **kwargs)，返回的 Future 在提交后才完成"""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((fn, args, kwargs, future))
+        return future
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="taskflow-group-commit", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._queue.put(None)
+                self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            # 不额外等待：上一批提交期间排进来的请求自然组成下一批
+            while len(batch) < self.max_batch:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._execute(batch)
+                    return
+                batch.append(nxt)
+            self._execute(batch)
+
+    def _execute(self, batch: List[_Item]):
+        pending = [item for item in batch if item[3].set_running_or_notify_cancel()]
+        if not pending:
+            return
+        self.batches += 1
+        self.writes += len(pending)
+        if len(pending) == 1:
+            self._execute_one(pending[0])
+            return
+        try:
+            with Session(self.bind, expire_on_commit=False) as session:
+                results = [fn(session, *args, **kwargs) for fn, args, kwargs, _ in pending]
+                session.commit()
+        except Exception:
+            # 整批已回滚：逐个单独重试，只让真正出错的请求失败
+            for item in pending:
+                self._execute_one(item)
+            return
+        for (_, _, _, future), result in zip(pending, results):
+            future.set_result(result)
+
+    def _execute_one(self, item: _Item):
+        fn, args, kwargs, future = item
+        try:
+            with Session(self.bind, expire_on_commit=False) as session:
+                result = fn(session, *args, **kwargs)
+                session.commit()
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+
+writer: Optional[GroupCommitWriter] = GroupCommitWriter(engine) if SQLITE_GROUP_COMMIT else None
+
+
+def run_write(session: Session, fn: Callable, *args, **kwargs):
+    """
+    执行一个任务写操作 fn(session, ...) 并提交。
+    开启组提交时交给写线程（fn 拿到的是写线程的会话），否则在当前会话里直接执行。
+    """
+    if writer is None:
+        result = fn(session, *args, **kwargs)
+        session.commit()
+        if isinstance(result, SQLModel):
+            session.refresh(result)  # 提交后已过期，和写线程一样返回完整对象
+        return result
+    return writer.submit(fn, *args, **kwargs).result()
+
+
+async def run_write_async(session, fn: Callable, *args, **kwargs):
+    """run_write 的 AsyncSession 版本"""
+    if writer is None:
+        result = await session.run_sync(fn, *args, **kwargs)
+        await session.commit()
+        return result
+    return await asyncio.wrap_future(writer.submit(fn, *args, **kwargs))
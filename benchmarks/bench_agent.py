@@ -0,0 +1,189 @@
+"""
+Agent 基准套件：固定几个场景，对着脚本化的本地假 LLM（benchmarks.fake_openai）跑，不花钱、结果可复现。
+
+每个场景报告：
+- steps     ReAct 迭代数（对话模型调用次数）
+- llm ms    等模型的时间（假 LLM 的首 token + 逐 token 延迟，可用 FAKE_LLM_* 调）
+- tool ms   工具执行时间，其中 db ms 为工具里 SQL 的耗时
+- ovh/step  每步的框架开销：整轮耗时减去模型和工具时间，再除以步数（LangGraph 调度、消息处理、钩子）
+- agent ms  直接调用 Agent 的整轮耗时
+- http p50 / p95  经 /chat/（或 /chat/weekly-report）的端到端耗时，含鉴权、会话和检查点读写
+
+用法：python -m benchmarks.bench_agent [轮数] [任务数] [--json]   （默认 5 轮、1000 个任务；--json 输出一行 JSON）
+"""
+
+import asyncio
+import json
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks.common import (  # 必须先于 app 导入
+    asgi_client,
+    fake_chat_model,
+    fake_llm_server,
+    seed_tasks,
+    seed_user,
+    summarize,
+    use_fake_llm,
+)
+
+from langchain_core.callbacks import BaseCallbackHandler
+from sqlalchemy import event, select
+
+import app.routes.chat as chat_routes
+from app.ai.agent import build_agent
+from app.ai.prompts import WEEKLY_REPORT_PROMPT
+from app.ai.report_cache import report_cache
+from app.ai.tools import set_current_user_id
+from app.database import engine
+from app.models import Task
+
+
+def call(name: str, **arguments) -> dict:
+    return {"name": name, "arguments": arguments}
+
+
+def scenarios(task_ids: list) -> dict:
+    """场景名 → (用户消息, 假 LLM 脚本, HTTP 路径)"""
+    done = [{"task_id": i, "new_status": "done"} for i in task_ids[:5]]
+    return {
+        "list_tasks": ("看看我的待办", [[call("list_tasks", status_filter="todo")]], "/chat/"),
+        "create_task": ("帮我加个任务：写周报", [[call("create_task", title="写周报", priority="high")]], "/chat/"),
+        "batch_update": ("把这五个任务都标记为完成", [[call("update_tasks", updates=done)]], "/chat/"),
+        "multi_step": (
+            "先总结一下，再列出紧急任务",
+            [[call("get_task_summary")], [call("list_tasks", priority_filter="urgent", order_by="updated")]],
+            "/chat/",
+        ),
+        "weekly_report": (WEEKLY_REPORT_PROMPT, [[call("get_completed_tasks_this_week")]], "/chat/weekly-report"),
+    }
+
+
+class StepTimer(BaseCallbackHandler):
+    """累计对话模型和工具的耗时（按 run_id 配对开始 / 结束）"""
+
+    def __init__(self):
+        self.steps = 0
+        self.totals = defaultdict(float)
+        self._starts = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        if (metadata or {}).get("langgraph_node") == "agent":
+            self.steps += 1
+            self._starts[run_id] = ("llm", time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._starts[run_id] = ("tool", time.perf_counter())
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def _finish(self, run_id):
+        kind, start = self._starts.pop(run_id, (None, 0.0))
+        if kind:
+            self.totals[kind] += time.perf_counter() - start
+
+
+class SQLTimer:
+    """引擎上所有 SQL 的累计耗时（直接调 Agent 时没有检查点，SQL 都来自工具）"""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["bench_query_start"] = time.perf_counter()
+
+    def after(self, conn, cursor, statement, parameters, context, executemany):
+        self.seconds += time.perf_counter() - conn.info.pop("bench_query_start", time.perf_counter())
+
+    def __enter__(self):
+        event.listen(engine, "before_cursor_execute", self.before)
+        event.listen(engine, "after_cursor_execute", self.after)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self.before)
+        event.remove(engine, "after_cursor_execute", self.after)
+
+
+async def run_direct(base_url: str, message: str, rounds: int) -> dict:
+    agent = build_agent(fake_chat_model(base_url))
+    rows = []
+    for _ in range(rounds):
+        timer = StepTimer()
+        with SQLTimer() as sql:
+            start = time.perf_counter()
+            await agent.ainvoke({"messages": [{"role": "user", "content": message}]}, {"callbacks": [timer]})
+            total = time.perf_counter() - start
+        llm, tool = timer.totals["llm"], timer.totals["tool"]
+        rows.append({
+            "steps": timer.steps,
+            "llm": llm * 1000,
+            "tool": tool * 1000,
+            "db": sql.seconds * 1000,
+            "overhead": (total - llm - tool) * 1000 / max(timer.steps, 1),
+            "total": total * 1000,
+        })
+    return {key: sum(r[key] for r in rows) / rounds for key in rows[0]}
+
+
+async def run_http(client, headers: dict, path: str, message: str, rounds: int) -> dict:
+    latencies = []
+    for _ in range(rounds):
+        report_cache.clear()
+        start = time.perf_counter()
+        if path == "/chat/":
+            r = await client.post(path, json={"message": message}, headers=headers)
+        else:
+            r = await client.post(path, headers=headers)
+        assert r.status_code == 200, r.text
+        latencies.append((time.perf_counter() - start) * 1000)
+    return summarize(latencies)
+
+
+async def main(rounds: int, count: int, as_json: bool):
+    user_id, headers = seed_user("agentbench")
+    seed_tasks(user_id, count)
+    set_current_user_id(user_id)
+    with engine.connect() as conn:
+        task_ids = list(conn.scalars(select(Task.id).where(Task.user_id == user_id)))
+    chat_routes.route_message = lambda message: None  # 全部走 Agent，不走规则快速通道
+
+    results = {}
+    async with asgi_client() as client:
+        for name, (message, script, path) in scenarios(task_ids).items():
+            with fake_llm_server(FAKE_LLM_SCRIPT=json.dumps(script)) as base_url:
+                direct = await run_direct(base_url, message, rounds)
+                use_fake_llm(base_url)
+                http = await run_http(client, headers, path, message, rounds)
+            results[name] = {**direct, "http_p50": http["p50"], "http_p95": http["p95"]}
+
+    if as_json:
+        print(json.dumps(results))
+        return
+    print(f"{count} 个任务，每个场景 {rounds} 轮，毫秒为每轮平均值")
+    print(f"{'scenario':<14} | {'steps':>5} | {'llm ms':>7} | {'tool ms':>7} | {'db ms':>6} | "
+          f"{'ovh/step':>8} | {'agent ms':>8} | {'http p50':>8} | {'http p95':>8}")
+    for name, r in results.items():
+        print(
+            f"{name:<14} | {r['steps']:>5.1f} | {r['llm']:>7.0f} | {r['tool']:>7.1f} | {r['db']:>6.1f} | "
+            f"{r['overhead']:>8.1f} | {r['total']:>8.0f} | {r['http_p50']:>8.0f} | {r['http_p95']:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    asyncio.run(
+        main(
+            int(args[0]) if len(args) > 0 else 5,
+            int(args[1]) if len(args) > 1 else 1000,
+            "--json" in sys.argv,
+        )
+    )
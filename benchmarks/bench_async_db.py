@@ -0,0 +1,75 @@
+"""
+同步 / 异步数据库模式对比：高并发下 CRUD 的吞吐与 p99。
+模式在导入 app 时决定，所以每种模式在独立子进程里跑（DB_ASYNC=0 / 1）。
+
+用法：python -m benchmarks.bench_async_db [并发数] [持续秒数]
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+
+async def _worker(client, headers, task_ids, stop_at, samples, errors):
+    i = 0
+    while time.perf_counter() < stop_at:
+        i += 1
+        start = time.perf_counter()
+        try:
+            if i % 4 == 0:
+                res = await client.post("/tasks/", json={"title": "bench"}, headers=headers)
+            elif i % 4 == 1:
+                res = await client.get("/tasks/?limit=20", headers=headers)
+            else:
+                res = await client.get(f"/tasks/{task_ids[i % len(task_ids)]}", headers=headers)
+            status = res.status_code
+        except Exception as e:  # ASGITransport 会把应用里未处理的异常直接抛出来
+            status = type(e).__name__
+        samples.append((time.perf_counter() - start) * 1000)
+        if status != 200 and status != 201:
+            errors.append(status)
+
+
+async def _child(concurrency: int, seconds: float):
+    from benchmarks.common import asgi_client, seed_tasks, seed_user, summarize
+
+    user_id, headers = seed_user("asyncbench")
+    seed_tasks(user_id, 1000)
+    async with asgi_client() as client:
+        page = (await client.get("/tasks/?limit=200", headers=headers)).json()
+        task_ids = [t["id"] for t in page["items"]]
+        samples, errors = [], []
+        stop_at = time.perf_counter() + seconds
+        start = time.perf_counter()
+        await asyncio.gather(
+            *[_worker(client, headers, task_ids, stop_at, samples, errors) for _ in range(concurrency)]
+        )
+        elapsed = time.perf_counter() - start
+    stats = summarize(samples)
+    stats.update(rps=len(samples) / elapsed, errors=len(errors))
+    print(json.dumps(stats))
+
+
+def run(concurrency: int, seconds: float):
+    print(f"{'mode':<6} | {'req/s':>7} | {'p50':>7} | {'p99':>8} | errors  (ms, concurrency={concurrency})")
+    from benchmarks.common import run_child
+
+    for mode, flag in (("sync", "0"), ("async", "1")):
+        env = {"DB_ASYNC": flag}
+        if flag == "0":
+            # 同步模式下在途请求排队等线程时仍占着连接，池子按并发数给足，
+            # 否则比的是谁先把连接池耗尽而不是吞吐
+            env["DB_POOL_SIZE"] = str(concurrency)
+        stats = run_child("benchmarks.bench_async_db", [str(concurrency), str(seconds)], env)
+        print(
+            f"{mode:<6} | {stats['rps']:>7.0f} | {stats['p50']:>7.1f} | {stats['p99']:>8.1f} | {stats['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == "--child":
+        asyncio.run(_child(int(args[1]), float(args[2])))
+    else:
+        run(int(args[0]) if args else 200, float(args[1]) if len(args) > 1 else 10)
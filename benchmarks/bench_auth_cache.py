@@ -0,0 +1,48 @@
+"""
+认证缓存基准：同一批请求在缓存开 / 关两种情况下的吞吐。
+关缓存时每个请求都要 JWT 解码 + 一次查用户的 SQL。
+
+用法：python -m benchmarks.bench_auth_cache [请求数]
+"""
+
+import sys
+import time
+
+from benchmarks.common import seed_tasks, seed_user  # 必须先于 app 导入
+
+from fastapi.testclient import TestClient
+from app.auth import token_cache
+from app.main import app
+
+
+def throughput(client, headers, requests: int) -> float:
+    start = time.perf_counter()
+    for i in range(requests):
+        path = "/users/me" if i % 2 else "/tasks/summary"
+        client.get(path, headers=headers)
+    return requests / (time.perf_counter() - start)
+
+
+def run(requests: int):
+    user_id, headers = seed_user("authbench")
+    seed_tasks(user_id, 100)
+    with TestClient(app) as client:
+        _compare(client, headers, requests)
+
+
+def _compare(client, headers, requests: int):
+    maxsize = token_cache.maxsize
+    token_cache.maxsize = 0
+    token_cache.clear()
+    off = throughput(client, headers, requests)
+
+    token_cache.maxsize = maxsize
+    token_cache.clear()
+    on = throughput(client, headers, requests)
+
+    print(f"cache off: {off:8.0f} req/s")
+    print(f"cache on : {on:8.0f} req/s  ({on / off:.2f}x, {token_cache.stats()})")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
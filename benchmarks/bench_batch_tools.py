@@ -0,0 +1,115 @@
+"""
+批量工具：多任务请求（"把这五个任务都标记为完成"、"帮我加五个任务"）的 Agent 步数和耗时。
+
+假 LLM 按脚本（FAKE_LLM_SCRIPT）走，三种调用方式：
+- sequential  每步调一次 update_task / create_task（没有批量工具时模型的典型做法）
+- parallel    一步里并行发出 N 个单任务调用
+- batch       一步调一次 update_tasks / create_tasks
+
+统计每个请求的模型调用次数（ReAct 步数）、工具调用次数、数据库提交次数和整轮耗时。
+假 LLM 每次调用的首 token 延迟用默认值（FAKE_LLM_FIRST_TOKEN_MS），和真实模型同一量级。
+
+用法：python -m benchmarks.bench_batch_tools [每个请求涉及的任务数] [轮数]   （默认 5 个、5 轮）
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+from benchmarks.common import fake_chat_model, fake_llm_server, prompt_counter, seed_tasks, seed_user, summarize  # 必须先于 app 导入
+
+from langchain_core.callbacks import BaseCallbackHandler
+from sqlalchemy import event, select
+
+from app.ai.agent import build_agent
+from app.ai.tools import set_current_user_id
+from app.database import engine
+from app.models import Task
+
+FAKE_LLM = {"FAKE_LLM_REPLY_TOKENS": "20"}
+
+
+class ToolCounter(BaseCallbackHandler):
+    def __init__(self):
+        self.calls = 0
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self.calls += 1
+
+
+def scripts(task_ids: list) -> dict:
+    """场景 → 调用方式 → (用户消息, 假 LLM 脚本)"""
+    updates = [{"task_id": i, "new_status": "done"} for i in task_ids]
+    new = [{"title": f"批量新建 {n}", "priority": "high"} for n in range(len(task_ids))]
+    single_update = [{"name": "update_task", "arguments": u} for u in updates]
+    single_create = [{"name": "create_task", "arguments": t} for t in new]
+    update_msg = f"把这 {len(task_ids)} 个任务都标记为完成：{', '.join(map(str, task_ids))}"
+    create_msg = f"帮我加 {len(task_ids)} 个高优先级任务"
+    return {
+        "update": {
+            "sequential": (update_msg, [[c] for c in single_update]),
+            "parallel": (update_msg, [single_update]),
+            "batch": (update_msg, [[{"name": "update_tasks", "arguments": {"updates": updates}}]]),
+        },
+        "create": {
+            "sequential": (create_msg, [[c] for c in single_create]),
+            "parallel": (create_msg, [single_create]),
+            "batch": (create_msg, [[{"name": "create_tasks", "arguments": {"tasks": new}}]]),
+        },
+    }
+
+
+async def run_mode(base_url: str, message: str, rounds: int) -> dict:
+    agent = build_agent(fake_chat_model(base_url))
+    commits = []
+
+    def on_commit(conn):
+        commits.append(conn)
+
+    event.listen(engine, "commit", on_commit)
+    try:
+        steps, tool_calls, latencies = [], [], []
+        for _ in range(rounds):
+            llm, tool = prompt_counter(), ToolCounter()
+            start = time.perf_counter()
+            await agent.ainvoke({"messages": [{"role": "user", "content": message}]}, {"callbacks": [llm, tool]})
+            latencies.append((time.perf_counter() - start) * 1000)
+            steps.append(llm.calls)
+            tool_calls.append(tool.calls)
+    finally:
+        event.remove(engine, "commit", on_commit)
+    return {
+        "steps": sum(steps) / rounds,
+        "tools": sum(tool_calls) / rounds,
+        "commits": len(commits) / rounds,
+        "ms": summarize(latencies),
+    }
+
+
+async def main(items: int, rounds: int):
+    user_id, _ = seed_user("batchbench")
+    seed_tasks(user_id, items)
+    set_current_user_id(user_id)
+    with engine.connect() as conn:
+        task_ids = list(conn.scalars(select(Task.id).where(Task.user_id == user_id)))
+
+    print(f"每个请求涉及 {items} 个任务，{rounds} 轮；步数 / 工具调用 / 提交为每个请求的平均值")
+    print(f"{'scenario':<8} | {'mode':<10} | {'steps':>5} | {'tools':>5} | {'commits':>7} | {'p50 ms':>7} | {'mean ms':>7}")
+    for scenario, modes in scripts(task_ids).items():
+        for mode, (message, script) in modes.items():
+            with fake_llm_server(FAKE_LLM_SCRIPT=json.dumps(script), **FAKE_LLM) as base_url:
+                r = await run_mode(base_url, message, rounds)
+            print(
+                f"{scenario:<8} | {mode:<10} | {r['steps']:>5.1f} | {r['tools']:>5.1f} | {r['commits']:>7.1f} | "
+                f"{r['ms']['p50']:>7.0f} | {r['ms']['mean']:>7.0f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 5,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+        )
+    )
@@ -0,0 +1,61 @@
+"""
+批量接口 vs 逐条调用：N 个任务的创建 / 更新 / 删除耗时。
+
+用法：python -m benchmarks.bench_bulk [N]
+"""
+
+import sys
+import time
+
+from benchmarks.common import seed_user  # 必须先于 app 导入
+
+from fastapi.testclient import TestClient
+from app.main import app
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def run(n: int):
+    _, headers = seed_user("bulkbench")
+    with TestClient(app) as client:
+        single_create, ids = timed(
+            lambda: [
+                client.post("/tasks/", json={"title": f"single {i}"}, headers=headers).json()["id"]
+                for i in range(n)
+            ]
+        )
+        single_update, _ = timed(
+            lambda: [client.put(f"/tasks/{i}", json={"status": "done"}, headers=headers) for i in ids]
+        )
+        single_delete, _ = timed(lambda: [client.delete(f"/tasks/{i}", headers=headers) for i in ids])
+
+        items = [{"title": f"bulk {i}"} for i in range(n)]
+        bulk_create, res = timed(lambda: client.post("/tasks/bulk", json={"items": items}, headers=headers))
+        ids = [t["id"] for t in res.json()["created"]]
+        queries = res.headers.get("Server-Timing", "")
+        bulk_update, _ = timed(
+            lambda: client.patch(
+                "/tasks/bulk", json={"items": [{"id": i, "status": "done"} for i in ids]}, headers=headers
+            )
+        )
+        bulk_delete, _ = timed(
+            lambda: client.request("DELETE", "/tasks/bulk", json={"ids": ids}, headers=headers)
+        )
+
+    print(f"N = {n}")
+    print(f"{'op':<7} | {'single (ms)':>11} | {'bulk (ms)':>9} | speedup")
+    for op, single, bulk in (
+        ("create", single_create, bulk_create),
+        ("update", single_update, bulk_update),
+        ("delete", single_delete, bulk_delete),
+    ):
+        print(f"{op:<7} | {single:>11.1f} | {bulk:>9.1f} | {single / bulk:>6.1f}x")
+    print(f"bulk create Server-Timing: {queries}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,161 @@
+"""
+慢聊天对 CRUD 的影响：100 个并发聊天（假 LLM 每次调用约 2 秒，一次对话两次调用）
+进行期间，以固定速率打任务列表 / 详情接口，看 CRUD 的 p99 是否被拖慢。
+
+三个阶段，各在独立子进程里跑（进程内直连 ASGI，假 LLM 子进程共用）：
+- idle      只有 CRUD
+- blocking  旧做法：每个聊天在线程池里同步 agent.invoke，整轮占着一个线程
+- async     现在的 /chat/：ainvoke + 准入控制，超出运行 + 排队上限的直接 429
+
+每个阶段最多跑 PHASE_DEADLINE 秒；届时还没返回的 CRUD 请求按失败计，
+延迟记为已等待的时间（下限）。线程里卡住的旧式聊天无法取消，所以阶段间要分进程。
+
+用法：python -m benchmarks.bench_chat_load [聊天数]   （默认 100）
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+from benchmarks.common import (  # 必须先于 app 导入
+    asgi_client,
+    fake_llm_server,
+    run_child,
+    seed_tasks,
+    seed_user,
+    summarize,
+    use_fake_llm,
+)
+
+from fastapi.concurrency import run_in_threadpool
+
+import app.ai.agent as agent_module
+from app.ai.limiter import chat_limiter
+
+CRUD_RPS = 100
+SEED_TASKS = 200
+IDLE_SECONDS = 5
+PHASE_DEADLINE = 60
+DRAIN_SECONDS = 5
+MESSAGE = "总结一下我的任务情况"
+FAKE_LLM = {"FAKE_LLM_FIRST_TOKEN_MS": "2000", "FAKE_LLM_REPLY_TOKENS": "20", "FAKE_LLM_TOKEN_MS": "10"}
+
+
+async def _crud_load(client, headers: dict, ids: list, stop: asyncio.Event) -> tuple:
+    """
+    开环压测：按固定速率发请求，不等上一个返回。
+    闭环（N 个 worker 循环请求）会漏掉排队：被卡住的 worker 只贡献一个样本。
+    返回 (延迟列表, 失败数)。
+    """
+    latencies: list = []
+    errors = 0
+    started: dict = {}
+
+    async def one(i: int):
+        nonlocal errors
+        path = "/tasks/" if i % 2 else f"/tasks/{ids[i % len(ids)]}"
+        started[i] = time.perf_counter()
+        try:
+            ok = (await client.get(path, headers=headers)).status_code == 200
+        except Exception:
+            ok = False
+        latencies.append((time.perf_counter() - started.pop(i)) * 1000)
+        errors += not ok
+
+    inflight = set()
+    i = 0
+    while not stop.is_set():
+        task = asyncio.ensure_future(one(i))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+        i += 1
+        await asyncio.sleep(1 / CRUD_RPS)
+    if inflight:
+        await asyncio.wait(inflight, timeout=DRAIN_SECONDS)
+    now = time.perf_counter()
+    latencies += [(now - t) * 1000 for t in started.values()]
+    return latencies, errors + len(started)
+
+
+async def _blocking_chat(user_id: int):
+    # 复现改造前的同步路由：线程池里跑整轮 ReAct，等 LLM 时线程一直被占着
+    agent_module.set_current_user_id(user_id)
+    try:
+        await run_in_threadpool(agent_module.agent.invoke, agent_module._agent_input(MESSAGE))
+        return 200
+    except Exception:
+        return 500
+
+
+async def _http_chat(client, headers: dict):
+    r = await client.post("/chat/", json={"message": MESSAGE}, headers=headers, timeout=120)
+    return r.status_code
+
+
+async def child(phase: str, n_chats: int, base_url: str) -> dict:
+    user_id, headers = seed_user("chatload")
+    seed_tasks(user_id, SEED_TASKS)
+    use_fake_llm(base_url)
+    async with asgi_client() as client:
+        r = await client.get("/tasks/", headers=headers, params={"limit": 50})
+        ids = [t["id"] for t in r.json()["items"]]
+
+        if phase == "blocking":
+            chats = [asyncio.ensure_future(_blocking_chat(user_id)) for _ in range(n_chats)]
+        elif phase == "async":
+            chats = [asyncio.ensure_future(_http_chat(client, headers)) for _ in range(n_chats)]
+        else:
+            chats = []
+
+        stop = asyncio.Event()
+        load = asyncio.ensure_future(_crud_load(client, headers, ids, stop))
+        start = time.perf_counter()
+        if chats:
+            await asyncio.wait(chats, timeout=PHASE_DEADLINE)
+        else:
+            await asyncio.sleep(IDLE_SECONDS)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        latencies, errors = await load
+
+    statuses = [c.result() for c in chats if c.done()]
+    return {
+        "crud": summarize(latencies),
+        "crud_errors": errors,
+        "ok": statuses.count(200),
+        "rejected": statuses.count(429),
+        "failed": len(chats) - statuses.count(200) - statuses.count(429),
+        "seconds": elapsed,
+    }
+
+
+def main(n_chats: int):
+    results = {}
+    with fake_llm_server(**FAKE_LLM) as base_url:
+        for phase in ("idle", "blocking", "async"):
+            results[phase] = run_child("benchmarks.bench_chat_load", [phase, str(n_chats), base_url], {})
+
+    print(f"{n_chats} 个并发慢聊天；准入上限：运行 {chat_limiter.max_concurrency} + 排队 {chat_limiter.queue_size}")
+    print(f"CRUD 开环 {CRUD_RPS} req/s（任务列表 / 详情交替），每阶段最多 {PHASE_DEADLINE}s")
+    print(
+        f"{'phase':<8} | {'CRUD p50':>8} | {'p95':>7} | {'p99':>8} | {'CRUD err':>8} | "
+        f"{'chat ok':>7} | {'429':>4} | {'failed':>6} | {'wall s':>6}"
+    )
+    for name, r in results.items():
+        c = r["crud"]
+        print(
+            f"{name:<8} | {c['p50']:>8.1f} | {c['p95']:>7.1f} | {c['p99']:>8.1f} | {r['crud_errors']:>8} | "
+            f"{r['ok']:>7} | {r['rejected']:>4} | {r['failed']:>6} | {r['seconds']:>6.1f}"
+        )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        phase, n, base_url = sys.argv[2:5]
+        # 不用 asyncio.run：它退出时要等所有任务结束，而旧式聊天可能还卡在线程里
+        result = asyncio.new_event_loop().run_until_complete(child(phase, int(n), base_url))
+        print(json.dumps(result), flush=True)
+        os._exit(0)
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
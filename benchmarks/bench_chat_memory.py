@@ -0,0 +1,81 @@
+"""
+长对话的每轮提示词 token：同一个会话连续聊 N 轮（每轮一次 list_tasks 工具调用 + 一段回复），
+比较不限历史（token_budget=0）和按预算裁剪 + 摘要（CHAT_HISTORY_TOKEN_BUDGET）两种记忆。
+
+- prompt   每轮发给对话模型的 token 数（一轮两次调用：选工具、写回复；用 app.ai.memory.count_tokens 计）
+- summary  每轮花在摘要调用上的 token 数（压缩早期对话时才有）
+- ms       每轮耗时；假 LLM 按提示词长度模拟 prefill（FAKE_LLM_PREFILL_MS_PER_KCHAR），只看趋势
+
+检查点走 app 的 SQL checkpointer（临时库），和线上一样每步读写整份状态。
+
+用法：python -m benchmarks.bench_chat_memory [轮数] [预算]   （默认 40 轮，预算取 CHAT_HISTORY_TOKEN_BUDGET）
+"""
+
+import asyncio
+import sys
+import time
+
+from benchmarks.common import fake_chat_model, fake_llm_server, prompt_counter, seed_tasks, seed_user  # 必须先于 app 导入
+
+from app.ai.agent import build_agent
+from app.ai.checkpointer import checkpointer
+from app.ai.memory import CHAT_HISTORY_TOKEN_BUDGET
+from app.ai.tools import set_current_user_id
+
+SEED_TASKS = 20
+REPORT_TURNS = (1, 5, 10, 20, 30, 40, 60, 80, 100)
+FAKE_LLM = {
+    "FAKE_LLM_TOOL": "list_tasks",
+    "FAKE_LLM_FIRST_TOKEN_MS": "100",
+    "FAKE_LLM_PREFILL_MS_PER_KCHAR": "100",
+    "FAKE_LLM_REPLY_TOKENS": "40",
+    "FAKE_LLM_TOKEN_MS": "2",
+}
+MESSAGES = ["看看我还有哪些任务", "哪些是紧急的", "帮我理一下今天先做什么", "还有没完成的吗", "总结一下进度"]
+
+
+async def run_mode(base_url: str, thread_id: str, budget: int, turns: int) -> list:
+    agent = build_agent(fake_chat_model(base_url), checkpointer, token_budget=budget)
+    rows = []
+    for i in range(turns):
+        counter = prompt_counter()
+        config = {"configurable": {"thread_id": thread_id}, "callbacks": [counter]}
+        start = time.perf_counter()
+        await agent.ainvoke({"messages": [{"role": "user", "content": MESSAGES[i % len(MESSAGES)]}]}, config)
+        rows.append({"prompt": counter.prompt, "summary": counter.summary, "ms": (time.perf_counter() - start) * 1000})
+    return rows
+
+
+async def main(turns: int, budget: int):
+    user_id, _ = seed_user("memorybench")
+    seed_tasks(user_id, SEED_TASKS)
+    set_current_user_id(user_id)
+    with fake_llm_server(**FAKE_LLM) as base_url:
+        results = {
+            "unbounded": await run_mode(base_url, "bench-unbounded", 0, turns),
+            f"budget {budget}": await run_mode(base_url, "bench-budget", budget, turns),
+        }
+
+    print(f"{turns} 轮对话，每轮一次 list_tasks（{SEED_TASKS} 个任务）；token 为每轮合计")
+    print(f"{'mode':<12} | {'turn':>4} | {'prompt':>7} | {'summary':>7} | {'ms':>6}")
+    for name, rows in results.items():
+        for turn in [t for t in REPORT_TURNS if t <= turns]:
+            r = rows[turn - 1]
+            print(f"{name:<12} | {turn:>4} | {r['prompt']:>7} | {r['summary']:>7} | {r['ms']:>6.0f}")
+    print()
+    print(f"{'mode':<12} | {'total prompt':>12} | {'total summary':>13} | {'last 10 avg ms':>14}")
+    for name, rows in results.items():
+        tail = rows[-10:]
+        print(
+            f"{name:<12} | {sum(r['prompt'] for r in rows):>12} | {sum(r['summary'] for r in rows):>13} | "
+            f"{sum(r['ms'] for r in tail) / len(tail):>14.0f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 40,
+            int(sys.argv[2]) if len(sys.argv) > 2 else CHAT_HISTORY_TOKEN_BUDGET,
+        )
+    )
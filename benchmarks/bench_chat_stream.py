@@ -0,0 +1,96 @@
+"""
+/chat/ 与 /chat/stream 对比：对着本地假 OpenAI 服务（benchmarks.fake_openai）跑完整 ReAct 循环
+（一次工具调用 + 一段流式回复），测首字节、首 token 和总耗时。
+
+应用在进程内直连 ASGI（记录每个响应体分片到达的时间），假 LLM 跑在 uvicorn 子进程里，
+延迟由 FAKE_LLM_* 环境变量控制（默认首 token 400ms、之后每 token 30ms、60 个 token）。
+
+用法：python -m benchmarks.bench_chat_stream [轮数]   （默认 10）
+"""
+
+import asyncio
+import sys
+import time
+
+from benchmarks.common import asgi_client, fake_llm_server, seed_user, summarize, use_fake_llm  # 必须先于 app 导入
+
+import orjson
+
+from app.main import app
+
+
+async def _stream_once(headers: dict, message: str) -> dict:
+    """直接驱动 ASGI，记录首字节、首个 token 事件和结束的时间（毫秒）"""
+    body = orjson.dumps({"message": message})
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/chat/stream", "raw_path": b"/chat/stream",
+        "root_path": "", "query_string": b"", "server": ("bench", 80), "client": ("127.0.0.1", 1),
+        "headers": [
+            (b"host", b"bench"), (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"authorization", headers["Authorization"].encode()),
+        ],
+    }
+    sent = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished.wait()  # 只发一次请求体，之后挂起，避免断连监听空转
+        return {"type": "http.disconnect"}
+
+    start = time.perf_counter()
+    marks = {"tools": 0}
+    buffer = b""
+
+    async def send(msg):
+        nonlocal buffer
+        if msg["type"] != "http.response.body" or not msg.get("body"):
+            return
+        now = (time.perf_counter() - start) * 1000
+        marks.setdefault("ttfb", now)
+        buffer += msg["body"]
+        if b"event: token" in buffer:
+            marks.setdefault("first_token", now)
+        if b"event: tool_end" in msg["body"]:
+            marks["tools"] += 1
+
+    await app(scope, receive, send)
+    finished.set()
+    marks["total"] = (time.perf_counter() - start) * 1000
+    assert b"event: done" in buffer, buffer[-500:]
+    return marks
+
+
+async def main(rounds: int):
+    _, headers = seed_user("chatbench")
+    with fake_llm_server() as base_url:
+        use_fake_llm(base_url)
+        message = "总结一下我的任务情况"
+
+        blocking = []
+        async with asgi_client() as client:
+            for _ in range(rounds):
+                start = time.perf_counter()
+                r = await client.post("/chat/", json={"message": message}, headers=headers)
+                assert r.status_code == 200 and "错误" not in r.json()["reply"], r.text
+                blocking.append((time.perf_counter() - start) * 1000)
+
+        streamed = [await _stream_once(headers, message) for _ in range(rounds)]
+        assert all(m["tools"] == 1 for m in streamed)
+
+    print(f"{'endpoint':<13} | {'TTFB p50':>8} | {'TTFB p95':>8} | {'1st token':>9} | {'total p50':>9}  (ms, {rounds} rounds)")
+    b = summarize(blocking)
+    print(f"{'/chat/':<13} | {b['p50']:>8.1f} | {b['p95']:>8.1f} | {b['p50']:>9.1f} | {b['p50']:>9.1f}")
+    ttfb = summarize([m["ttfb"] for m in streamed])
+    first = summarize([m["first_token"] for m in streamed])
+    total = summarize([m["total"] for m in streamed])
+    print(f"{'/chat/stream':<13} | {ttfb['p50']:>8.1f} | {ttfb['p95']:>8.1f} | {first['p50']:>9.1f} | {total['p50']:>9.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10))
@@ -0,0 +1,38 @@
+"""
+仪表盘反复刷新：数据没变时，带 If-None-Match 的条件请求（304）对比每次全量拉取。
+
+用法：python -m benchmarks.bench_etag [任务数]
+"""
+
+import sys
+
+from benchmarks.common import measure, seed_tasks, seed_user  # 必须先于 app 导入
+
+from fastapi.testclient import TestClient
+from app.main import app
+
+REFRESHES = 200
+
+
+def run(count: int):
+    user_id, headers = seed_user("etagbench")
+    seed_tasks(user_id, count)
+    print(f"tasks = {count}, {REFRESHES} refreshes each")
+    print(f"{'limit':>5} | {'mode':<11} | {'p50':>6} | {'p95':>6} | {'bytes':>6} | queries")
+    with TestClient(app) as client:
+        for limit in (50, 200):
+            params = {"limit": limit}
+            first = client.get("/tasks/", params=params, headers=headers)
+            cond = {**headers, "If-None-Match": first.headers["etag"]}
+            for mode, h in (("full", headers), ("conditional", cond)):
+                stats = measure(lambda: client.get("/tasks/", params=params, headers=h), repeat=REFRESHES)
+                res = client.get("/tasks/", params=params, headers=h)
+                queries = res.headers["server-timing"].split('desc="')[1].split()[0]
+                print(
+                    f"{limit:>5} | {mode:<11} | {stats['p50']:>6.2f} | {stats['p95']:>6.2f} | "
+                    f"{len(res.content):>6} | {queries}"
+                )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,152 @@
+"""
+推送扇出：uvicorn 子进程 + N 个空闲连接（同一用户，WebSocket 和 SSE 各测一遍），
+测服务端每连接内存，以及一次任务写入到 N 个连接全部收到事件的延迟。
+
+客户端和服务端跑在同一台机器上，延迟里包含客户端依次处理 N 条消息的时间。
+
+用法：python -m benchmarks.bench_events [N ...]   （默认 1000 5000）
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.common import seed_user, summarize  # 必须先于 app 导入
+
+import httpx
+from websockets.asyncio.client import connect
+
+ROUNDS = 20
+CONNECT_CONCURRENCY = 200
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_mib(pid: int) -> float:
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+async def _wait_ready(base: str):
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                await client.get(base + "/")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError("uvicorn 没有启动")
+
+
+class Listener:
+    def __init__(self, n: int):
+        self.n = n
+        self.arrivals: list = []
+        self.done = asyncio.Event()
+
+    def arrived(self):
+        self.arrivals.append(time.perf_counter())
+        if len(self.arrivals) == self.n:
+            self.done.set()
+
+
+async def _ws_client(base: str, token: str, listener: Listener, ready: asyncio.Semaphore, conns: list):
+    async with ready:
+        ws = await connect(base.replace("http", "ws") + "/events/ws", ping_interval=None, open_timeout=60)
+        await ws.send(f'{{"token": "{token}"}}')
+        await ws.recv()  # ready
+    conns.append(ws)
+    async for message in ws:
+        if '"tasks_changed"' in message:
+            listener.arrived()
+
+
+class _SseConn:
+    def __init__(self, writer):
+        self.writer = writer
+
+    async def close(self):
+        self.writer.close()
+
+
+async def _sse_client(base: str, token: str, listener: Listener, ready: asyncio.Semaphore, conns: list):
+    # 直接用 asyncio 流收 SSE，客户端自身开销尽量小
+    host, port = base.removeprefix("http://").split(":")
+    async with ready:
+        reader, writer = await asyncio.open_connection(host, int(port))
+        writer.write(
+            f"GET /events HTTP/1.1\r\nHost: {host}\r\nAuthorization: Bearer {token}\r\n\r\n".encode()
+        )
+        while b"event: ready" not in await reader.readline():
+            pass
+    conns.append(_SseConn(writer))
+    while line := await reader.readline():
+        if line.startswith(b"event: tasks_changed"):
+            listener.arrived()
+
+
+async def run_scale(base: str, pid: int, headers: dict, n: int, client) -> dict:
+    token = headers["Authorization"].split()[1]
+    listener = Listener(n)
+    conns: list = []
+    before = _rss_mib(pid)
+    sem = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    tasks = [asyncio.create_task(client(base, token, listener, sem, conns)) for _ in range(n)]
+    while len(conns) < n:
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(1)
+    per_conn_kib = (_rss_mib(pid) - before) * 1024 / n
+
+    latencies, last = [], []
+    async with httpx.AsyncClient(base_url=base, headers=headers) as http:
+        for i in range(ROUNDS):
+            listener.arrivals.clear()
+            listener.done.clear()
+            start = time.perf_counter()
+            await http.post("/tasks/", json={"title": f"fanout {i}"})
+            await asyncio.wait_for(listener.done.wait(), 60)
+            latencies += [(t - start) * 1000 for t in listener.arrivals]
+            last.append((max(listener.arrivals) - start) * 1000)
+
+    for ws in conns:
+        await ws.close()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return {"per_conn_kib": per_conn_kib, "all": summarize(latencies), "last": summarize(last)}
+
+
+async def main(scales):
+    _, headers = seed_user("eventsbench")
+    print(f"{'mode':<4} | {'conns':>6} | {'KiB/conn':>8} | {'p50':>7} | {'p99':>7} | {'last p50':>8} (ms, write → delivered)")
+    for mode, client in (("ws", _ws_client), ("sse", _sse_client)):
+        for n in scales:
+            # 每轮一个新的服务进程，内存基线干净
+            port = _free_port()
+            base = f"http://127.0.0.1:{port}"
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+                 "--log-level", "warning", "--ws", "websockets", "--ws-per-message-deflate", "false"],
+                env=dict(os.environ, REQUEST_METRICS="0"),
+            )
+            try:
+                await _wait_ready(base)
+                r = await run_scale(base, server.pid, headers, n, client)
+            finally:
+                server.kill()  # 优雅关闭要等长连接，基准里不需要
+                server.wait()
+            print(
+                f"{mode:<4} | {n:>6} | {r['per_conn_kib']:>8.1f} | {r['all']['p50']:>7.1f} | "
+                f"{r['all']['p99']:>7.1f} | {r['last']['p50']:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(a) for a in sys.argv[1:]] or [1000, 5000]))
@@ -0,0 +1,367 @@
+"""
+HTTP 基准套件：任务、用户、鉴权接口的吞吐和 p50 / p95 / p99，结果存成 JSON，可以和基线对比判回归。
+
+- 规模：每个规模一个新用户，带 N 个任务（1k … 1m），另有 BACKGROUND_USERS 个小用户垫底
+- 传输：asgi（进程内 httpx.ASGITransport，不经网络栈）、uvicorn（子进程，真实 TCP）
+- 每个接口固定请求数、固定并发，先预热；客户端和服务端在同一台机器上，uvicorn 的数字含客户端开销
+
+用法：
+  python -m benchmarks.bench_http run [--scales 1k,10k] [--transports asgi,uvicorn] [--requests 300]
+        [--concurrency 16] [--out results.json] [--baseline baseline.json] [--threshold 0.2]
+  python -m benchmarks.bench_http compare baseline.json results.json [--threshold 0.2] [--metrics rps,p50,p95]
+
+compare（以及 run 带 --baseline）在任一指标退化超过阈值时退出码为 1，可以直接放进 CI。
+1m 规模造数据要几十秒；反复跑时用 BENCH_DATABASE_URL 指向造好的库（同名用户已存在时跳过造数据）。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+from benchmarks.common import asgi_client, free_port, seed_tasks, seed_user, summarize  # 必须先于 app 导入
+
+from sqlmodel import Session, func, select
+
+from app.counters import reconcile_counters
+from app.database import create_db, engine
+from app.models import Task, User
+
+BACKGROUND_USERS = 20
+BACKGROUND_TASKS = 50
+WARMUP = 20
+LOGIN_SHARE = 10  # 登录走 bcrypt，请求数取其它接口的 1/10
+PASSWORD = "bench-password"
+DEFAULT_METRICS = ("rps", "p50", "p95")
+
+
+class Endpoint(NamedTuple):
+    name: str
+    make: Callable[[dict, int], Tuple[str, str, Optional[dict]]]  # (上下文, 序号) → (方法, URL, JSON 体)
+    share: int = 1  # 请求数 = requests // share
+
+
+STATUSES = ["todo", "in_progress", "done", "cancelled"]
+
+# 读在前、写在后；DELETE 用专门建好的一批任务
+ENDPOINTS = [
+    Endpoint("GET /tasks/", lambda ctx, i: ("GET", "/tasks/?limit=20", None)),
+    Endpoint("GET /tasks/?status&priority", lambda ctx, i: ("GET", "/tasks/?status=todo&priority=high&limit=20", None)),
+    Endpoint("GET /tasks/{id}", lambda ctx, i: ("GET", f"/tasks/{ctx['ids'][i % len(ctx['ids'])]}", None)),
+    Endpoint("GET /tasks/summary", lambda ctx, i: ("GET", "/tasks/summary", None)),
+    Endpoint("GET /tasks/changes", lambda ctx, i: ("GET", f"/tasks/changes?since={ctx['cursor']}", None)),
+    Endpoint("GET /users/me", lambda ctx, i: ("GET", "/users/me", None)),
+    Endpoint("POST /tasks/", lambda ctx, i: ("POST", "/tasks/", {"title": f"http bench {i}"})),
+    Endpoint(
+        "PUT /tasks/{id}",
+        lambda ctx, i: ("PUT", f"/tasks/{ctx['ids'][i % len(ctx['ids'])]}", {"status": STATUSES[i % len(STATUSES)]}),
+    ),
+    Endpoint("DELETE /tasks/{id}", lambda ctx, i: ("DELETE", f"/tasks/{ctx['delete_ids'][i]}", None)),
+    Endpoint(
+        "POST /users/login",
+        lambda ctx, i: ("POST", "/users/login", {"username": ctx["login_user"], "password": PASSWORD}),
+        LOGIN_SHARE,
+    ),
+]
+
+
+def parse_scale(text: str) -> int:
+    text = text.strip().lower()
+    for suffix, factor in (("k", 1_000), ("m", 1_000_000)):
+        if text.endswith(suffix):
+            return int(float(text[:-1]) * factor)
+    return int(text)
+
+
+def scale_label(n: int) -> str:
+    if n % 1_000_000 == 0:
+        return f"{n // 1_000_000}m"
+    if n % 1_000 == 0:
+        return f"{n // 1_000}k"
+    return str(n)
+
+
+# ── 造数据 ──
+def seed_scale(count: int) -> Tuple[int, Dict[str, str]]:
+    """规模用户：已存在（复用 BENCH_DATABASE_URL 的库）就不再造任务"""
+    username = f"http{scale_label(count)}"
+    with Session(engine) as session:
+        existing = session.exec(select(User.id).where(User.username == username)).first()
+    user_id, headers = seed_user(username) if existing is None else _headers_for(existing)
+    if existing is None:
+        start = time.perf_counter()
+        seed_tasks(user_id, count)
+        print(f"  造了 {count} 个任务（{time.perf_counter() - start:.1f}s）", file=sys.stderr)
+    return user_id, headers
+
+
+def _headers_for(user_id: int) -> Tuple[int, Dict[str, str]]:
+    from app.auth import create_access_token
+
+    return user_id, {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+
+def seed_background():
+    with Session(engine) as session:
+        if session.exec(select(User.id).where(User.username == "httpbg0")).first() is not None:
+            return
+    for n in range(BACKGROUND_USERS):
+        user_id, _ = seed_user(f"httpbg{n}")
+        seed_tasks(user_id, BACKGROUND_TASKS)
+
+
+def sample_ids(user_id: int, limit: int = 1000) -> List[int]:
+    with Session(engine) as session:
+        return list(
+            session.exec(select(Task.id).where(Task.user_id == user_id).order_by(func.random()).limit(limit))
+        )
+
+
+async def create_login_user(client: httpx.AsyncClient) -> str:
+    """登录要真的 bcrypt 哈希，走注册接口建"""
+    username = f"httplogin{os.getpid()}"
+    r = await client.post(
+        "/users/register", json={"username": username, "email": f"{username}@bench.local", "password": PASSWORD}
+    )
+    assert r.status_code in (201, 400), r.text
+    return username
+
+
+async def prepare(client: httpx.AsyncClient, headers: dict, ids: List[int], login_user: str, deletes: int) -> dict:
+    """每轮（传输 × 规模）的上下文：读写用的 ID、同步游标、待删任务"""
+    cursor = (await client.get("/tasks/changes", headers=headers)).json()["cursor"]
+    delete_ids: List[int] = []
+    while len(delete_ids) < deletes:
+        n = min(500, deletes - len(delete_ids))
+        r = await client.post(
+            "/tasks/bulk", json={"items": [{"title": f"to delete {k}"} for k in range(n)]}, headers=headers
+        )
+        delete_ids += [t["id"] for t in r.json()["created"]]
+    return {"ids": ids, "cursor": cursor, "delete_ids": delete_ids, "login_user": login_user}
+
+
+# ── 压测 ──
+async def drive(client: httpx.AsyncClient, headers: dict, ctx: dict, endpoint: Endpoint,
+                count: int, offset: int, concurrency: int) -> dict:
+    """并发 concurrency 个协程共发 count 个请求（序号从 offset 开始），返回延迟分位数、吞吐和错误数"""
+    samples: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < count:
+            i = offset + next_index
+            next_index += 1
+            method, url, body = endpoint.make(ctx, i)
+            start = time.perf_counter()
+            try:
+                r = await client.request(method, url, json=body, headers=headers)
+                ok = r.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            samples.append((time.perf_counter() - start) * 1000)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    stats = summarize(samples)
+    return {"rps": count / elapsed, "p50": stats["p50"], "p95": stats["p95"], "p99": stats["p99"], "errors": errors}
+
+
+async def run_transport(client: httpx.AsyncClient, scales: list, requests: int, concurrency: int) -> Dict[str, dict]:
+    login_user = await create_login_user(client)
+    results = {}
+    for label, (user_id, headers, ids) in scales:
+        deletes = requests + WARMUP
+        ctx = await prepare(client, headers, ids, login_user, deletes)
+        for endpoint in ENDPOINTS:
+            count = max(requests // endpoint.share, concurrency)
+            warmup = min(WARMUP, count)
+            await drive(client, headers, ctx, endpoint, warmup, 0, min(concurrency, warmup))
+            results[f"{label}/{endpoint.name}"] = await drive(
+                client, headers, ctx, endpoint, count, warmup, concurrency
+            )
+    return results
+
+
+class UvicornServer:
+    """uvicorn 子进程，连同一个库（DATABASE_URL 由 benchmarks.common 设好并继承）"""
+
+    def __init__(self):
+        self.port = free_port()
+        self.base = f"http://127.0.0.1:{self.port}"
+        self.process: Optional[subprocess.Popen] = None
+
+    async def __aenter__(self) -> str:
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(self.port), "--log-level", "warning"],
+            env=dict(os.environ),
+        )
+        async with httpx.AsyncClient() as client:
+            for _ in range(200):
+                try:
+                    await client.get(self.base + "/docs")
+                    return self.base
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+        raise RuntimeError("uvicorn 没有启动")
+
+    async def __aexit__(self, *exc):
+        self.process.terminate()
+        self.process.wait()
+
+
+async def run(args) -> dict:
+    scales = [parse_scale(s) for s in args.scales.split(",")]
+    transports = args.transports.split(",")
+    print(f"造数据：{BACKGROUND_USERS} 个背景用户 + 规模 {', '.join(map(scale_label, scales))}", file=sys.stderr)
+    create_db()
+    seed_background()
+    seeded = []
+    for count in scales:
+        user_id, headers = seed_scale(count)
+        seeded.append((scale_label(count), (user_id, headers, sample_ids(user_id))))
+    with Session(engine) as session:  # 直接插入的任务没走计数表，统一重建一次
+        reconcile_counters(session)
+        session.commit()
+
+    results: Dict[str, dict] = {}
+    for transport in transports:
+        print(f"压测 {transport} …", file=sys.stderr)
+        if transport == "asgi":
+            async with asgi_client() as client:
+                measured = await run_transport(client, seeded, args.requests, args.concurrency)
+        elif transport == "uvicorn":
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            async with UvicornServer() as base:
+                async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+                    measured = await run_transport(client, seeded, args.requests, args.concurrency)
+        else:
+            raise SystemExit(f"未知传输：{transport}（可选 asgi / uvicorn）")
+        results.update({f"{transport}/{key}": value for key, value in measured.items()})
+
+    return {"meta": run_meta(args), "results": results}
+
+
+def run_meta(args) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "scales": args.scales,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+    }
+
+
+def print_results(report: dict):
+    print(f"{'transport/scale/endpoint':<48} | {'req/s':>7} | {'p50':>7} | {'p95':>7} | {'p99':>7} | errors")
+    for key, r in report["results"].items():
+        print(
+            f"{key:<48} | {r['rps']:>7.0f} | {r['p50']:>7.2f} | {r['p95']:>7.2f} | {r['p99']:>7.2f} | {r['errors']}"
+        )
+
+
+# ── 对比基线 ──
+def compare(baseline: dict, current: dict, threshold: float, metrics: tuple, min_ms: float) -> List[str]:
+    """
+    返回退化项。rps 下降超过 threshold、延迟上升超过 threshold（且绝对差超过 min_ms，
+    避免亚毫秒级的抖动误报）、或者错误数比基线多，都算退化。两边都有的键才比较。
+    """
+    regressions = []
+    print(f"{'transport/scale/endpoint':<48} | {'metric':>6} | {'baseline':>9} | {'current':>9} | {'change':>7}")
+    for key in sorted(baseline["results"].keys() & current["results"].keys()):
+        base, cur = baseline["results"][key], current["results"][key]
+        for metric in metrics:
+            before, after = base[metric], cur[metric]
+            change = (after - before) / before if before else 0.0
+            if metric == "rps":
+                worse = change < -threshold
+            else:
+                worse = change > threshold and after - before > min_ms
+            mark = "  REGRESSED" if worse else ""
+            print(f"{key:<48} | {metric:>6} | {before:>9.2f} | {after:>9.2f} | {change:>+7.0%}{mark}")
+            if worse:
+                regressions.append(f"{key} {metric} {before:.2f} → {after:.2f} ({change:+.0%})")
+        if cur["errors"] > base["errors"]:
+            regressions.append(f"{key} errors {base['errors']} → {cur['errors']}")
+    missing = baseline["results"].keys() - current["results"].keys()
+    if missing:
+        print(f"（本次没有跑的基线项 {len(missing)} 个，未比较）")
+    return regressions
+
+
+def report_regressions(regressions: List[str], threshold: float) -> int:
+    if regressions:
+        print(f"\n{len(regressions)} 项退化超过 {threshold:.0%}：")
+        for line in regressions:
+            print("  " + line)
+        return 1
+    print(f"\n没有超过 {threshold:.0%} 的退化")
+    return 0
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_http")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="压测并输出结果")
+    run_parser.add_argument("--scales", default="1k,10k", help="逗号分隔的任务规模，如 1k,10k,100k,1m")
+    run_parser.add_argument("--transports", default="asgi,uvicorn")
+    run_parser.add_argument("--requests", type=int, default=300, help="每个接口的请求数")
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument("--out", help="结果 JSON 写到这里")
+    run_parser.add_argument("--baseline", help="跑完和这个基线对比")
+
+    compare_parser = sub.add_parser("compare", help="对比两份结果")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+
+    for p in (run_parser, compare_parser):
+        p.add_argument("--threshold", type=float, default=0.2, help="允许的相对退化，默认 0.2（20%%）")
+        p.add_argument("--metrics", default=",".join(DEFAULT_METRICS), help="参与对比的指标：rps,p50,p95,p99")
+        p.add_argument("--min-ms", type=float, default=1.0, help="延迟绝对差低于此值时不算退化")
+
+    args = parser.parse_args(argv)
+    metrics = tuple(args.metrics.split(","))
+    if args.command == "compare":
+        return report_regressions(
+            compare(load(args.baseline), load(args.current), args.threshold, metrics, args.min_ms), args.threshold
+        )
+
+    report = asyncio.run(run(args))
+    print_results(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.out}", file=sys.stderr)
+    if args.baseline:
+        print()
+        return report_regressions(compare(load(args.baseline), report, args.threshold, metrics, args.min_ms), args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,91 @@
+"""
+流式导入吞吐：POST /tasks/import 导入 N 条 NDJSON / CSV，报告行/秒与进程 RSS 增长。
+请求体由生成器按 64 KiB 分块现造，客户端侧也不会把整份数据放进内存。
+
+目标（单核、默认 SQLite 配置）：≥ 20k 行/秒，RSS 增长与 N 无关。
+
+用法：python -m benchmarks.bench_import [N]
+"""
+
+import asyncio
+import csv
+import io
+import os
+import sys
+import time
+
+import orjson
+
+from benchmarks.common import asgi_client, seed_user  # 必须先于 app 导入
+
+CHUNK_BYTES = 64 * 1024
+PRIORITIES = ["low", "medium", "high", "urgent"]
+
+
+def _rss_mib() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _rows(n: int):
+    for i in range(n):
+        yield {"title": f"imported {i}", "description": f"row #{i}", "priority": PRIORITIES[i % 4]}
+
+
+def ndjson_lines(n: int):
+    for row in _rows(n):
+        yield orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE)
+
+
+def csv_lines(n: int):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, ["title", "description", "priority"])
+    writer.writeheader()
+    for row in _rows(n):
+        writer.writerow(row)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+async def body(lines, peak: dict):
+    chunk = []
+    size = 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            peak["rss"] = max(peak["rss"], _rss_mib())
+            yield b"".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield b"".join(chunk)
+
+
+async def run_one(client, headers, fmt: str, n: int) -> dict:
+    lines = ndjson_lines(n) if fmt == "ndjson" else csv_lines(n)
+    peak = {"rss": _rss_mib()}
+    baseline = peak["rss"]
+    start = time.perf_counter()
+    res = await client.post(
+        f"/tasks/import?format={fmt}", content=body(lines, peak), headers=headers, timeout=None
+    )
+    elapsed = time.perf_counter() - start
+    result = res.json()
+    assert result["created"] == n, result
+    return {"rows_per_s": n / elapsed, "seconds": elapsed, "rss_growth_mib": peak["rss"] - baseline}
+
+
+async def main(n: int):
+    _, headers = seed_user("importbench")
+    async with asgi_client() as client:
+        await run_one(client, headers, "ndjson", 1000)  # 预热
+        print(f"N = {n}")
+        print(f"{'format':<7} | {'rows/s':>8} | {'seconds':>7} | RSS growth (MiB)")
+        for fmt in ("ndjson", "csv"):
+            r = await run_one(client, headers, fmt, n)
+            print(f"{fmt:<7} | {r['rows_per_s']:>8.0f} | {r['seconds']:>7.1f} | {r['rss_growth_mib']:.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000))
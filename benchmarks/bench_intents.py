@@ -0,0 +1,64 @@
+"""
+聊天快速通道：拿 app/ai/intent_corpus.jsonl 的标注语料，统计规则能接走的比例和误判数，
+再把每条语料各发一次 /chat/（开 / 关快速通道），比较延迟。关掉时全部走 Agent（本地假 LLM）。
+
+用法：python -m benchmarks.bench_intents
+"""
+
+import asyncio
+import time
+
+from benchmarks.common import asgi_client, fake_llm_server, seed_tasks, seed_user, summarize, use_fake_llm  # 必须先于 app 导入
+
+import app.routes.chat as chat_routes
+from app.ai.intents import Intent, load_corpus, parse_intent
+
+
+async def run_corpus(client, headers: dict, corpus: list) -> list:
+    latencies = []
+    for case in corpus:
+        start = time.perf_counter()
+        r = await client.post("/chat/", json={"message": case["text"]}, headers=headers)
+        assert r.status_code == 200 and "不可用" not in r.json()["reply"], r.text
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def main():
+    corpus = load_corpus()
+    predicted = [parse_intent(c["text"]) for c in corpus]
+    expected = [Intent(c["tool"], c["args"]) if c["tool"] else None for c in corpus]
+    routed = [p is not None for p in predicted]
+    wrong = sum(p is not None and p != e for p, e in zip(predicted, expected))
+    missed = sum(p is None and e is not None for p, e in zip(predicted, expected))
+
+    user_id, headers = seed_user("intentbench")
+    seed_tasks(user_id, 50)
+    with fake_llm_server() as base_url:
+        use_fake_llm(base_url)
+        async with asgi_client() as client:
+            with_router = await run_corpus(client, headers, corpus)
+            route_message = chat_routes.route_message
+            chat_routes.route_message = lambda message: None  # 全部交给 Agent
+            try:
+                agent_only = await run_corpus(client, headers, corpus)
+            finally:
+                chat_routes.route_message = route_message
+
+    n = len(corpus)
+    print(f"语料 {n} 条（{sum(e is not None for e in expected)} 条标注为简单指令）")
+    print(f"快速通道接走 {sum(routed)} 条（{sum(routed) / n:.0%}），误判 {wrong}，漏判 {missed}")
+    print(f"{'case':<24} | {'p50 ms':>8} | {'p95 ms':>8} | {'mean ms':>8}")
+    rows = [
+        ("agent only / all", agent_only),
+        ("with router / all", with_router),
+        ("agent only / routed", [t for t, r in zip(agent_only, routed) if r]),
+        ("with router / routed", [t for t, r in zip(with_router, routed) if r]),
+    ]
+    for name, samples in rows:
+        s = summarize(samples)
+        print(f"{name:<24} | {s['p50']:>8.1f} | {s['p95']:>8.1f} | {sum(samples) / len(samples):>8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+登录风暴压测：大量并发登录的同时，测任务 CRUD 的延迟。
+对比 bcrypt 在线程池里算（PASSWORD_HASH_WORKERS=0 的旧行为）
+和放到独立进程池两种模式。
+
+用法：python -m benchmarks.bench_login_storm [并发登录数] [持续秒数]
+"""
+
+import asyncio
+import sys
+import time
+
+from benchmarks.common import asgi_client, seed_tasks, seed_user, summarize  # 必须先于 app 导入
+
+from app.auth import PASSWORD_HASH_QUEUE, PASSWORD_HASH_WORKERS, PasswordHasher
+from app.routes import users as users_routes
+
+CRUD_CLIENTS = 8
+
+
+async def crud_loop(client, headers, stop_at, samples):
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        res = await client.get("/tasks/?limit=20", headers=headers)
+        res.raise_for_status()
+        samples.append((time.perf_counter() - start) * 1000)
+
+
+async def login_loop(client, stop_at, outcome):
+    while time.perf_counter() < stop_at:
+        res = await client.post("/users/login", json={"username": "storm", "password": "storm-pass"})
+        outcome[res.status_code] = outcome.get(res.status_code, 0) + 1
+        if res.status_code == 503:
+            await asyncio.sleep(float(res.headers.get("Retry-After", "1")))
+
+
+async def phase(client, headers, logins: int, seconds: float):
+    stop_at = time.perf_counter() + seconds
+    samples, outcome = [], {}
+    await asyncio.gather(
+        *[crud_loop(client, headers, stop_at, samples) for _ in range(CRUD_CLIENTS)],
+        *[login_loop(client, stop_at, outcome) for _ in range(logins)],
+    )
+    return summarize(samples), outcome
+
+
+async def run(logins: int, seconds: float):
+    user_id, headers = seed_user("crud")
+    seed_tasks(user_id, 1000)
+    modes = [
+        ("threadpool", PasswordHasher(0, 10_000)),
+        (f"process x{PASSWORD_HASH_WORKERS}", PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE)),
+    ]
+    async with asgi_client() as client:
+        users_routes.password_hasher = modes[0][1]
+        res = await client.post(
+            "/users/register",
+            json={"username": "storm", "email": "s@bench.local", "password": "storm-pass"},
+        )
+        res.raise_for_status()
+
+        quiet, _ = await phase(client, headers, 0, seconds)
+        print(f"{'mode':<14} | {'CRUD p50':>8} | {'p99':>8} | logins")
+        print(f"{'no logins':<14} | {quiet['p50']:>8.1f} | {quiet['p99']:>8.1f} | -")
+        for name, hasher in modes:
+            users_routes.password_hasher = hasher
+            await hasher.hash("warmup")  # 进程池懒启动，别把 spawn 时间算进去
+            stats, outcome = await phase(client, headers, logins, seconds)
+            hasher.shutdown()
+            print(f"{name:<14} | {stats['p50']:>8.1f} | {stats['p99']:>8.1f} | {outcome}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(run(int(args[0]) if args else 100, float(args[1]) if len(args) > 1 else 5))
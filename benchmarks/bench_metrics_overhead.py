@@ -0,0 +1,106 @@
+"""
+观测的开销：
+1. 同一组请求在 REQUEST_METRICS 开 / 关时的延迟对比
+2. Agent 追踪（app.ai.tracing）：单个 span 的回调成本，以及对着零延迟假 LLM 的整轮耗时（不挂 / 挂追踪 / 再写 JSONL 轨迹）
+
+用法：python -m benchmarks.bench_metrics_overhead [每组请求数]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+from benchmarks.common import fake_chat_model, fake_llm_server, measure, seed_tasks, seed_user, summarize  # 必须先于 app 导入
+
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from app import metrics
+from app.ai import tracing
+from app.ai.agent import build_agent
+from app.ai.tools import set_current_user_id
+from app.main import app
+
+ZERO_LATENCY_LLM = {
+    "FAKE_LLM_FIRST_TOKEN_MS": "0",
+    "FAKE_LLM_TOKEN_MS": "0",
+    "FAKE_LLM_SCRIPT": json.dumps([[{"name": "get_task_summary"}], [{"name": "list_tasks"}]]),
+}
+
+
+def run(repeat: int):
+    user_id, headers = seed_user("metricsbench")
+    seed_tasks(user_id, 1000)
+    with TestClient(app) as client:
+        results = {}
+        for enabled in (False, True, False, True):  # 交替跑两轮，减少预热偏差
+            metrics.METRICS_ENABLED = enabled
+            results[enabled] = measure(
+                lambda: client.get("/tasks/?limit=50", headers=headers), repeat=repeat
+            )
+    off, on = results[False], results[True]
+    print(f"metrics off: p50 {off['p50']:.3f} ms  mean {off['mean']:.3f} ms")
+    print(f"metrics on : p50 {on['p50']:.3f} ms  mean {on['mean']:.3f} ms")
+    print(f"overhead   : {on['mean'] - off['mean']:+.3f} ms / request")
+
+
+def span_cost(repeat: int = 20000) -> float:
+    """一次模型调用 span + 一次工具调用 span 的回调耗时（微秒），usage 齐全、不写轨迹"""
+    tracer = tracing.AgentTracer("bench", 0).__enter__()
+    messages = [[HumanMessage("看看我的任务")]]
+    response = LLMResult(generations=[[ChatGeneration(message=AIMessage(
+        "好的", usage_metadata={"input_tokens": 120, "output_tokens": 8, "total_tokens": 128}
+    ))]])
+    metadata = {"langgraph_node": "agent", "ls_model_name": "bench"}
+    start = time.perf_counter()
+    for _ in range(repeat):
+        run_id = uuid.uuid4()
+        tracer.on_chat_model_start({}, messages, run_id=run_id, metadata=metadata)
+        tracer.on_llm_end(response, run_id=run_id)
+        run_id = uuid.uuid4()
+        tracer.on_tool_start({"name": "list_tasks"}, "{}", run_id=run_id, inputs={})
+        tracer.on_tool_end("📭 没有找到符合条件的任务。", run_id=run_id)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+async def agent_rounds(base_url: str, user_id: int, repeat: int) -> dict:
+    agent = build_agent(fake_chat_model(base_url))
+    set_current_user_id(user_id)
+    trace_path = os.path.join(tempfile.mkdtemp(prefix="taskflow-trace-"), "trace.jsonl")
+    samples = {"off": [], "tracer": [], "tracer+jsonl": []}
+    for i in range(repeat):
+        for mode in samples:  # 交替跑，减少预热和抖动的偏差
+            tracing.AGENT_TRACE_FILE = trace_path if mode == "tracer+jsonl" else ""
+            start = time.perf_counter()
+            if mode == "off":
+                await agent.ainvoke({"messages": [{"role": "user", "content": "看看"}]})
+            else:
+                with tracing.AgentTracer("bench", user_id) as tracer:
+                    await agent.ainvoke({"messages": [{"role": "user", "content": "看看"}]}, tracer.attach())
+            samples[mode].append((time.perf_counter() - start) * 1000)
+    tracing.AGENT_TRACE_FILE = ""
+    return {mode: summarize(values[5:]) for mode, values in samples.items()}
+
+
+def run_tracing(repeat: int):
+    user_id, _ = seed_user("tracingbench")
+    seed_tasks(user_id, 100)
+    print(f"\nAgent 追踪：一次模型 span + 一次工具 span 的回调耗时 {span_cost():.1f} µs")
+    with fake_llm_server(**ZERO_LATENCY_LLM) as base_url:
+        results = asyncio.run(agent_rounds(base_url, user_id, repeat))
+    print(f"零延迟假 LLM，每轮 3 次模型调用 + 2 次工具调用，{repeat} 轮：")
+    for mode, r in results.items():
+        print(f"  {mode:<13} p50 {r['p50']:7.2f} ms  mean {r['mean']:7.2f} ms")
+    delta = results["tracer"]["mean"] - results["off"]["mean"]
+    print(f"  overhead     {delta:+.3f} ms / 轮（真实模型每次调用以秒计，相对可以忽略）")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    run(count)
+    run_tracing(max(count // 5, 20))
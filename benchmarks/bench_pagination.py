@@ -0,0 +1,49 @@
+"""
+GET /tasks/ 分页基准：单个用户任务量从 1k 涨到 100k，
+首页、深翻页、带筛选的页延迟应基本持平。
+
+用法：python -m benchmarks.bench_pagination [1000 10000 100000]
+"""
+
+import sys
+
+from benchmarks.common import measure, seed_tasks, seed_user  # 必须先于 app 导入
+
+from fastapi.testclient import TestClient
+from app.main import app
+
+DEFAULT_SCALES = [1_000, 10_000, 100_000]
+DEEP_PAGES = 20
+
+
+def run(scales):
+    with TestClient(app) as client:
+        _run(client, scales)
+
+
+def _run(client, scales):
+    print(f"{'tasks':>8} | {'first p50':>9} | {'deep p50':>9} | {'filter p50':>10}  (ms)")
+    for scale in scales:
+        user_id, headers = seed_user(f"page{scale}")
+        seed_tasks(user_id, scale)
+
+        # 先翻到第 DEEP_PAGES 页拿到游标，再单独测这一页
+        cursor = None
+        for _ in range(DEEP_PAGES):
+            page = client.get("/tasks/", params={"cursor": cursor} if cursor else {}, headers=headers).json()
+            cursor = page["next_cursor"] or cursor
+
+        first = measure(lambda: client.get("/tasks/", headers=headers))
+        deep = measure(lambda: client.get("/tasks/", params={"cursor": cursor}, headers=headers))
+        filtered = measure(
+            lambda: client.get(
+                "/tasks/", params={"status": "todo", "priority": "high"}, headers=headers
+            )
+        )
+        print(
+            f"{scale:>8} | {first['p50']:>9.2f} | {deep['p50']:>9.2f} | {filtered['p50']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or DEFAULT_SCALES)
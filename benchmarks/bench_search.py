@@ -0,0 +1,138 @@
+"""
+全文搜索：两个用户各造 N 个任务（默认 10 万，标题 / 描述由按 Zipf 分布抽的词拼成），
+比较 app.search 的 FTS5（trigram + bm25）和 LIKE '%q%' 的查询耗时，以及触发器给写入带来的开销。
+
+用法：python -m benchmarks.bench_search [每用户任务数]
+"""
+
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import PRIORITIES, STATUSES, measure, seed_user  # 必须先于 app 导入
+
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from app import crud
+from app.database import engine
+from app.models import Task
+from app.search import _DDL, rebuild_search_index, search_tasks
+
+HEAD_WORDS = (
+    "周报 会议 纪要 需求 评审 上线 回滚 测试 用例 接口 文档 部署 监控 告警 数据库 迁移 缓存 "
+    "登录 注册 支付 订单 报表 导出 导入 权限 审批 预算 合同 客户 回访 招聘 面试 培训 复盘 "
+    "login bug fix api deploy release review refactor cache index migration invoice dashboard"
+).split()
+CHARS = "项目系统服务产品设计开发运维安全网络存储日志消息队列搜索推荐算法模型训练标注采购财务行政法务市场运营渠道品牌活动"
+RARE = "量子纠缠实验"  # 只出现在少数任务里
+
+
+def vocabulary(rng: random.Random, size: int = 3000) -> list:
+    """常用词在前，后面是随机拼出的长尾词；按 1/名次 的权重抽（Zipf），常用词很常见，长尾词各占很少"""
+    tail = {"".join(rng.choices(CHARS, k=rng.randint(2, 4))) for _ in range(size)}
+    return HEAD_WORDS + sorted(tail - set(HEAD_WORDS))
+
+
+def queries(words: list) -> list:
+    mid = next(w for w in words[200:] if len(w) >= 3)
+    return [
+        ("rare (6 chars)", RARE),
+        ("long-tail word", mid),
+        ("very common word", "数据库"),
+        ("two words", f"数据库 {mid}"),
+        ("english", "migration"),
+        ("short only (LIKE)", "周报"),
+        ("long + short", "数据库 周报"),
+        ("no match", "不存在的关键词"),
+    ]
+
+
+class TextGen:
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.words = vocabulary(rng)
+        self.weights = [1 / (rank + 1) for rank in range(len(self.words))]
+
+    def __call__(self, n: int) -> str:
+        picked = self.rng.choices(self.words, self.weights, k=n)
+        return "".join(w + ("" if self.rng.random() < 0.5 else " ") for w in picked).strip()
+
+
+def seed(user_id: int, count: int, text: TextGen, batch: int = 10_000) -> float:
+    base = datetime.now() - timedelta(seconds=count)
+    start = time.perf_counter()
+    with Session(engine) as session:
+        for lo in range(0, count, batch):
+            rows = []
+            for i in range(lo, min(lo + batch, count)):
+                title = text(text.rng.randint(2, 4))
+                if i % 5000 == 0:
+                    title = f"{RARE} {title}"
+                rows.append(
+                    {
+                        "title": title[:200],
+                        "description": text(text.rng.randint(0, 12)) or None,
+                        "status": STATUSES[i % len(STATUSES)],
+                        "priority": PRIORITIES[(i // len(STATUSES)) % len(PRIORITIES)],
+                        "user_id": user_id,
+                        "created_at": base + timedelta(seconds=i),
+                        "updated_at": base + timedelta(seconds=i),
+                    }
+                )
+            session.execute(insert(Task), rows)
+        session.commit()
+    return time.perf_counter() - start
+
+
+def import_cost(user_id: int, text: TextGen, rows: int = 10_000) -> float:
+    """crud.import_tasks 一批的耗时（毫秒）"""
+    batch = [
+        {"title": text(3), "description": text(8), "status": "todo", "priority": "low"}
+        for _ in range(rows)
+    ]
+    with Session(engine) as session:
+        start = time.perf_counter()
+        crud.import_tasks(session, user_id, batch)
+        session.commit()
+        return (time.perf_counter() - start) * 1000
+
+
+def main(per_user: int):
+    text = TextGen(random.Random(42))
+    user_id, _ = seed_user("searchbench")
+    other_id, _ = seed_user("searchother")
+    seeded = seed(user_id, per_user, text) + seed(other_id, per_user, text)
+    print(f"造数 2 × {per_user} 个任务（含触发器写索引）：{seeded:.1f}s")
+
+    print(f"{'query':<18} | {'matches':>7} | {'LIKE p50':>9} | {'FTS p50':>9} | {'speedup':>7}")
+    for name, q in queries(text.words):
+        with Session(engine) as session:
+            _, total = search_tasks(session, user_id, q, limit=20)
+            _, like_total = search_tasks(session, user_id, q, limit=20, use_fts=False)
+            assert total == like_total, (q, total, like_total)
+            like = measure(lambda: search_tasks(session, user_id, q, limit=20, use_fts=False), repeat=10, warmup=1)
+            fts = measure(lambda: search_tasks(session, user_id, q, limit=20), repeat=10, warmup=1)
+        print(
+            f"{name:<18} | {total:>7} | {like['p50']:>7.1f}ms | {fts['p50']:>7.1f}ms | {like['p50'] / fts['p50']:>6.1f}x"
+        )
+
+    # 写入开销：同一批导入，有 / 没有同步索引的触发器
+    with_triggers = import_cost(user_id, text)
+    with engine.begin() as conn:
+        for trigger in ("task_fts_ai", "task_fts_ad", "task_fts_au"):
+            conn.exec_driver_sql(f"DROP TRIGGER {trigger}")
+    without = import_cost(user_id, text)
+    with engine.begin() as conn:
+        for ddl in _DDL[1:]:
+            conn.exec_driver_sql(ddl)
+    print(f"导入 1 万条：无索引 {without:.0f}ms，带触发器 {with_triggers:.0f}ms（+{with_triggers / without - 1:.0%}）")
+
+    start = time.perf_counter()
+    count = rebuild_search_index(engine)
+    print(f"rebuild-search：{count} 个任务 {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,103 @@
+"""
+任务响应序列化：每批 1 万个任务，比较改造前后取数 + 编码成 JSON 响应体的耗时。
+
+- orm + jsonable_encoder：取 Task 对象，无 response_model，FastAPI 逐字段 jsonable_encoder 再 json.dumps（旧的详情 / 创建 / 更新）
+- orm + response_model：取 Task 对象，按 List[Task] 的 response_model 校验再序列化（旧的列表）
+- rows + orjson：按列取行拼 dict，ORJSONResponse 编码（现在的做法）
+- rows + orjson, fields=…：只取 ?fields=id,title,status 这几列
+
+用法：python -m benchmarks.bench_serialization [任务数]   （默认 10000）
+"""
+
+import asyncio
+import sys
+from typing import List, Optional
+
+from benchmarks.common import measure, seed_tasks, seed_user  # 必须先于 app 导入
+
+import orjson
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from pydantic import BaseModel
+from sqlmodel import Session, select
+
+from app.database import engine
+from app.models import TASK_FIELDS, Task
+from app.routes.tasks import build_list_query, row_dicts
+
+FIELDS = ("id", "title", "status")
+
+
+class LegacyPage(BaseModel):
+    """改造前的 TaskPage"""
+
+    items: List[Task]
+    next_cursor: Optional[str] = None
+
+
+LEGACY_PAGE_FIELD = create_model_field(name="Response_list_tasks", type_=LegacyPage)
+
+
+def legacy_encoder(tasks) -> bytes:
+    content = asyncio.run(serialize_response(response_content={"items": tasks, "next_cursor": None}))
+    return JSONResponse(content).body
+
+
+def legacy_response_model(tasks) -> bytes:
+    content = asyncio.run(
+        serialize_response(field=LEGACY_PAGE_FIELD, response_content=LegacyPage(items=tasks))
+    )
+    return JSONResponse(content).body
+
+
+def rows_orjson(rows, fields=TASK_FIELDS) -> bytes:
+    return ORJSONResponse({"items": row_dicts(rows, fields), "next_cursor": None}).body
+
+
+def main(count: int):
+    user_id, _ = seed_user("serialbench")
+    seed_tasks(user_id, count)
+    with engine.begin() as conn:  # 描述写长一点（约 200 字符），看得出不取描述省了多少
+        conn.exec_driver_sql("UPDATE task SET description = title || ' ' || hex(randomblob(96))")
+
+    with Session(engine) as session:
+
+        def fetch_orm():
+            session.expunge_all()  # 每次都真正建对象，不复用 identity map
+            return session.exec(select(Task).where(Task.user_id == user_id).limit(count)).all()
+
+        def fetch_rows(fields=TASK_FIELDS):
+            return session.exec(build_list_query(user_id, None, None, None, count, fields)).all()
+
+        tasks, rows, narrow = fetch_orm(), fetch_rows(), fetch_rows(FIELDS)
+        cases = [
+            ("orm + jsonable_encoder", fetch_orm, lambda: legacy_encoder(tasks)),
+            ("orm + response_model", fetch_orm, lambda: legacy_response_model(tasks)),
+            ("rows + orjson", fetch_rows, lambda: rows_orjson(rows)),
+            (f"rows + orjson, fields={','.join(FIELDS)}", lambda: fetch_rows(FIELDS), lambda: rows_orjson(narrow, FIELDS)),
+        ]
+        per = 10_000 / count
+        print(f"{count} 个任务，耗时折算为每 1 万个任务（p50）")
+        print(f"{'case':<38} | {'fetch ms':>9} | {'encode ms':>9} | {'total ms':>9} | {'body KB':>8}")
+        baseline = None
+        for name, fetch, encode in cases:
+            fetch_ms = measure(fetch, repeat=10, warmup=1)["p50"] * per
+            encode_ms = measure(encode, repeat=10, warmup=1)["p50"] * per
+            body = len(encode()) * per / 1024
+            total = fetch_ms + encode_ms
+            baseline = baseline or total
+            print(
+                f"{name:<38} | {fetch_ms:>9.1f} | {encode_ms:>9.1f} | {total:>9.1f} | {body:>8.0f}"
+                + ("" if total == baseline else f"  ({baseline / total:.1f}x)")
+            )
+
+    # 输出一致性：新旧响应体解析后逐字段相同
+    legacy = orjson.loads(legacy_encoder(tasks))["items"]
+    current = orjson.loads(rows_orjson(rows))["items"]
+    assert sorted(legacy, key=lambda t: t["id"]) == sorted(current, key=lambda t: t["id"])
+    print("新旧响应体字段和取值一致")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,78 @@
+"""
+SQLite 写吞吐：默认配置 / 生产 PRAGMA / 生产 PRAGMA + 组提交 三种模式下，
+多个客户端并发创建和更新任务。
+
+用法：python -m benchmarks.bench_sqlite_writes [并发数] [持续秒数]
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+MODES = [
+    ("default", {"SQLITE_PROFILE": "default", "SQLITE_GROUP_COMMIT": "0"}),
+    ("wal+pragmas", {"SQLITE_PROFILE": "production", "SQLITE_GROUP_COMMIT": "0"}),
+    ("group commit", {"SQLITE_PROFILE": "production", "SQLITE_GROUP_COMMIT": "1"}),
+]
+
+
+async def _writer(client, headers, stop_at, samples, errors):
+    task_id = None
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        try:
+            if task_id is None:
+                res = await client.post("/tasks/", json={"title": "write bench"}, headers=headers)
+                task_id = res.json().get("id") if res.status_code == 201 else None
+            else:
+                res = await client.put(f"/tasks/{task_id}", json={"status": "done"}, headers=headers)
+                task_id = None
+            status = res.status_code
+        except Exception as e:  # database is locked 等未处理异常会直接抛出来
+            status = type(e).__name__
+        samples.append((time.perf_counter() - start) * 1000)
+        if status not in (200, 201):
+            errors.append(status)
+
+
+async def _child(concurrency: int, seconds: float):
+    from benchmarks.common import asgi_client, seed_user, summarize
+    from app.writer import writer
+
+    _, headers = seed_user("writebench")
+    async with asgi_client() as client:
+        samples, errors = [], []
+        stop_at = time.perf_counter() + seconds
+        start = time.perf_counter()
+        await asyncio.gather(
+            *[_writer(client, headers, stop_at, samples, errors) for _ in range(concurrency)]
+        )
+        elapsed = time.perf_counter() - start
+    stats = summarize(samples)
+    stats.update(
+        writes_per_sec=(len(samples) - len(errors)) / elapsed,
+        errors=len(errors),
+        batches=writer.batches if writer else None,
+    )
+    print(json.dumps(stats))
+
+
+def run(concurrency: int, seconds: float):
+    from benchmarks.common import run_child
+
+    print(f"{'mode':<13} | {'writes/s':>8} | {'p50':>7} | {'p99':>8} | errors | commits  (ms, concurrency={concurrency})")
+    for name, env in MODES:
+        stats = run_child("benchmarks.bench_sqlite_writes", [str(concurrency), str(seconds)], env)
+        print(
+            f"{name:<13} | {stats['writes_per_sec']:>8.0f} | {stats['p50']:>7.1f} | "
+            f"{stats['p99']:>8.1f} | {stats['errors']:>6} | {stats['batches'] or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == "--child":
+        asyncio.run(_child(int(args[1]), float(args[2])))
+    else:
+        run(int(args[0]) if args else 32, float(args[1]) if len(args) > 1 else 10)
@@ -0,0 +1,116 @@
+"""
+列表类工具的输出体积：5000 个任务的用户，比较旧版工具（全量逐行输出）和现在的分页 + token 预算版本。
+
+- 工具本身：输出 token 数（app.ai.memory.count_text_tokens）、字符数、耗时
+- 一轮对话：假 LLM 先调工具再回复，统计发给对话模型的提示词 token 和整轮耗时；
+  假 LLM 按提示词长度模拟 prefill（FAKE_LLM_PREFILL_MS_PER_KCHAR），只看趋势
+
+用法：python -m benchmarks.bench_tool_output [任务数]   （默认 5000）
+"""
+
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from benchmarks.common import fake_chat_model, fake_llm_server, measure, prompt_counter, seed_tasks, seed_user  # 必须先于 app 导入
+
+from langchain_core.tools import tool
+from sqlmodel import select
+
+import app.ai.agent as agent_module
+from app.ai import tools
+from app.ai.memory import count_text_tokens
+from app.models import Task
+
+TURNS = 3
+FAKE_LLM = {
+    "FAKE_LLM_FIRST_TOKEN_MS": "100",
+    "FAKE_LLM_PREFILL_MS_PER_KCHAR": "20",
+    "FAKE_LLM_REPLY_TOKENS": "40",
+    "FAKE_LLM_TOKEN_MS": "2",
+}
+
+
+# ── 旧版工具（改动前的实现，原样保留做对照）──
+@tool("list_tasks")
+def legacy_list_tasks(status_filter: Optional[str] = None) -> str:
+    """查看当前用户的任务列表。"""
+    with tools._get_session() as session:
+        query = select(Task).where(Task.user_id == tools.current_user_id())
+        if status_filter:
+            query = query.where(Task.status == status_filter)
+        tasks = session.exec(query).all()
+        if not tasks:
+            return "📭 没有找到符合条件的任务。"
+        icons = {"todo": "⬜", "in_progress": "🔵", "done": "✅", "cancelled": "❌"}
+        return "\n".join(
+            f"{icons.get(t.status, '•')} [ID:{t.id}] {t.title} | 优先级:{t.priority} | 状态:{t.status}" for t in tasks
+        )
+
+
+@tool("get_completed_tasks_this_week")
+def legacy_completed_this_week() -> str:
+    """获取本周（最近7天）完成的任务列表，用于生成周报。"""
+    with tools._get_session() as session:
+        week_ago = datetime.now() - timedelta(days=7)
+        tasks = session.exec(
+            select(Task).where(
+                Task.user_id == tools.current_user_id(), Task.status == "done", Task.updated_at >= week_ago
+            )
+        ).all()
+        if not tasks:
+            return "本周没有已完成的任务。"
+        lines = [f"- {t.title} (优先级:{t.priority}, 完成于:{t.updated_at.strftime('%m-%d')})" for t in tasks]
+        return "本周完成的任务：\n" + "\n".join(lines)
+
+
+CASES = [
+    ("list_tasks", legacy_list_tasks, tools.list_tasks),
+    ("get_completed_tasks_this_week", legacy_completed_this_week, tools.get_completed_tasks_this_week),
+]
+
+
+async def agent_turns(base_url: str, tool_list: list) -> dict:
+    """用给定的工具集建 Agent，跑 TURNS 轮，返回平均提示词 token 和耗时"""
+    saved = agent_module.tools
+    agent_module.tools = tool_list
+    try:
+        agent = agent_module.build_agent(fake_chat_model(base_url))
+    finally:
+        agent_module.tools = saved
+    prompt, ms = 0, 0.0
+    for _ in range(TURNS):
+        counter = prompt_counter()
+        start = time.perf_counter()
+        await agent.ainvoke({"messages": [{"role": "user", "content": "看看我的任务"}]}, {"callbacks": [counter]})
+        ms += (time.perf_counter() - start) * 1000
+        prompt += counter.prompt
+    return {"prompt": prompt // TURNS, "ms": ms / TURNS}
+
+
+async def main(count: int):
+    user_id, _ = seed_user("toolbench")
+    seed_tasks(user_id, count)
+    tools.set_current_user_id(user_id)
+
+    print(f"{count} 个任务；输出预算 TOOL_OUTPUT_TOKEN_BUDGET={tools.TOOL_OUTPUT_TOKEN_BUDGET}，"
+          f"默认每页 {tools.TOOL_LIST_DEFAULT_LIMIT} 条")
+    print(f"{'tool':<30} | {'version':<7} | {'tokens':>7} | {'chars':>7} | {'p50 ms':>7} | "
+          f"{'turn prompt':>11} | {'turn ms':>8}")
+    for name, legacy, current in CASES:
+        others = [t for t in agent_module.tools if t.name != name]
+        with fake_llm_server(FAKE_LLM_TOOL=name, **FAKE_LLM) as base_url:
+            for version, fn in (("legacy", legacy), ("paged", current)):
+                output = fn.invoke({})
+                timing = measure(lambda: fn.invoke({}), repeat=10, warmup=1)
+                turn = await agent_turns(base_url, others + [fn])
+                print(
+                    f"{name:<30} | {version:<7} | {count_text_tokens(output):>7} | {len(output):>7} | "
+                    f"{timing['p50']:>7.1f} | {turn['prompt']:>11} | {turn['ms']:>8.0f}"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,46 @@
+"""
+周报缓存：对着本地假 LLM，比较任务有改动时（每次都重新生成）和没改动时（命中缓存）的周报接口耗时。
+
+用法：python -m benchmarks.bench_weekly_report [轮数]   （默认 10）
+"""
+
+import asyncio
+import sys
+import time
+
+from benchmarks.common import asgi_client, fake_llm_server, seed_tasks, seed_user, summarize, use_fake_llm  # 必须先于 app 导入
+
+from app.ai.report_cache import report_cache
+
+FAKE_LLM = {"FAKE_LLM_TOOL": "get_completed_tasks_this_week"}
+
+
+async def main(rounds: int):
+    user_id, headers = seed_user("reportbench")
+    seed_tasks(user_id, 200)
+    with fake_llm_server(**FAKE_LLM) as base_url:
+        use_fake_llm(base_url)
+        async with asgi_client() as client:
+
+            async def report() -> float:
+                start = time.perf_counter()
+                r = await client.post("/chat/weekly-report", headers=headers)
+                assert r.status_code == 200 and "失败" not in r.json()["report"], r.text
+                return (time.perf_counter() - start) * 1000
+
+            changed = []
+            for i in range(rounds):
+                await client.post("/tasks/", json={"title": f"改动 {i}"}, headers=headers)
+                changed.append(await report())
+            unchanged = [await report() for _ in range(rounds)]
+
+    stats = report_cache.stats()
+    print(f"{'case':<18} | {'p50 ms':>8} | {'p95 ms':>8}  ({rounds} rounds)")
+    for name, samples in (("tasks changed", changed), ("unchanged (hit)", unchanged)):
+        s = summarize(samples)
+        print(f"{name:<18} | {s['p50']:>8.1f} | {s['p95']:>8.1f}")
+    print(f"hit rate {stats['hit_rate']:.2f}（{stats['hits']} hits / {stats['misses']} misses）")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10))
@@ -0,0 +1,206 @@
+"""
+基准测试公共工具：临时数据库、造数据、计时统计。
+必须在导入 app 之前导入本模块，保证 app 连的是临时库而不是 taskflow.db。
+"""
+
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Tuple
+
+# 默认每次运行用一个全新的临时库；需要复用已造好的大库时设置 BENCH_DATABASE_URL
+_DB_DIR = tempfile.mkdtemp(prefix="taskflow-bench-")
+os.environ["DATABASE_URL"] = os.getenv(
+    "BENCH_DATABASE_URL", f"sqlite:///{_DB_DIR}/bench.db"
+)
+
+from sqlalchemy import insert  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+from app.auth import create_access_token  # noqa: E402
+from app.database import create_db, engine  # noqa: E402
+from app.models import Task, User  # noqa: E402
+
+engine.echo = False  # 造几十万行时 SQL 日志会淹没输出
+
+STATUSES = ["todo", "in_progress", "done", "cancelled"]
+PRIORITIES = ["low", "medium", "high", "urgent"]
+
+
+def seed_user(username: str) -> Tuple[int, Dict[str, str]]:
+    """直接写库建用户（跳过 bcrypt），返回 (user_id, 认证头)"""
+    create_db()
+    with Session(engine) as session:
+        user = User(
+            username=username,
+            email=f"{username}@bench.local",
+            hashed_password="!",  # 不可登录，只用 token
+        )
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        user_id = user.id
+    token = create_access_token({"sub": str(user_id)})
+    return user_id, {"Authorization": f"Bearer {token}"}
+
+
+def seed_tasks(user_id: int, count: int, batch: int = 10_000) -> None:
+    """批量造任务，状态/优先级轮换，updated_at 各不相同"""
+    base = datetime.now() - timedelta(seconds=count)
+    with Session(engine) as session:
+        for start in range(0, count, batch):
+            rows = [
+                {
+                    "title": f"bench task {i}",
+                    "description": f"seeded #{i}",
+                    "status": STATUSES[i % len(STATUSES)],
+                    "priority": PRIORITIES[(i // len(STATUSES)) % len(PRIORITIES)],
+                    "user_id": user_id,
+                    "created_at": base + timedelta(seconds=i),
+                    "updated_at": base + timedelta(seconds=i),
+                }
+                for i in range(start, min(start + batch, count))
+            ]
+            session.execute(insert(Task), rows)
+        session.commit()
+
+
+def measure(fn: Callable[[], object], repeat: int = 50, warmup: int = 3) -> Dict[str, float]:
+    """多次调用 fn，返回耗时统计（毫秒）"""
+    for _ in range(warmup):
+        fn()
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": pct(0.50),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+    }
+
+
+def asgi_client():
+    """进程内直连 ASGI 的异步客户端，可以用 asyncio.gather 打出真实并发"""
+    import httpx
+
+    from app.main import app
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+
+def run_child(module: str, args: List[str], env: Dict[str, str]) -> dict:
+    """
+    在子进程里跑 `python -m module --child args...` 并解析最后一行 JSON。
+    配置类开关在导入 app 时生效，不同模式必须分进程跑。
+    """
+    import json
+    import subprocess
+    import sys
+
+    child_env = dict(os.environ, **env)
+    child_env.pop("DATABASE_URL", None)  # 每个子进程用自己的临时库
+    out = subprocess.run(
+        [sys.executable, "-m", module, "--child", *args],
+        env=child_env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+# ── 假 LLM（benchmarks.fake_openai）──
+def free_port() -> int:
+    import socket
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def fake_llm_server(**env: str) -> Iterator[str]:
+    """在子进程里起假 OpenAI 服务，返回 base_url（…/v1）；env 覆盖 FAKE_LLM_* 延迟配置"""
+    import subprocess
+    import sys
+
+    import httpx
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_openai", "--port", str(port)],
+        env=dict(os.environ, **env),
+    )
+    base = f"http://127.0.0.1:{port}/v1"
+    try:
+        for _ in range(100):
+            try:
+                httpx.post(base + "/chat/completions", json={"messages": []})
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("假 LLM 服务没有启动")
+        yield base
+    finally:
+        server.kill()
+        server.wait()
+
+
+def fake_chat_model(base_url: str):
+    from langchain_openai import ChatOpenAI
+    from pydantic import SecretStr
+
+    return ChatOpenAI(model="fake", api_key=SecretStr("fake"), base_url=base_url, request_timeout=60)
+
+
+def use_fake_llm(base_url: str):
+    """把 app 的两个 Agent（一次性 / 带会话）换成连假 LLM 的同款 Agent（工具、记忆不变）"""
+    import app.ai.agent as agent_module
+
+    os.environ.setdefault("LLM_API_KEY", "fake")
+    llm = fake_chat_model(base_url)
+    agent_module.agent = agent_module.build_agent(llm)
+    agent_module.chat_agent = agent_module.build_agent(llm, agent_module.checkpointer)
+
+
+def prompt_counter():
+    """
+    LangChain 回调：按节点累计每次模型调用收到的提示词 token（对话节点记 prompt，其余如摘要记 summary），
+    calls 为对话节点的模型调用次数（ReAct 步数）
+    """
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    from app.ai.memory import count_tokens
+
+    class PromptCounter(BaseCallbackHandler):
+        def __init__(self):
+            self.prompt = 0
+            self.summary = 0
+            self.calls = 0
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+            tokens = count_tokens(messages[0])
+            if (metadata or {}).get("langgraph_node") == "agent":
+                self.prompt += tokens
+                self.calls += 1
+            else:
+                self.summary += tokens
+
+    return PromptCounter()
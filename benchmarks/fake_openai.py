@@ -0,0 +1,152 @@
+"""
+本地假 OpenAI 兼容服务（/v1/chat/completions），给 AI 相关基准用，不花钱也不受网络抖动影响。
+
+行为固定：请求里带工具且最后一条是用户消息 → 先调一次工具（默认 get_task_summary）；
+拿到工具结果后 → 回复一段固定文本。流式和非流式都支持。
+
+FAKE_LLM_SCRIPT 给出脚本时改为按脚本走：JSON 数组，每一项是一步要发出的工具调用列表
+（[{"name": ..., "arguments": {...}}, ...]）；第 N 次（从用户消息算起）调用模型时执行第 N 步，
+脚本走完后回复固定文本。用来复现"模型逐个调用工具"和"一次批量调用"这类多步行为。
+
+延迟模拟真实模型：首 token 前等 FAKE_LLM_FIRST_TOKEN_MS，之后每个 token 间隔 FAKE_LLM_TOKEN_MS。
+FAKE_LLM_PREFILL_MS_PER_KCHAR 模拟 prefill：提示词（所有消息内容）每 1000 字符首 token 再多等这么久，默认 0。
+
+用法：python -m benchmarks.fake_openai [--port 8900]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+import orjson
+from fastapi import FastAPI, Request
+from fastapi.responses import Response, StreamingResponse
+
+FIRST_TOKEN_MS = float(os.getenv("FAKE_LLM_FIRST_TOKEN_MS", "400"))
+TOKEN_MS = float(os.getenv("FAKE_LLM_TOKEN_MS", "30"))
+REPLY_TOKENS = int(os.getenv("FAKE_LLM_REPLY_TOKENS", "60"))
+TOOL_NAME = os.getenv("FAKE_LLM_TOOL", "get_task_summary")
+PREFILL_MS_PER_KCHAR = float(os.getenv("FAKE_LLM_PREFILL_MS_PER_KCHAR", "0"))
+SCRIPT = orjson.loads(os.getenv("FAKE_LLM_SCRIPT", "null"))
+
+REPLY_PIECES = ["你", "目前", "的", "任务", "情况", "如下", "：", "待办", "较多", "，", "建议", "优先", "处理", "紧急", "任务", "。"]
+
+app = FastAPI()
+
+
+def _reply_tokens() -> list:
+    return [REPLY_PIECES[i % len(REPLY_PIECES)] for i in range(REPLY_TOKENS)]
+
+
+def _steps_taken(messages: list) -> int:
+    """最后一条用户消息之后模型已经走了几步"""
+    steps = 0
+    for m in reversed(messages):
+        if m.get("role") == "user":
+            break
+        steps += m.get("role") == "assistant"
+    return steps
+
+
+def _planned_calls(body: dict) -> list:
+    """这一次应发出的工具调用 [(name, arguments)]；空列表表示直接回复"""
+    names = {t.get("function", {}).get("name") for t in body.get("tools") or []}
+    messages = body.get("messages") or []
+    if not messages:
+        return []
+    if SCRIPT is not None:
+        step = _steps_taken(messages)
+        if step >= len(SCRIPT):
+            return []
+        return [(c["name"], c.get("arguments", {})) for c in SCRIPT[step] if c["name"] in names]
+    if TOOL_NAME in names and messages[-1].get("role") == "user":
+        return [(TOOL_NAME, {})]
+    return []
+
+
+def _first_token_seconds(body: dict) -> float:
+    chars = sum(len(str(m.get("content") or "")) for m in body.get("messages") or [])
+    return (FIRST_TOKEN_MS + PREFILL_MS_PER_KCHAR * chars / 1000) / 1000
+
+
+def _chunk(completion_id: str, model: str, delta: dict, finish_reason=None) -> bytes:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+def _tool_calls(calls: list) -> list:
+    return [
+        {
+            "id": "call_" + uuid.uuid4().hex[:12],
+            "type": "function",
+            "function": {"name": name, "arguments": orjson.dumps(arguments).decode()},
+        }
+        for name, arguments in calls
+    ]
+
+
+async def _stream(body: dict):
+    completion_id = "chatcmpl-" + uuid.uuid4().hex
+    model = body.get("model", "fake")
+    await asyncio.sleep(_first_token_seconds(body))
+    calls = _planned_calls(body)
+    if calls:
+        deltas = [dict(call, index=i) for i, call in enumerate(_tool_calls(calls))]
+        yield _chunk(completion_id, model, {"role": "assistant", "content": None, "tool_calls": deltas})
+        yield _chunk(completion_id, model, {}, "tool_calls")
+    else:
+        yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+        for i, token in enumerate(_reply_tokens()):
+            if i:
+                await asyncio.sleep(TOKEN_MS / 1000)
+            yield _chunk(completion_id, model, {"content": token})
+        yield _chunk(completion_id, model, {}, "stop")
+    yield b"data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = orjson.loads(await request.body())
+    if body.get("stream"):
+        return StreamingResponse(_stream(body), media_type="text/event-stream")
+
+    # 非流式：整段生成完才返回
+    calls = _planned_calls(body)
+    if calls:
+        await asyncio.sleep(_first_token_seconds(body))
+        message = {"role": "assistant", "content": None, "tool_calls": _tool_calls(calls)}
+        finish_reason = "tool_calls"
+    else:
+        await asyncio.sleep(_first_token_seconds(body) + TOKEN_MS * (REPLY_TOKENS - 1) / 1000)
+        message = {"role": "assistant", "content": "".join(_reply_tokens())}
+        finish_reason = "stop"
+    payload = {
+        "id": "chatcmpl-" + uuid.uuid4().hex,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+    return Response(orjson.dumps(payload), media_type="application/json")
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8900)
+    args = parser.parse_args()
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
+import os
+
+# 组提交写线程直接用 app.database.engine，绕过下面的 get_session 覆盖；测试里固定关闭
+os.environ["SQLITE_GROUP_COMMIT"] = "0"
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import SQLModel, create_engine, Session
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
+from app.auth import token_cache
+from app.ai.report_cache import report_cache
 from app.database import get_session
 from app import models  # noqa: F401 - ensure User, Task registered in SQLModel.metadata
 
@@ -26,6 +33,8 @@ app.dependency_overrides[get_session] = get_test_session
 @pytest.fixture(autouse=True)
 def setup_db():
     SQLModel.metadata.create_all(test_engine)
+    token_cache.clear()  # 每个用例重建库，用户 ID 会复用
+    report_cache.clear()
     yield
     SQLModel.metadata.drop_all(test_engine)
 
@@ -0,0 +1,75 @@
+"""DB_ASYNC 模式：异步路由 + aiosqlite 内存库"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import get_async_session, to_async_url
+from app.routes import tasks_async, users_async
+
+async_engine = create_async_engine(
+    "sqlite+aiosqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+
+
+async def get_test_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+async_app = FastAPI()
+async_app.include_router(users_async.router)
+async_app.include_router(tasks_async.router)
+async_app.dependency_overrides[get_async_session] = get_test_async_session
+
+
+async def _reset_schema():
+    async with async_engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+
+@pytest.fixture
+def async_client():
+    asyncio.run(_reset_schema())
+    return TestClient(async_app)
+
+
+def test_to_async_url():
+    assert to_async_url("sqlite:///./taskflow.db") == "sqlite+aiosqlite:///./taskflow.db"
+    assert (
+        to_async_url("postgresql://u:p@db/taskflow?sslmode=require")
+        == "postgresql+asyncpg://u:p@db/taskflow?ssl=require"
+    )
+
+
+def test_async_crud_roundtrip(async_client):
+    async_client.post("/users/register", json={"username": "async", "email": "a@a.com", "password": "123"})
+    token = async_client.post("/users/login", json={"username": "async", "password": "123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert async_client.get("/users/me", headers=headers).json()["username"] == "async"
+
+    res = async_client.post("/tasks/", json={"title": "异步任务", "priority": "high"}, headers=headers)
+    assert res.status_code == 201
+    task_id = res.json()["id"]
+
+    res = async_client.put(f"/tasks/{task_id}", json={"status": "done"}, headers=headers)
+    assert res.json()["status"] == "done"
+    res = async_client.get("/tasks/", headers=headers)
+    assert res.json()["items"][0]["id"] == task_id
+    cond = {**headers, "If-None-Match": res.headers["etag"]}
+    assert async_client.get("/tasks/", headers=cond).status_code == 304
+    assert async_client.get("/tasks/summary", headers=headers).json()["by_status"]["done"] == 1
+    res = async_client.get(f"/tasks/{task_id}", params={"fields": "title,status"}, headers=headers)
+    assert res.json() == {"title": "异步任务", "status": "done"} and res.headers["etag"]
+
+    assert async_client.delete(f"/tasks/{task_id}", headers=headers).status_code == 204
+    assert async_client.get(f"/tasks/{task_id}", headers=headers).status_code == 404
@@ -1,10 +1,36 @@
 """
 AI 评测：不追求 100% 通过（因为 LLM 有随机性），
 但追求"大多数情况下做对"。需要配置真实的 API Key。
+
+后半部分（流式事件、并发隔离、准入控制）用脚本化的假模型，不需要 API Key。
 """
 
+import asyncio
 import os
+import time
+
+import httpx
+import orjson
 import pytest
+from fastapi import HTTPException
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, RemoveMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langgraph.checkpoint.memory import InMemorySaver
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import app.ai.agent as agent_module
+from app.ai import tools as ai_tools
+from app.ai.checkpointer import SQLCheckpointSaver
+from app.ai.intents import Intent, load_corpus, parse_intent
+from app.ai.limiter import ChatLimiter
+from app.ai.memory import count_tokens, history_hook
+from app.ai.prompts import SUMMARY_PROMPT
+from app.ai.report_cache import CachedReport, ReportCache
+from app.database import get_session
+from app.main import app
+from app.models import ChatCheckpoint, Task
+from tests.conftest import test_engine
 
 EVAL_CASES = [
     {
@@ -26,8 +52,8 @@ EVAL_CASES = [
 
 
 @pytest.mark.skipif(
-    not os.getenv("DASHSCOPE_API_KEY"),
-    reason="No DASHSCOPE_API_KEY set; skip AI eval",
+    not agent_module.llm_api_key(),
+    reason="No LLM_API_KEY / DASHSCOPE_API_KEY set; skip AI eval",
 )
 @pytest.mark.parametrize("case", EVAL_CASES, ids=[c["description"] for c in EVAL_CASES])
 def test_ai_response(client, case):
@@ -53,3 +79,491 @@ def test_ai_response(client, case):
 
     for keyword in case["expect_contains"]:
         assert keyword in reply, f"期望回复包含'{keyword}'，实际回复：{reply}"
+
+
+# ── 流式接口：用脚本化的假模型，不需要 API Key ──
+class _ScriptedModel(GenericFakeChatModel):
+    """按顺序返回预设消息；流式时文本按空格切成 token，工具调用整条发出"""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = next(self.messages)
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": c["name"], "args": orjson.dumps(c["args"]).decode(), "id": c["id"], "index": i}
+                for i, c in enumerate(message.tool_calls)
+            ]))
+            return
+        for i, token in enumerate(message.content.split(" ")):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token if i == 0 else " " + token))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+@pytest.fixture
+def file_db(monkeypatch, tmp_path):
+    """
+    文件库：路由、AI 工具和检查点都在线程里并发读写（LangGraph 的检查点写入和下一步并行），
+    共享单连接的内存库撑不住。返回引擎。
+    """
+    engine = create_engine(f"sqlite:///{tmp_path}/chat.db", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(ai_tools, "engine", engine)
+
+    def file_session():
+        with Session(engine) as session:
+            yield session
+
+    monkeypatch.setitem(app.dependency_overrides, get_session, file_session)
+    return engine
+
+
+def _use_model(monkeypatch, model, engine):
+    """一次性 Agent 和带会话的 Agent 都换成假模型；检查点存进 engine"""
+    monkeypatch.setattr(agent_module, "agent", agent_module.build_agent(model))
+    monkeypatch.setattr(agent_module, "chat_agent", agent_module.build_agent(model, SQLCheckpointSaver(engine)))
+
+
+def _register(client, name: str) -> dict:
+    client.post("/users/register", json={"username": name, "email": f"{name}@x.com", "password": "123"})
+    token = client.post("/users/login", json={"username": name, "password": "123"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _sse_events(text: str) -> list:
+    return [
+        orjson.loads(line[len("data: "):])
+        for line in text.splitlines()
+        if line.startswith("data: ")
+    ]
+
+
+def test_chat_stream_events(client, monkeypatch, file_db):
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "fake")
+    model = _ScriptedModel(messages=iter([
+        AIMessage(content="", tool_calls=[{"name": "create_task", "args": {"title": "写周报"}, "id": "call_1"}]),
+        AIMessage(content="已为你 创建 任务 写周报"),
+    ]))
+    _use_model(monkeypatch, model, file_db)
+
+    headers = _register(client, "streamer")
+    # 快速通道认不出的说法，走 Agent
+    res = client.post("/chat/stream", json={"message": "周五前要写周报，帮我记下来"}, headers=headers)
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+
+    events = _sse_events(res.text)
+    types = [e["type"] for e in events]
+    assert types[0] == "start" and types[-1] == "done", events
+    assert isinstance(events[0]["thread_id"], int)
+    assert types.index("tool_start") < types.index("tool_end") < types.index("token")
+    assert events[types.index("tool_start")] == {"type": "tool_start", "name": "create_task", "args": {"title": "写周报"}}
+    assert "已创建任务" in events[types.index("tool_end")]["result"]
+    # 文本是一段一段推过来的，拼起来就是最终回复
+    tokens = [e["text"] for e in events if e["type"] == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == events[-1]["reply"] == "已为你 创建 任务 写周报"
+
+    with Session(file_db) as session:
+        assert session.exec(select(Task.title)).all() == ["写周报"]
+
+
+def test_chat_stream_error_event(client, monkeypatch):
+    monkeypatch.delenv("LLM_API_KEY", raising=False)
+    monkeypatch.delenv("DASHSCOPE_API_KEY", raising=False)
+    res = client.post("/chat/stream", json={"message": "你好"}, headers=_register(client, "streamer"))
+    events = _sse_events(res.text)
+    assert [e["type"] for e in events] == ["start", "error"]
+    assert "LLM_API_KEY" in events[1]["detail"]
+
+
+def test_llm_api_key_falls_back_to_dashscope(monkeypatch):
+    monkeypatch.delenv("LLM_API_KEY", raising=False)
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "sk-dashscope")
+    assert agent_module.llm_api_key() == "sk-dashscope"
+    monkeypatch.setenv("LLM_API_KEY", "sk-other")
+    assert agent_module.llm_api_key() == "sk-other"
+    monkeypatch.delenv("DASHSCOPE_API_KEY")
+    agent_module._require_api_key()  # 只配 LLM_API_KEY 也够
+
+
+class _EchoTaskModel(_ScriptedModel):
+    """收到用户消息就以消息内容为标题建任务，拿到工具结果后回复 ok；每步停一下让并发的聊天交错"""
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(0.05)
+        last = messages[-1]
+        if last.type == "human":
+            message = AIMessage(content="", tool_calls=[
+                {"name": "create_task", "args": {"title": last.content}, "id": "call_" + last.content}
+            ])
+        else:
+            message = AIMessage(content="ok")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def test_concurrent_chats_act_as_their_own_user(client, monkeypatch, file_db):
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "fake")
+    _use_model(monkeypatch, _EchoTaskModel(messages=iter([])), file_db)
+    users = {name: _register(client, name) for name in ("alice", "bob")}
+    user_ids = {name: client.get("/users/me", headers=h).json()["id"] for name, h in users.items()}
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as ac:
+            requests = [
+                ac.post("/chat/", json={"message": f"{name}-{i}"}, headers=users[name])
+                for i in range(5)
+                for name in users
+            ]
+            return await asyncio.gather(*requests)
+
+    assert all(r.json()["reply"] == "ok" for r in asyncio.run(run()))
+    with Session(file_db) as session:
+        for name, user_id in user_ids.items():
+            titles = session.exec(select(Task.title).where(Task.user_id == user_id)).all()
+            assert sorted(titles) == [f"{name}-{i}" for i in range(5)]
+
+
+FAKE_OPENAI_SCRIPT = [
+    [{"name": "create_tasks", "arguments": {"tasks": [{"title": "甲"}, {"title": "乙", "priority": "high"}]}}],
+    [{"name": "list_tasks", "arguments": {"priority_filter": "high"}}],
+]
+
+
+def _use_fake_openai(monkeypatch, engine, script):
+    """真的 ChatOpenAI 客户端连 benchmarks.fake_openai（进程内挂载，无延迟，按 script 调工具）"""
+    from langchain_openai import ChatOpenAI
+    from pydantic import SecretStr
+
+    from benchmarks import fake_openai
+
+    monkeypatch.setattr(fake_openai, "FIRST_TOKEN_MS", 0)
+    monkeypatch.setattr(fake_openai, "TOKEN_MS", 0)
+    monkeypatch.setattr(fake_openai, "REPLY_TOKENS", 4)
+    monkeypatch.setattr(fake_openai, "SCRIPT", script)
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "fake")
+    model = ChatOpenAI(
+        model="fake",
+        api_key=SecretStr("fake"),
+        base_url="http://fake-llm/v1",
+        http_async_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_openai.app)),
+    )
+    _use_model(monkeypatch, model, engine)
+
+
+def test_chat_end_to_end_against_fake_openai_server(client, monkeypatch, file_db):
+    """请求格式、工具调用解析、流式都走一遍"""
+    _use_fake_openai(monkeypatch, file_db, FAKE_OPENAI_SCRIPT)
+    headers = _register(client, "e2e")
+
+    res = client.post("/chat/", json={"message": "加两个任务然后看看高优先级的"}, headers=headers)
+    assert res.status_code == 200 and res.json()["reply"] == "你目前的任务"
+    with Session(file_db) as session:
+        assert sorted(session.exec(select(Task.title)).all()) == ["乙", "甲"]
+
+    res = client.post("/chat/stream", json={"message": "再加两个然后看看"}, headers=headers)
+    events = _sse_events(res.text)
+    assert [e["name"] for e in events if e["type"] == "tool_start"] == ["create_tasks", "list_tasks"]
+    assert "共 2 个任务" in [e for e in events if e["type"] == "tool_end"][-1]["result"]
+    assert "".join(e["text"] for e in events if e["type"] == "token") == "你目前的任务"
+
+
+def test_trace_writer_drops_when_queue_full(monkeypatch):
+    from app.ai import tracing
+
+    writer = tracing.TraceWriter(maxsize=1)
+    monkeypatch.setattr(writer, "_ensure_started", lambda: None)  # 写线程不取，模拟磁盘卡住
+    before = tracing.TRACES_DROPPED._values.get((), 0)
+    writer.write({"entry": "chat"})
+    writer.write({"entry": "chat"})  # 不阻塞调用方，直接丢
+    assert tracing.TRACES_DROPPED._values[()] == before + 1
+
+
+def test_agent_tracing_metrics_and_trace_file(client, monkeypatch, file_db, tmp_path):
+    from app.ai import tracing
+
+    trace_path = tmp_path / "trace.jsonl"
+    monkeypatch.setattr(tracing, "AGENT_TRACE_FILE", str(trace_path))
+    _use_fake_openai(monkeypatch, file_db, FAKE_OPENAI_SCRIPT)
+    headers = _register(client, "tracer")
+
+    res = client.post("/chat/", json={"message": "加两个任务然后看看高优先级的"}, headers=headers)
+    assert res.status_code == 200
+    timing = res.headers["server-timing"]
+    assert 'desc="3 calls"' in timing.split("llm;")[1] and 'desc="2 calls"' in timing.split("tools;")[1]
+    client.post("/chat/stream", json={"message": "再加两个然后看看"}, headers=headers)
+    tracing.trace_writer.stop()  # 写完排队的轨迹并关闭文件
+
+    record, streamed = [orjson.loads(line) for line in trace_path.read_text().splitlines()]
+    assert streamed["entry"] == "chat_stream" and streamed["spans"][-1]["first_token_ms"] >= 0
+    assert record["entry"] == "chat" and record["status"] == "ok" and record["steps"] == 3
+    kinds = [(s["kind"], s["name"]) for s in record["spans"]]
+    assert kinds == [("llm", "fake"), ("tool", "create_tasks"), ("llm", "fake"), ("tool", "list_tasks"), ("llm", "fake")]
+    create = record["spans"][1]
+    assert create["args"]["tasks"][0]["title"] == "甲" and create["db_queries"] > 0 and create["result_chars"] > 0
+    assert record["spans"][0]["prompt_tokens"] > 0 and record["spans"][0]["estimated"] is True
+    assert all(s["start_ms"] + s["duration_ms"] <= record["duration_ms"] for s in record["spans"])
+
+    metrics = client.get("/metrics").text
+    assert 'taskflow_tool_call_duration_seconds_count{tool="create_tasks",status="ok"}' in metrics
+    assert 'taskflow_llm_call_duration_seconds_count{model="fake",node="agent",status="ok"}' in metrics
+    assert 'taskflow_agent_steps_bucket{entry="chat",le="3"}' in metrics
+    assert 'taskflow_tool_db_duration_seconds_count{tool="list_tasks"}' in metrics
+
+
+def test_chat_limiter_queue_and_fast_fail():
+    async def run():
+        limiter = ChatLimiter(max_concurrency=1, queue_size=1, queue_timeout=0.2)
+        await limiter.acquire()
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+        # 运行和排队都满：立即拒绝
+        with pytest.raises(HTTPException) as exc:
+            await limiter.acquire()
+        assert exc.value.status_code == 429 and exc.value.headers["Retry-After"]
+        # 释放时名额直接交给队头
+        limiter.release()
+        await queued
+        assert limiter.running == 1 and limiter.queued == 0
+        # 排队超时也是 429，出队后排队数归零
+        with pytest.raises(HTTPException):
+            await limiter.acquire()
+        assert limiter.queued == 0
+        # 排队中被取消（客户端断开）同样出队
+        cancelled = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        assert limiter.queued == 0
+        limiter.release()
+        assert limiter.running == 0
+
+    asyncio.run(run())
+
+
+def test_chat_limiter_timeout_returns_handed_over_slot(monkeypatch):
+    from app.ai import limiter as limiter_module
+
+    async def run():
+        limiter = ChatLimiter(max_concurrency=1, queue_size=1, queue_timeout=1)
+        await limiter.acquire()
+
+        async def wait_for(waiter, timeout):
+            limiter.release()  # 持有者正好在排队超时的那一刻还名额，转交给了这个 waiter
+            raise asyncio.TimeoutError
+
+        monkeypatch.setattr(limiter_module.asyncio, "wait_for", wait_for)
+        with pytest.raises(HTTPException):
+            await limiter.acquire()
+        assert limiter.running == 0 and limiter.queued == 0
+
+    asyncio.run(run())
+
+
+# ── 会话记忆 ──
+class _RecordingModel(_ScriptedModel):
+    """记下每次收到的消息；对话回复固定文本，摘要请求回复固定摘要"""
+
+    prompts: list = []
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.prompts.append(messages)
+        if messages[0].content.startswith(SUMMARY_PROMPT[:10]):
+            text = "摘要：用户一直在聊周报"
+        else:
+            text = "收到，" + messages[-1].content
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+def test_chat_thread_keeps_history(client, monkeypatch, file_db):
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "fake")
+    model = _RecordingModel(messages=iter([]), prompts=[])
+    _use_model(monkeypatch, model, file_db)
+    headers = _register(client, "memo")
+
+    first = client.post("/chat/", json={"message": "我叫小明"}, headers=headers).json()
+    thread_id = first["thread_id"]
+    second = client.post("/chat/", json={"message": "我叫什么", "thread_id": thread_id}, headers=headers).json()
+    assert second == {"reply": "收到，我叫什么", "thread_id": thread_id}
+    # 第二轮发给模型的是 系统提示词 + 第一轮问答 + 本轮消息
+    assert [m.content for m in model.prompts[-1][1:]] == ["我叫小明", "收到，我叫小明", "我叫什么"]
+
+    assert [t["id"] for t in client.get("/chat/threads", headers=headers).json()] == [thread_id]
+    detail = client.get(f"/chat/threads/{thread_id}", headers=headers).json()
+    assert detail["title"] == "我叫小明"
+    assert [m["role"] for m in detail["messages"]] == ["user", "ai", "user", "ai"]
+
+    # 别人的会话：不能续聊也看不到
+    other = _register(client, "other")
+    assert client.post("/chat/", json={"message": "hi", "thread_id": thread_id}, headers=other).status_code == 404
+    assert client.post("/chat/stream", json={"message": "hi", "thread_id": thread_id}, headers=other).status_code == 404
+    assert client.get(f"/chat/threads/{thread_id}", headers=other).status_code == 404
+
+    assert client.delete(f"/chat/threads/{thread_id}", headers=headers).status_code == 204
+    assert client.get(f"/chat/threads/{thread_id}", headers=headers).status_code == 404
+    with Session(file_db) as session:
+        assert session.exec(select(ChatCheckpoint)).all() == []
+
+
+def test_prune_threads_drops_idle_threads_and_history(client, monkeypatch, file_db):
+    from datetime import datetime, timedelta
+    from app.ai.threads import prune_threads
+    from app.models import ChatThread
+
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "fake")
+    _use_model(monkeypatch, _RecordingModel(messages=iter([]), prompts=[]), file_db)
+    headers = _register(client, "idle")
+    old = client.post("/chat/", json={"message": "很久以前"}, headers=headers).json()["thread_id"]
+    recent = client.post("/chat/", json={"message": "刚刚"}, headers=headers).json()["thread_id"]
+    with Session(file_db) as session:
+        session.get(ChatThread, old).updated_at = datetime.now() - timedelta(days=100)
+        session.commit()
+        assert prune_threads(session, datetime.now() - timedelta(days=90)) == 1
+        session.commit()
+        assert session.exec(select(ChatThread.id)).all() == [recent]
+        assert set(session.exec(select(ChatCheckpoint.thread_id)).all()) == {str(recent)}
+
+
+def test_chat_stream_queue_timeout_leaves_no_thread(client, monkeypatch):
+    from app.models import ChatThread
+    from app.routes import chat as chat_routes
+
+    limiter = ChatLimiter(max_concurrency=1, queue_size=1, queue_timeout=0.05)
+    limiter.running = 1  # 名额被占满，新请求进队列后超时
+    monkeypatch.setattr(chat_routes, "chat_limiter", limiter)
+    res = client.post("/chat/stream", json={"message": "你好"}, headers=_register(client, "queued"))
+    assert res.status_code == 200
+    assert [e["type"] for e in _sse_events(res.text)] == ["error"]
+    with Session(test_engine) as session:
+        assert session.exec(select(ChatThread)).all() == []
+
+
+def test_long_conversation_stays_under_budget():
+    budget = 800
+    model = _RecordingModel(messages=iter([]), prompts=[])
+    agent = agent_module.build_agent(model, InMemorySaver(), token_budget=budget)
+    config = {"configurable": {"thread_id": "1"}}
+    ai_tools.set_current_user_id(1)
+    for i in range(30):
+        state = agent.invoke({"messages": [{"role": "user", "content": f"第 {i} 轮：帮我看看周报写到哪了"}]}, config)
+
+    chat_prompts = [p for p in model.prompts if not p[0].content.startswith(SUMMARY_PROMPT[:10])]
+    assert len(chat_prompts) == 30
+    assert max(count_tokens(p) for p in chat_prompts) <= budget
+    # 早期对话压进了摘要，状态里的消息数不随轮数增长
+    assert state["summary"] == "摘要：用户一直在聊周报"
+    assert "摘要：用户一直在聊周报" in chat_prompts[-1][0].content
+    assert len(state["messages"]) < 20
+    assert state["messages"][-1].content == "收到，第 29 轮：帮我看看周报写到哪了"
+
+
+def test_history_hook_keeps_tool_calls_with_results():
+    class _Failing(_RecordingModel):
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            raise RuntimeError("LLM down")
+
+    messages = []
+    for i in range(6):
+        messages += [
+            HumanMessage(f"问题 {i} " * 20, id=f"h{i}"),
+            AIMessage("", tool_calls=[{"name": "list_tasks", "args": {}, "id": f"c{i}"}], id=f"a{i}"),
+            ToolMessage("任务列表 " * 30, tool_call_id=f"c{i}", name="list_tasks", id=f"t{i}"),
+            AIMessage(f"回答 {i}", id=f"r{i}"),
+        ]
+    ok = history_hook(_RecordingModel(messages=iter([]), prompts=[]), token_budget=1000).invoke({"messages": messages})
+    removed = [m.id for m in ok["messages"] if isinstance(m, RemoveMessage)]
+    kept = ok["llm_input_messages"][1:]
+    # 从某条用户消息处切开：工具调用和结果不会被拆散
+    assert removed and isinstance(kept[0], HumanMessage)
+    assert [m.id for m in kept] == [m.id for m in messages[len(removed):]]
+    assert count_tokens(ok["llm_input_messages"]) <= 1000
+
+    # 摘要失败：只截断这次发给模型的消息，状态不动
+    failed = history_hook(_Failing(messages=iter([]), prompts=[]), token_budget=1000).invoke({"messages": messages})
+    assert set(failed) == {"llm_input_messages"}
+    assert [m.id for m in failed["llm_input_messages"][1:]] == [m.id for m in kept]
+
+
+# ── 周报缓存 ──
+def test_weekly_report_cached_until_tasks_change(client, monkeypatch, file_db):
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "fake")
+    model = _RecordingModel(messages=iter([]), prompts=[])
+    _use_model(monkeypatch, model, file_db)
+    headers = _register(client, "reporter")
+
+    first = client.post("/chat/weekly-report", headers=headers).json()
+    assert first["cached"] is False and first["report"].startswith("收到")
+    second = client.post("/chat/weekly-report", headers=headers).json()
+    assert second == {"report": first["report"], "cached": True}
+    assert len(model.prompts) == 1
+
+    # 任何任务改动都让版本号 +1，下一次重新生成
+    client.post("/tasks/", json={"title": "新任务"}, headers=headers)
+    assert client.post("/chat/weekly-report", headers=headers).json()["cached"] is False
+    assert len(model.prompts) == 2
+
+    # 生成失败不缓存
+    monkeypatch.delenv("LLM_API_KEY", raising=False)
+    monkeypatch.delenv("DASHSCOPE_API_KEY")
+    client.post("/tasks/", json={"title": "又一个"}, headers=headers)
+    assert client.post("/chat/weekly-report", headers=headers).json()["report"].startswith("周报生成失败")
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "fake")
+    assert client.post("/chat/weekly-report", headers=headers).json()["cached"] is False
+
+    metrics = client.get("/metrics").text
+    assert "taskflow_weekly_report_cache_hit_ratio 0.2000" in metrics
+    assert "taskflow_weekly_report_llm_calls_saved_total" in metrics
+
+
+def test_report_cache_lru_and_table(client):
+    client.post("/users/register", json={"username": "alice", "email": "a@x.com", "password": "123"})
+    client.post("/users/register", json={"username": "bob", "email": "b@x.com", "password": "123"})
+    with Session(test_engine) as session:
+        cache = ReportCache(maxsize=1, use_table=True)
+        cache.put(session, 1, "2026-W42", 3, CachedReport("alice 周报", 2))
+        cache.put(session, 2, "2026-W42", 1, CachedReport("bob 周报", 2))
+        # 内存只留 1 条，被挤掉的从表里找回
+        assert cache.stats()["size"] == 1
+        assert cache.get(session, 1, "2026-W42", 3) == CachedReport("alice 周报", 2)
+
+        # 新进程：内存是空的，表里的同版本仍然命中；版本变了就不命中
+        fresh = ReportCache(maxsize=10, use_table=True)
+        assert fresh.get(session, 2, "2026-W42", 1).report == "bob 周报"
+        assert fresh.get(session, 2, "2026-W42", 2) is None
+        assert fresh.stats()["hits"] == 1 and fresh.stats()["misses"] == 1
+
+
+# ── 快速通道 ──
+@pytest.mark.parametrize("case", load_corpus(), ids=lambda c: c["text"])
+def test_intent_corpus(case):
+    expected = Intent(case["tool"], case["args"]) if case["tool"] else None
+    assert parse_intent(case["text"]) == expected
+
+
+def test_fast_path_skips_llm_and_joins_thread(client, monkeypatch, file_db):
+    monkeypatch.delenv("LLM_API_KEY", raising=False)  # 不调 LLM，没有 Key 也能用
+    monkeypatch.delenv("DASHSCOPE_API_KEY", raising=False)
+    model = _RecordingModel(messages=iter([]), prompts=[])
+    _use_model(monkeypatch, model, file_db)
+    headers = _register(client, "fast")
+
+    created = client.post("/chat/", json={"message": "帮我加个任务：写周报"}, headers=headers).json()
+    assert created["reply"].startswith("✅ 已创建任务")
+    thread_id = created["thread_id"]
+    res = client.post("/chat/stream", json={"message": "把 ID 1 标记为完成", "thread_id": thread_id}, headers=headers)
+    events = _sse_events(res.text)
+    assert [e["type"] for e in events] == ["start", "tool_start", "tool_end", "token", "done"]
+    assert events[1]["args"] == {"task_id": 1, "new_status": "done"}
+    assert client.get("/tasks/1", headers=headers).json()["status"] == "done"
+
+    # 问答记进了会话历史，之后的 Agent 轮次能看到
+    messages = client.get(f"/chat/threads/{thread_id}", headers=headers).json()["messages"]
+    assert [m["content"] for m in messages][::2] == ["帮我加个任务：写周报", "把 ID 1 标记为完成"]
+    assert model.prompts == []
+    assert 'taskflow_chat_routed_total{route="fast",tool="update_task"}' in client.get("/metrics").text
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+
+import orjson
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app import events
+from app.events import Subscription, hub
+from tests.test_export import _seed
+
+
+def test_websocket_pushes_task_changes(client):
+    headers = _seed(0)
+    token = headers["Authorization"].split()[1]
+    with client.websocket_connect("/events/ws") as ws:
+        ws.send_json({"token": token})
+        assert ws.receive_json() == {"type": "ready"}
+        task = client.post("/tasks/", json={"title": "推送"}, headers=headers).json()
+        first = ws.receive_json()
+        assert first == {"type": "tasks_changed", "version": task["change_version"]}
+        client.request("DELETE", "/tasks/bulk", json={"ids": [task["id"]]}, headers=headers)
+        assert ws.receive_json()["version"] == first["version"] + 1
+    assert hub.connections == 0
+
+    with client.websocket_connect("/events/ws") as ws:
+        ws.send_json({"token": "bad"})
+        with pytest.raises(WebSocketDisconnect):
+            ws.receive_json()
+
+
+def test_slow_consumer_gets_resync(monkeypatch):
+    monkeypatch.setattr(events, "EVENTS_QUEUE_SIZE", 3)
+    sub = Subscription(1)
+    for version in range(1, 6):
+        sub.push({"type": "tasks_changed", "version": version})
+    assert list(sub.pending) == [
+        {"type": "resync", "version": 4},
+        {"type": "tasks_changed", "version": 5},
+    ]
+
+
+def test_sse_stream(client):
+    """直接驱动 ASGI：SSE 是无限流，TestClient 会一直读下去"""
+    from app.main import app
+
+    headers = _seed(0)
+    chunks = []
+
+    async def run():
+        received = asyncio.Event()
+        disconnect = asyncio.Event()
+        requested = []
+
+        async def receive():
+            if not requested:
+                requested.append(True)
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                chunks.append(message["body"])
+                received.set()
+
+        scope = {
+            "type": "http", "method": "GET", "path": "/events", "raw_path": b"/events",
+            "query_string": b"", "root_path": "", "scheme": "http", "http_version": "1.1",
+            "server": ("test", 80), "client": ("test", 1),
+            "headers": [(b"authorization", headers["Authorization"].encode())],
+        }
+        task = asyncio.create_task(app(scope, receive, send))
+        await asyncio.wait_for(received.wait(), 5)
+        received.clear()
+        # 写操作在别的线程提交，事件经 call_soon_threadsafe 回到这个事件循环
+        writer = threading.Thread(
+            target=lambda: client.post("/tasks/", json={"title": "SSE"}, headers=headers)
+        )
+        writer.start()
+        await asyncio.wait_for(received.wait(), 5)
+        writer.join()
+        disconnect.set()
+        await asyncio.wait_for(task, 5)
+
+    asyncio.run(run())
+    assert chunks[0].startswith(b"retry: 3000\nevent: ready")
+    event = chunks[1].decode()
+    assert event.startswith("event: tasks_changed\nid: 1\n")
+    assert orjson.loads(event.split("data: ")[1]) == {"type": "tasks_changed", "version": 1}
+    assert hub.connections == 0
@@ -0,0 +1,92 @@
+import asyncio
+import csv
+import io
+import os
+from datetime import datetime
+
+import orjson
+import pytest
+import zstandard
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from app.auth import create_access_token
+from app.main import app
+from app.models import Task, User
+from tests.conftest import test_engine
+
+
+def _seed(count: int, batch: int = 50_000) -> dict:
+    with Session(test_engine) as session:
+        user = User(username="exporter", email="x@x.com", hashed_password="!")
+        session.add(user)
+        session.commit()
+        now = datetime.now()
+        for start in range(0, count, batch):
+            session.execute(insert(Task), [
+                {"title": f"任务{i}", "user_id": user.id, "created_at": now, "updated_at": now}
+                for i in range(start, min(start + batch, count))
+            ])
+        session.commit()
+        token = create_access_token({"sub": str(user.id)})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_export_ndjson_csv_and_zstd(client):
+    headers = _seed(3)
+
+    res = client.get("/tasks/export", headers=headers)
+    assert res.headers["content-type"] == "application/x-ndjson"
+    rows = [orjson.loads(line) for line in res.content.splitlines()]
+    assert [r["title"] for r in rows] == ["任务0", "任务1", "任务2"]
+
+    res = client.get("/tasks/export?format=csv", headers=headers)
+    rows = list(csv.DictReader(io.StringIO(res.text)))
+    assert len(rows) == 3 and rows[0]["status"] == "todo"
+
+    res = client.get("/tasks/export?compression=zstd", headers=headers)
+    assert res.headers["content-disposition"].endswith('tasks.ndjson.zst"')
+    raw = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(res.content)).read()
+    assert len(raw.splitlines()) == 3
+
+
+def _rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+@pytest.mark.skipif(
+    not os.getenv("RUN_SLOW_TESTS") or not os.path.exists("/proc/self/statm"),
+    reason="慢测试：设置 RUN_SLOW_TESTS=1 运行（需要 Linux /proc）",
+)
+def test_export_1m_rows_with_bounded_rss():
+    total = 1_000_000
+    headers = _seed(total)
+    # TestClient 会把整个响应体攒在内存里，这里直接驱动 ASGI，收到的块只计数不保留
+    scope = {
+        "type": "http", "method": "GET", "path": "/tasks/export", "raw_path": b"/tasks/export",
+        "query_string": b"format=ndjson", "root_path": "", "scheme": "http", "http_version": "1.1",
+        "server": ("test", 80), "client": ("test", 1),
+        "headers": [(b"authorization", headers["Authorization"].encode())],
+    }
+    stats = {"lines": 0, "peak": 0}
+    baseline = _rss_bytes()
+
+    requested = False
+
+    async def receive():
+        # 请求体只给一次，之后挂起；否则 StreamingResponse 的断连监听会空转
+        nonlocal requested
+        if requested:
+            await asyncio.Event().wait()
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            stats["lines"] += message.get("body", b"").count(b"\n")
+            stats["peak"] = max(stats["peak"], _rss_bytes() - baseline)
+
+    asyncio.run(app(scope, receive, send))
+    assert stats["lines"] == total
+    assert stats["peak"] < 64 * 1024 * 1024, f"RSS 增长 {stats['peak'] / 2**20:.1f} MiB"
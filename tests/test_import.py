@@ -0,0 +1,74 @@
+import orjson
+
+from app import task_io
+from tests.test_export import _seed
+
+
+def _chunks(body: bytes, size: int):
+    """故意切在任意位置（包括多字节字符中间），模拟网络分块"""
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def test_import_ndjson_reports_rejected_rows(client, monkeypatch):
+    auth_headers = _seed(0)
+    monkeypatch.setattr(task_io, "IMPORT_CHUNK_ROWS", 2)
+    lines = [
+        orjson.dumps({"title": "导入一", "priority": "high"}),
+        b"",
+        b"{not json",
+        orjson.dumps({"title": "", "status": "done"}),
+        b"[1, 2]",
+        orjson.dumps({"title": "导入二", "status": "done", "id": 999}),
+        orjson.dumps({"title": "导入三"}),
+    ]
+    res = client.post(
+        "/tasks/import", content=_chunks(b"\n".join(lines), 7), headers=auth_headers
+    )
+    assert res.status_code == 200
+    body = res.json()
+    assert body["created"] == 3 and body["rejected"] == 3
+    assert [e["line"] for e in body["errors"]] == [3, 4, 5]
+    assert "title" in body["errors"][1]["detail"]
+
+    summary = client.get("/tasks/summary", headers=auth_headers).json()
+    assert summary["total"] == 3
+    assert summary["by_status"]["done"] == 1 and summary["by_priority"]["high"] == 1
+
+
+def test_import_csv_round_trips_export(client, monkeypatch):
+    headers = _seed(0)
+    body = (
+        "title,description,priority,status\n"
+        '普通,,low,todo\n'
+        '"带逗号, 和""引号""","多行\n描述",urgent,done\n'
+        "太多列,a,low,todo,extra\n"
+        "坏优先级,,nope,todo\n"
+    ).encode()
+    res = client.post("/tasks/import?format=csv", content=_chunks(body, 5), headers=headers)
+    result = res.json()
+    assert result["created"] == 2
+    assert [e["line"] for e in result["errors"]] == [5, 6]
+
+    exported = client.get("/tasks/export?format=csv", headers=headers).content
+    res = client.post("/tasks/import?format=csv", content=exported, headers=headers)
+    assert res.json() == {"created": 2, "rejected": 0, "errors": []}
+    rows = client.get("/tasks/export", headers=headers).content.splitlines()
+    titles = sorted(orjson.loads(r)["title"] for r in rows)
+    assert titles == ['带逗号, 和"引号"', '带逗号, 和"引号"', "普通", "普通"]
+    assert {orjson.loads(r)["description"] for r in rows} == {None, "多行\n描述"}
+
+
+def test_import_skips_oversized_record_and_rejects_bad_encoding(client):
+    auth_headers = _seed(0)
+    splitter = task_io.RecordSplitter(quoted=True, max_chars=50)
+    records = []
+    for chunk in _chunks(b'title\n"' + b"x\n" * 40 + b'",y\nok\n', 3):
+        records += splitter.feed(chunk)
+    records += splitter.finish()
+    assert records == [(1, "title"), (43, "ok")]
+    assert splitter.errors == [(2, "记录超过 50 个字符，已跳过")]
+
+    res = client.post("/tasks/import", content=b'{"title": "a"}\n\xff\xfe\n', headers=auth_headers)
+    assert res.status_code == 400
+    assert res.json()["detail"]["created"] == 0
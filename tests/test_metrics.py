@@ -0,0 +1,27 @@
+import logging
+
+
+def test_server_timing_and_metrics(client):
+    client.post("/users/register", json={"username": "metric", "email": "m@m.com", "password": "123"})
+    token = client.post("/users/login", json={"username": "metric", "password": "123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    res = client.get("/tasks/", headers=headers)
+    assert res.status_code == 200
+    timing = res.headers["Server-Timing"]
+    assert timing.startswith("db;dur=")
+    assert '"0 queries"' not in timing  # 首次认证查用户 + 列表查询
+
+    body = client.get("/metrics").text
+    assert 'taskflow_http_request_duration_seconds_count{method="GET",route="/tasks/"}' in body
+    assert 'taskflow_db_queries_total{method="GET",route="/tasks/"}' in body
+    assert "taskflow_auth_cache_misses_total" in body
+
+
+def test_slow_query_log(client, monkeypatch, caplog):
+    from app import metrics
+
+    monkeypatch.setattr(metrics, "SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="taskflow.slow_query"):
+        client.post("/users/register", json={"username": "slow", "email": "s@s.com", "password": "123"})
+    assert any("慢查询" in r.getMessage() for r in caplog.records)
@@ -31,7 +31,7 @@ def test_create_and_list_tasks(client, auth_headers):
 
     res = client.get("/tasks/", headers=auth_headers)
     assert res.status_code == 200
-    tasks = res.json()
+    tasks = res.json()["items"]
     assert len(tasks) >= 1
     titles = [t["title"] for t in tasks]
     assert "写周报" in titles
@@ -60,3 +60,383 @@ def test_get_update_delete_task(client, auth_headers):
 
     res = client.get(f"/tasks/{task_id}", headers=auth_headers)
     assert res.status_code == 404
+
+
+def test_list_tasks_cursor_pagination(client, auth_headers):
+    for i in range(5):
+        client.post("/tasks/", json={"title": f"任务{i}"}, headers=auth_headers)
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        res = client.get("/tasks/", params=params, headers=auth_headers)
+        assert res.status_code == 200
+        page = res.json()
+        assert len(page["items"]) <= 2
+        seen += [t["title"] for t in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    # 最近更新的在前，翻完不重不漏
+    assert seen == [f"任务{i}" for i in reversed(range(5))]
+
+    res = client.get("/tasks/", params={"cursor": "garbage"}, headers=auth_headers)
+    assert res.status_code == 400
+
+
+def test_summary_counters_follow_mutations(client, auth_headers):
+    a = client.post("/tasks/", json={"title": "A", "priority": "high"}, headers=auth_headers).json()
+    b = client.post("/tasks/", json={"title": "B"}, headers=auth_headers).json()
+    client.put(f"/tasks/{a['id']}", json={"status": "done"}, headers=auth_headers)
+    client.delete(f"/tasks/{b['id']}", headers=auth_headers)
+
+    res = client.get("/tasks/summary", headers=auth_headers)
+    assert res.status_code == 200
+    summary = res.json()
+    assert summary["total"] == 1
+    assert summary["by_status"]["done"] == 1
+    assert summary["by_status"]["todo"] == 0
+    assert summary["by_priority"]["high"] == 1
+
+
+def test_reconcile_counters_reports_and_fixes_drift(client, auth_headers):
+    from sqlalchemy import update
+    from sqlmodel import Session
+
+    from app.counters import reconcile_counters
+    from app.models import TaskCounter
+    from tests.conftest import test_engine
+
+    client.post("/tasks/", json={"title": "A"}, headers=auth_headers)
+    with Session(test_engine) as session:
+        assert reconcile_counters(session) == []
+        session.execute(update(TaskCounter).values(count=7))
+        session.commit()
+
+        drift = reconcile_counters(session)
+        assert [(d["stored"], d["actual"]) for d in drift] == [(7, 1)]
+        session.commit()
+        assert reconcile_counters(session, fix=False) == []
+
+
+def test_bulk_create_update_delete(client, auth_headers):
+    res = client.post("/tasks/bulk", json={"items": [
+        {"title": "批量1", "priority": "high"},
+        {"title": ""},  # 标题为空，单条报错
+        {"title": "批量2"},
+    ]}, headers=auth_headers)
+    assert res.status_code == 200
+    body = res.json()
+    assert [t["title"] for t in body["created"]] == ["批量1", "批量2"]
+    assert [e["index"] for e in body["errors"]] == [1]
+    ids = [t["id"] for t in body["created"]]
+
+    res = client.patch("/tasks/bulk", json={"items": [
+        {"id": ids[0], "status": "done"},
+        {"id": ids[1], "status": "done"},
+        {"id": 9999, "status": "done"},
+    ]}, headers=auth_headers)
+    body = res.json()
+    assert body["updated"] == ids
+    assert body["errors"] == [{"index": 2, "id": 9999, "detail": "任务不存在"}]
+    assert client.get(f"/tasks/{ids[1]}", headers=auth_headers).json()["status"] == "done"
+    summary = client.get("/tasks/summary", headers=auth_headers).json()
+    assert summary["by_status"]["done"] == 2 and summary["by_status"]["todo"] == 0
+
+    res = client.request("DELETE", "/tasks/bulk", json={"ids": ids + [9999]}, headers=auth_headers)
+    assert res.json()["deleted"] == ids
+    assert client.get("/tasks/summary", headers=auth_headers).json()["total"] == 0
+
+    # 不合法的条目逐条报错，不影响同批其他条目，也不会让整批 500
+    other = client.post("/tasks/", json={"title": "保留"}, headers=auth_headers).json()
+    res = client.patch("/tasks/bulk", json={"items": [
+        {"id": "abc", "status": "done"},
+        {"id": other["id"], "title": None},
+        {"id": other["id"], "title": ""},
+        {"id": other["id"], "priority": None},
+        {"id": other["id"], "priority": "urgent"},
+    ]}, headers=auth_headers)
+    assert res.status_code == 200
+    body = res.json()
+    assert body["updated"] == [other["id"]]
+    assert [(e["index"], e["id"]) for e in body["errors"]] == [
+        (0, None), (1, other["id"]), (2, other["id"]), (3, other["id"])
+    ]
+    task = client.get(f"/tasks/{other['id']}", headers=auth_headers).json()
+    assert task["title"] == "保留" and task["priority"] == "urgent"
+
+    too_many = {"items": [{"title": "x"}] * 501}
+    assert client.post("/tasks/bulk", json=too_many, headers=auth_headers).status_code == 422
+
+
+def test_etag_conditional_get(client, auth_headers, monkeypatch):
+    task = client.post("/tasks/", json={"title": "缓存"}, headers=auth_headers).json()
+    res = client.get("/tasks/", headers=auth_headers)
+    etag = res.headers["etag"]
+    assert etag.startswith('W/"')
+
+    cond = {**auth_headers, "If-None-Match": etag}
+    res = client.get("/tasks/", headers=cond)
+    assert res.status_code == 304 and res.content == b""
+    assert 'desc="1 queries"' in res.headers["server-timing"]  # 只查了版本号
+    assert client.get(f"/tasks/{task['id']}", headers=cond).status_code == 304
+
+    client.put(f"/tasks/{task['id']}", json={"status": "done"}, headers=auth_headers)
+    res = client.get("/tasks/", headers=cond)
+    assert res.status_code == 200 and res.headers["etag"] != etag
+    etag = res.headers["etag"]
+
+    # AI 工具的写操作同样让版本前进
+    from sqlmodel import Session
+    from app.ai import tools
+    from tests.conftest import test_engine
+
+    monkeypatch.setattr(tools, "_get_session", lambda: Session(test_engine))
+    tools.set_current_user_id(task["user_id"])
+    tools.create_task.invoke({"title": "AI 建的"})
+    res = client.get("/tasks/", headers={**auth_headers, "If-None-Match": etag})
+    assert res.status_code == 200 and len(res.json()["items"]) == 2
+
+
+def test_changes_delta_sync_with_tombstones(client, auth_headers):
+    res = client.get("/tasks/changes", headers=auth_headers).json()
+    assert res["reset"] is True
+    cursor = res["cursor"]
+
+    a = client.post("/tasks/", json={"title": "A"}, headers=auth_headers).json()
+    b = client.post("/tasks/", json={"title": "B"}, headers=auth_headers).json()
+    res = client.get("/tasks/changes", params={"since": cursor}, headers=auth_headers).json()
+    assert [t["id"] for t in res["changes"]] == [a["id"], b["id"]] and res["deleted"] == []
+    cursor = res["cursor"]
+    assert client.get("/tasks/changes", params={"since": cursor}, headers=auth_headers).json() == {
+        "cursor": cursor, "reset": False, "changes": [], "deleted": []
+    }
+
+    client.put(f"/tasks/{a['id']}", json={"status": "done"}, headers=auth_headers)
+    client.delete(f"/tasks/{b['id']}", headers=auth_headers)
+    created = client.post("/tasks/bulk", json={"items": [{"title": "C"}, {"title": "D"}]},
+                          headers=auth_headers).json()["created"]
+    client.request("DELETE", "/tasks/bulk", json={"ids": [created[1]["id"]]}, headers=auth_headers)
+    res = client.get("/tasks/changes", params={"since": cursor}, headers=auth_headers).json()
+    assert {t["title"]: t["status"] for t in res["changes"]} == {"A": "done", "C": "todo"}
+    assert sorted(res["deleted"]) == sorted([b["id"], created[1]["id"]])
+    assert int(res["cursor"]) > int(cursor)
+
+    # 墓碑清理后，早于清理点的游标必须全量重来
+    from datetime import datetime, timedelta
+    from sqlmodel import Session
+    from app.versions import prune_tombstones
+    from tests.conftest import test_engine
+
+    with Session(test_engine) as session:
+        assert prune_tombstones(session, datetime.now() + timedelta(seconds=1)) == 2
+        session.commit()
+    assert client.get("/tasks/changes", params={"since": cursor}, headers=auth_headers).json()["reset"]
+    latest = res["cursor"]
+    assert not client.get("/tasks/changes", params={"since": latest}, headers=auth_headers).json()["reset"]
+    assert client.get("/tasks/changes", params={"since": "x"}, headers=auth_headers).status_code == 400
+
+
+def test_ai_list_tools_paginate_and_stay_within_budget(client, auth_headers, monkeypatch):
+    from sqlmodel import Session
+    from app.ai import tools
+    from app.ai.memory import count_text_tokens
+    from tests.conftest import test_engine
+
+    items = [{"title": f"任务 {i}", "priority": ["low", "urgent"][i % 2]} for i in range(30)]
+    created = client.post("/tasks/bulk", json={"items": items}, headers=auth_headers).json()["created"]
+    client.put(f"/tasks/{created[0]['id']}", json={"status": "done"}, headers=auth_headers)
+    monkeypatch.setattr(tools, "_get_session", lambda: Session(test_engine))
+    tools.set_current_user_id(created[0]["user_id"])
+
+    out = tools.list_tasks.invoke({"limit": 5})
+    lines = out.splitlines()
+    assert lines[0].startswith("共 30 个任务") and lines[1] == tools.ROW_HEADER
+    assert len(lines) == 2 + 5 + 1 and "还有 25 个未显示" in lines[-1] and "offset=5" in lines[-1]
+    assert lines[2].startswith(f"{created[0]['id']}|任务 0|done|low|")  # 最近更新在前
+
+    rows = tools.list_tasks.invoke({"priority_filter": "urgent", "order_by": "created", "offset": 10}).splitlines()
+    assert rows[0].startswith("共 15 个任务") and len(rows) == 2 + 5
+    assert rows[2].startswith(f"{created[9]['id']}|") and rows[-1].startswith(f"{created[1]['id']}|")
+    first = tools.list_tasks.invoke({"order_by": "priority", "limit": 1}).splitlines()[2]
+    assert first.endswith("urgent|" + first.rsplit("|", 1)[1])
+    assert "不支持的排序方式" in tools.list_tasks.invoke({"order_by": "random"})
+    assert "没有更多" in tools.list_tasks.invoke({"offset": 30})
+
+    monkeypatch.setattr(tools, "TOOL_OUTPUT_TOKEN_BUDGET", 80)
+    out = tools.list_tasks.invoke({"limit": 100})
+    assert count_text_tokens(out) <= 80 + 40 and "未显示" in out.splitlines()[-1]
+
+    week = tools.get_completed_tasks_this_week.invoke({})
+    assert week.splitlines()[0] == "本周完成的任务：共 1 个（low 1）"
+
+    # 窗口是周报缓存键所在的 ISO 周（周一 0 点起），不是最近 7 天
+    from datetime import date, timedelta
+    from app.ai.report_cache import week_start
+    from app.models import Task
+
+    assert week_start(date(2026, 10, 18)).isoformat() == "2026-10-12T00:00:00"  # 周日 → 当周周一
+    assert week_start(date(2026, 10, 12)).isoformat() == "2026-10-12T00:00:00"
+    with Session(test_engine) as session:
+        task = session.get(Task, created[0]["id"])
+        task.updated_at = week_start() - timedelta(seconds=1)
+        session.add(task)
+        session.commit()
+    assert tools.get_completed_tasks_this_week.invoke({}) == "本周没有已完成的任务。"
+
+
+def test_ai_batch_tools_write_once(client, auth_headers, monkeypatch):
+    from sqlalchemy import event
+    from sqlmodel import Session
+    from app.ai import tools
+    from app.models import Priority, TaskStatus
+    from tests.conftest import test_engine
+
+    a = client.post("/tasks/", json={"title": "A"}, headers=auth_headers).json()
+    monkeypatch.setattr(tools, "_get_session", lambda: Session(test_engine))
+    tools.set_current_user_id(a["user_id"])
+    commits = []
+
+    def on_commit(conn):
+        commits.append(conn)
+
+    event.listen(test_engine, "commit", on_commit)
+    try:
+        out = tools.create_tasks.invoke({"tasks": [{"title": "B", "priority": "high"}, {"title": "C"}]})
+        assert out.startswith("✅ 已创建 2 个任务") and "B（high）" in out and "C（medium）" in out
+        assert len(commits) == 1
+        ids = [t["id"] for t in client.get("/tasks/", headers=auth_headers).json()["items"]]
+
+        commits.clear()
+        out = tools.update_tasks.invoke({"updates": [
+            *({"task_id": i, "new_status": "done"} for i in ids),
+            {"task_id": a["id"], "new_priority": "urgent"},
+            {"task_id": 9999, "new_status": "done"},
+        ]})
+        assert len(commits) == 1
+    finally:
+        event.remove(test_engine, "commit", on_commit)
+    others = ", ".join(str(i) for i in ids if i != a["id"])
+    lines = out.splitlines()
+    assert lines[0] == "✅ 已更新 3 个任务：" and lines[-1] == "❌ 找不到这些 ID 的任务：9999"
+    assert set(lines[1:-1]) == {f"- ID {a['id']}：状态→done, 优先级→urgent", f"- ID {others}：状态→done"}
+    summary = client.get("/tasks/summary", headers=auth_headers).json()
+    assert summary["by_status"]["done"] == 3 and summary["by_priority"]["urgent"] == 1
+    assert "没有要更新" in tools.update_tasks.invoke({"updates": [{"task_id": a["id"]}]})
+
+    # 单个任务的工具同样校验状态 / 优先级，不合法的值不写库、不进计数
+    assert "不支持的优先级：asap" in tools.create_task.invoke({"title": "D", "priority": "asap"})
+    assert "不支持的状态：finished" in tools.update_task.invoke({"task_id": a["id"], "new_status": "finished"})
+    assert "不支持的优先级：p0" in tools.update_task.invoke({"task_id": a["id"], "new_priority": "p0", "new_title": "X"})
+    assert "已更新" in tools.update_task.invoke({"task_id": a["id"], "new_status": "in_progress"})
+    after = client.get("/tasks/summary", headers=auth_headers).json()
+    assert after["total"] == summary["total"] and set(after["by_status"]) <= {s.value for s in TaskStatus}
+    assert set(after["by_priority"]) <= {p.value for p in Priority}
+    assert client.get(f"/tasks/{a['id']}", headers=auth_headers).json()["title"] == "A"
+
+
+def test_search_tasks_ranked_and_kept_in_sync(client, auth_headers, monkeypatch):
+    from sqlmodel import Session
+    from app.ai import tools
+    from app.search import check_search_index, ensure_search_index
+    from tests.conftest import test_engine
+
+    items = [
+        {"title": "整理周报告模板", "description": "上周的"},
+        {"title": "买菜", "description": "顺便把周报告打印出来"},
+        {"title": "Fix login bug", "description": "auth 100%"},
+        {"title": "周报", "description": ""},
+    ]
+    created = client.post("/tasks/bulk", json={"items": items}, headers=auth_headers).json()["created"]
+    ids = [t["id"] for t in created]
+
+    def search(**params):
+        res = client.get("/tasks/search", params=params, headers=auth_headers)
+        assert res.status_code == 200, res.text
+        return res.json()
+
+    res = search(q="周报告")
+    assert res["total"] == 2 and [t["id"] for t in res["items"]] == [ids[0], ids[1]]  # 标题命中在前
+    assert [t["id"] for t in search(q="LOGIN")["items"]] == [ids[2]]
+    assert [t["id"] for t in search(q="周报告 打印")["items"]] == [ids[1]]
+    assert search(q="周报")["total"] == 3  # 短词走 LIKE
+    assert search(q="100%")["total"] == 1 and search(q="10%0")["total"] == 0
+    assert search(q='"AND*')["total"] == 0
+    page = search(q="周报", limit=2)
+    assert len(page["items"]) == 2 and page["next_offset"] == 2
+    assert search(q="周报", limit=2, offset=2)["next_offset"] is None
+    assert client.get("/tasks/search", params={"q": ""}, headers=auth_headers).status_code == 422
+
+    # 改标题、删除都由触发器同步到索引；别的用户搜不到
+    client.put(f"/tasks/{ids[0]}", json={"title": "季度总结"}, headers=auth_headers)
+    client.delete(f"/tasks/{ids[1]}", headers=auth_headers)
+    assert search(q="周报告")["total"] == 0 and search(q="季度总结")["total"] == 1
+    assert search(q="季度总结", status="done")["total"] == 0
+    client.post("/users/register", json={"username": "other", "email": "o@example.com", "password": "test123"})
+    token = client.post("/users/login", json={"username": "other", "password": "test123"}).json()["access_token"]
+    res = client.get("/tasks/search", params={"q": "季度总结"}, headers={"Authorization": f"Bearer {token}"})
+    assert res.json()["total"] == 0
+
+    monkeypatch.setattr(tools, "_get_session", lambda: Session(test_engine))
+    tools.set_current_user_id(created[0]["user_id"])
+    lines = tools.search_tasks.invoke({"query": "login"}).splitlines()
+    assert lines[0].startswith("搜索「login」：共 1 个匹配") and lines[2].startswith(f"{ids[2]}|Fix login bug|")
+    assert "没有找到" in tools.search_tasks.invoke({"query": "不存在的词"})
+
+    # 老库：没有 task_fts 时补建并回填
+    with test_engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE task_fts")
+    assert ensure_search_index(test_engine) and not ensure_search_index(test_engine)
+    assert check_search_index(test_engine)
+    assert search(q="季度总结")["total"] == 1
+
+    # 旧版索引（没有 user_id 列）：连同触发器重建，之后的写入照常同步
+    with test_engine.begin() as conn:
+        for trigger in ("task_fts_ai", "task_fts_ad", "task_fts_au"):
+            conn.exec_driver_sql(f"DROP TRIGGER {trigger}")
+        conn.exec_driver_sql("DROP TABLE task_fts")
+        conn.exec_driver_sql(
+            "CREATE VIRTUAL TABLE task_fts USING fts5("
+            "title, description, content='task', content_rowid='id', tokenize='trigram')"
+        )
+    assert ensure_search_index(test_engine) and check_search_index(test_engine)
+    with test_engine.connect() as conn:
+        owners = conn.exec_driver_sql("SELECT user_id FROM task_fts WHERE task_fts MATCH '\"季度总结\"'").all()
+    assert owners == [(created[0]["user_id"],)]
+    client.put(f"/tasks/{ids[0]}", json={"title": "年度总结"}, headers=auth_headers)
+    assert search(q="季度总结")["total"] == 0 and search(q="年度总结")["total"] == 1
+
+
+def test_task_responses_and_sparse_fields(client, auth_headers):
+    from datetime import datetime
+    from app.models import TASK_FIELDS
+
+    res = client.post("/tasks/", json={"title": "A", "description": "长描述" * 50}, headers=auth_headers)
+    assert res.status_code == 201 and res.headers["content-type"] == "application/json"
+    a = res.json()
+    assert tuple(a) == TASK_FIELDS and datetime.fromisoformat(a["created_at"])
+    b = client.post("/tasks/", json={"title": "B"}, headers=auth_headers).json()
+    assert client.put(f"/tasks/{a['id']}", json={"status": "done"}, headers=auth_headers).json()["status"] == "done"
+
+    # 不带 updated_at 也能继续翻页（游标要用的列总是查出来，只是不输出）
+    page = client.get("/tasks/", params={"fields": "id,title", "limit": 1}, headers=auth_headers).json()
+    assert page["items"] == [{"id": a["id"], "title": "A"}]
+    page = client.get("/tasks/", params={"fields": "title", "limit": 1, "cursor": page["next_cursor"]},
+                      headers=auth_headers).json()
+    assert page == {"items": [{"title": "B"}], "next_cursor": None}
+    full = client.get("/tasks/", headers=auth_headers).json()["items"]
+    assert full[1] == b and tuple(full[0]) == TASK_FIELDS
+
+    res = client.get(f"/tasks/{a['id']}", params={"fields": "status, id,status"}, headers=auth_headers)
+    assert res.json() == {"status": "done", "id": a["id"]} and res.headers["etag"]
+    cond = {**auth_headers, "If-None-Match": res.headers["etag"]}
+    assert client.get(f"/tasks/{a['id']}", params={"fields": "id"}, headers=cond).status_code == 304
+    res = client.get("/tasks/", params={"fields": "id,password"}, headers=auth_headers)
+    assert res.status_code == 400 and "password" in res.json()["detail"]
+
+    res = client.get("/tasks/search", params={"q": "长描述", "fields": "id"}, headers=auth_headers).json()
+    assert res == {"items": [{"id": a["id"]}], "total": 1, "next_offset": None}
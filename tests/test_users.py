@@ -21,3 +21,83 @@ def test_duplicate_username(client):
     client.post("/users/register", json={"username": "dup", "email": "a@b.com", "password": "123"})
     res = client.post("/users/register", json={"username": "dup", "email": "b@b.com", "password": "123"})
     assert res.status_code == 400
+
+
+def test_auth_cache_hits_and_reset_invalidates(client):
+    from app.auth import token_cache
+
+    client.post("/users/register", json={"username": "cache", "email": "c@c.com", "password": "123"})
+    token = client.post("/users/login", json={"username": "cache", "password": "123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/users/me", headers=headers).status_code == 200
+    assert client.get("/users/me", headers=headers).json()["username"] == "cache"
+    assert token_cache.stats()["hits"] == 1
+
+    client.post("/users/reset-password", json={"username": "cache", "new_password": "456"})
+    assert token_cache.stats()["size"] == 0
+    assert client.get("/users/me", headers=headers).status_code == 200
+    assert token_cache.stats()["misses"] == 2
+
+
+def test_auth_cache_respects_token_exp():
+    import time
+
+    from app.auth import TokenCache
+
+    cache = TokenCache(maxsize=2, ttl=60)
+    cache.put("expired", {"id": 1}, exp=time.time() - 1)
+    assert cache.get("expired") is None
+
+    cache.put("a", {"id": 1}, exp=time.time() + 60)
+    cache.put("b", {"id": 2}, exp=time.time() + 60)
+    cache.put("c", {"id": 3}, exp=time.time() + 60)
+    assert cache.get("a") is None  # LRU 淘汰
+    assert cache.get("c") == {"id": 3}
+
+
+def test_password_hasher_rejects_when_saturated():
+    import asyncio
+
+    import pytest
+    from fastapi import HTTPException
+
+    from app.auth import PasswordHasher, verify_password
+
+    hasher = PasswordHasher(workers=0, queue_size=1)
+    hashed = asyncio.run(hasher.hash("secret"))
+    assert verify_password("secret", hashed)
+
+    while hasher._slots.acquire(blocking=False):  # 占满所有槽位
+        pass
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(hasher.verify("secret", hashed))
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"]
+
+
+def test_login_recovers_after_hash_worker_dies(client, monkeypatch):
+    import os
+    import signal
+
+    from app.auth import PasswordHasher
+    from app.routes import users
+
+    hasher = PasswordHasher(workers=1, queue_size=4)
+    monkeypatch.setattr(users, "password_hasher", hasher)
+    try:
+        client.post("/users/register", json={"username": "oom", "email": "oom@x.com", "password": "123"})
+        login = {"username": "oom", "password": "123"}
+        assert client.post("/users/login", json=login).status_code == 200
+
+        # worker 被杀（OOM killer 之类）后进程池坏掉，下一次登录换新池
+        broken = hasher._pool
+        for pid in list(broken._processes):
+            os.kill(pid, signal.SIGKILL)
+        for process in list(broken._processes.values()):
+            process.join(5)
+        assert client.post("/users/login", json=login).status_code == 200
+        assert hasher._pool is not broken
+        assert client.post("/users/login", json=login).status_code == 200
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,48 @@
+"""组提交写线程：并发写合并提交，单个失败不影响同批其他请求"""
+
+import threading
+
+import pytest
+from sqlmodel import Session, select
+
+from app import crud
+from app.models import Task, User
+from app.writer import GroupCommitWriter
+from tests.conftest import test_engine
+
+
+def _make_user() -> int:
+    with Session(test_engine) as session:
+        user = User(username="writer", email="w@w.com", hashed_password="!")
+        session.add(user)
+        session.commit()
+        return user.id
+
+
+def _boom(session):
+    session.add(Task(title="不应落库", user_id=1))
+    raise ValueError("boom")
+
+
+def test_group_commit_batches_and_isolates_failures():
+    user_id = _make_user()
+    writer = GroupCommitWriter(test_engine)
+    started, gate = threading.Event(), threading.Event()
+    # 先用一个阻塞的写操作占住写线程，让后面的请求排队形成一批
+    blocker = writer.submit(lambda session: started.set() or gate.wait())
+    started.wait()
+    futures = [writer.submit(crud.create_task, user_id, title=f"t{i}") for i in range(10)]
+    failing = writer.submit(_boom)
+    gate.set()
+
+    blocker.result()
+    titles = {f.result().title for f in futures}
+    with pytest.raises(ValueError):
+        failing.result()
+    writer.stop()
+
+    assert titles == {f"t{i}" for i in range(10)}
+    assert writer.batches == 2
+    with Session(test_engine) as session:
+        stored = session.exec(select(Task.title)).all()
+    assert sorted(stored) == sorted(titles)